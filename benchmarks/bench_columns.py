@@ -0,0 +1,98 @@
+import sys
+import time
+import argparse
+from typing import Any, List
+from benchmarks.generator import synthetic_corpus
+
+# Бенчмарк векторных предварительных проверок правил (rules_engine.columns, нужен numpy).
+#
+# Задачи всего синтетического корпуса собираются в одни столбцы TaskColumns
+# (номера файлов и плейбуков - столбцами). Для каждого правила с предварительными
+# условиями (модули, флаги, подстроки команды) сравнивается время маски numpy
+# и цикла Python по задачам с теми же условиями; затем - время движка правил
+# без векторных проверок и с ними.
+#
+# Запуск: python -m benchmarks.bench_columns [--files N] [--tasks N] [--parser rt|safe|c] [--repeat N]
+
+
+def python_candidates(rule: Any, columns: Any) -> int:
+    # Те же условия, что у columns.rule_mask, циклом по задачам
+    from src.ast_model.facts import TaskFacts
+
+    flags = columns.arrays['flags'].tolist()
+    literals = rule.command_literals
+    count = 0
+    for task, task_flags in zip(columns.tasks, flags):
+        if not rule.accepts_module(task.module_id):
+            continue
+        if (task_flags & rule.required_flags) != rule.required_flags or task_flags & rule.excluded_flags:
+            continue
+        if literals is not None:
+            command = TaskFacts(task).command_lower
+            if not any(literal in command for literal in literals):
+                continue
+        count += 1
+    return count
+
+
+def run_engine(rules: List[Any], asts: List[List[Any]], vectorize: bool) -> float:
+    from src.rules_engine.engine import RulesEngine
+
+    engine = RulesEngine(rules, vectorize=vectorize)
+    start = time.perf_counter()
+    for ast in asts:
+        engine.run(ast)
+    return time.perf_counter() - start
+
+
+def main():
+    from src.lexer_parser import PARSER_BACKENDS, create_parser
+    from src.ast_model.builder import ASTBuilder
+    from src.rules_engine.columns import TaskColumns, has_prefilter, numpy_available
+    from src.scanner.pool import ScanOptions, configure
+
+    parser = argparse.ArgumentParser(description='Бенчмарк векторных предварительных проверок правил')
+    parser.add_argument('--files', type=int, default=100, help='Число плейбуков в корпусе')
+    parser.add_argument('--tasks', type=int, default=1000, help='Число задач в плейбуке')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='c', help='Парсер YAML')
+    parser.add_argument('--repeat', type=int, default=3, help='Число замеров движка (берется лучший)')
+    args = parser.parse_args()
+
+    if not numpy_available():
+        print("numpy не установлен: векторные проверки недоступны", file=sys.stderr)
+        return 1
+
+    corpus = synthetic_corpus(args.files, args.tasks)
+    yaml_parser = create_parser(args.parser)
+    builder = ASTBuilder()
+    asts = [builder.build_ast(yaml_parser.parse(text) or []) for text in corpus]
+    rules = configure(ScanOptions()).rules
+
+    start = time.perf_counter()
+    columns = TaskColumns()
+    for file_id, ast in enumerate(asts):
+        for play in ast:
+            columns.add_play(play, file_id=file_id)
+    columns.arrays
+    print(f"Файлов: {args.files}, задач: {len(columns)}, столбцы: {time.perf_counter() - start:.3f} с")
+
+    print(f"{'Правило':<8} {'отобрано':>9} {'numpy, мс':>10} {'Python, мс':>11}")
+    for rule in rules:
+        if not has_prefilter(rule):
+            continue
+        start = time.perf_counter()
+        selected = int(columns.rule_mask(rule).sum())
+        vector_time = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = python_candidates(rule, columns)
+        python_time = time.perf_counter() - start
+        mark = '' if selected == expected else f"  (Python: {expected})"
+        print(f"{rule.id:<8} {selected:>9} {vector_time * 1000:>10.1f} {python_time * 1000:>11.1f}{mark}")
+
+    plain = min(run_engine(rules, asts, vectorize=False) for _ in range(args.repeat))
+    vectorized = min(run_engine(rules, asts, vectorize=True) for _ in range(args.repeat))
+    print(f"Движок правил: без векторных проверок {plain:.2f} с, с ними {vectorized:.2f} с")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
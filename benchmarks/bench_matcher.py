@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+from typing import Callable, List
+
+# Микро-бенчмарк общего сопоставителя шаблонов (src.rules_engine.matcher)
+# против циклов по отдельным шаблонам, которыми правила пользовались раньше.
+# Последовательности подстрок (compile_sequences) сравниваются с циклом по
+# регулярным выражениям 'a.*b.*c', которые они заменили.
+# Корпус строк - строки тестовых плейбуков из tests/positive и tests/negative.
+#
+# Запуск: python -m benchmarks.bench_matcher [--repeat N]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_corpus() -> List[str]:
+    lines = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'tests', '*', '*.yml'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            lines.extend(line.strip().lower() for line in f if line.strip())
+    return lines
+
+
+def measure(func: Callable[[str], object], corpus: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def pattern_sets():
+    from src.rules_engine.rules import ANS001, ANS002, ANS006, ANS009, ANS013, ANS014
+
+    return [
+        ('ANS002 MIGRATION_INDICATORS', ANS002.MIGRATION_INDICATORS),
+        ('ANS006 TEMPORARY_INDICATORS', ANS006.TEMPORARY_INDICATORS),
+        ('ANS006 SYSTEM_CONFIGS', ANS006.SYSTEM_CONFIGS),
+        ('ANS009 INSECURE_SETTINGS', ANS009.INSECURE_SETTINGS),
+        ('ANS014 DANGEROUS_FUNCTIONS', ANS014.DANGEROUS_FUNCTIONS),
+        ('ANS001 SERVICE_MANAGEMENT_PATTERNS', ANS001.SERVICE_MANAGEMENT_PATTERNS),
+        ('ANS013 DOWNLOAD_EXECUTE_PATTERNS', ANS013.DOWNLOAD_EXECUTE_PATTERNS),
+    ]
+
+
+def baseline_functions(matcher):
+    # Циклы по шаблонам: (есть ли совпадение, метки совпавших шаблонов)
+    from src.rules_engine.matcher import SequenceMatcher
+
+    if isinstance(matcher, SequenceMatcher):
+        patterns = ['.*'.join(re.escape(part) for part in parts) for parts in matcher.sequences]
+        regex, flags = True, re.IGNORECASE if matcher.ignore_case else 0
+    else:
+        patterns = list(matcher.patterns)
+        regex, flags = matcher.regex, matcher.flags
+    pairs = list(zip(patterns, matcher.labels))
+    if regex:
+        def loop_any(text):
+            for pattern in patterns:
+                if re.search(pattern, text, flags):
+                    return True
+            return False
+
+        def loop_all(text):
+            labels = []
+            for pattern, label in pairs:
+                if re.search(pattern, text, flags) and label not in labels:
+                    labels.append(label)
+            return labels
+    else:
+        def loop_any(text):
+            return any(indicator in text for indicator in patterns)
+
+        def loop_all(text):
+            labels = []
+            for indicator, label in pairs:
+                if indicator in text and label not in labels:
+                    labels.append(label)
+            return labels
+    return loop_any, loop_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк сопоставителя шаблонов')
+    parser.add_argument('--repeat', type=int, default=5, help='Число повторов (берется лучший)')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"Строк в корпусе: {len(corpus)}")
+    print(f"{'Набор шаблонов':<38} {'режим':<8} {'циклы, мс':>10} {'matcher, мс':>12} {'ускорение':>10}")
+
+    for title, matcher in pattern_sets():
+        loop_any, loop_all = baseline_functions(matcher)
+
+        # Результаты обоих способов должны совпадать
+        for text in corpus:
+            assert matcher.search(text) == bool(loop_any(text)), (title, text)
+            assert matcher.findall(text) == loop_all(text), (title, text)
+
+        for mode, baseline, optimized in [('any', loop_any, matcher.search), ('all', loop_all, matcher.findall)]:
+            before = measure(baseline, corpus, args.repeat) * 1000
+            after = measure(optimized, corpus, args.repeat) * 1000
+            print(f"{title:<38} {mode:<8} {before:>10.2f} {after:>12.2f} {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
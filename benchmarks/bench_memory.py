@@ -0,0 +1,65 @@
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+from typing import Any, List, Tuple
+from benchmarks.generator import synthetic_corpus
+
+# Бенчмарк памяти AST: обычный режим ASTBuilder против компактного
+# (ASTBuilder(compact=True), флаг --compact-ast). Синтетический корпус
+# плейбуков (benchmarks.generator) строится в памяти; AST всех файлов удерживаются до конца замера,
+# как при сохранении AST в отчете. Замеряются пиковая и удерживаемая память
+# (tracemalloc) и время парсинга и построения AST.
+#
+# Запуск: python -m benchmarks.bench_memory [--files N] [--tasks N] [--parser rt|safe|c]
+
+def measure(parser: Any, compact: bool, corpus: List[str]) -> Tuple[float, float, float]:
+    from src.ast_model.builder import ASTBuilder
+
+    builder = ASTBuilder(compact=compact)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    asts = []
+    for text in corpus:
+        parsed_data = parser.parse(text)
+        asts.append(builder.build_ast(parsed_data or []))
+        del parsed_data
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del asts
+    return elapsed, peak, retained
+
+
+def main():
+    from src.lexer_parser import PARSER_BACKENDS, DEFAULT_PARSER, create_parser
+
+    parser = argparse.ArgumentParser(description='Бенчмарк памяти AST')
+    parser.add_argument('--files', type=int, default=100, help='Число плейбуков в корпусе')
+    parser.add_argument('--tasks', type=int, default=100, help='Число задач в плейбуке')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='Парсер YAML')
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.files, args.tasks)
+    size = sum(len(text.encode('utf-8')) for text in corpus)
+    print(f"Файлов: {args.files}, задач: {args.files * args.tasks}, объем: {size / 1024 / 1024:.1f} МБ, "
+          f"парсер: {args.parser}")
+
+    yaml_parser = create_parser(args.parser)
+    print(f"{'AST':<10} {'время, с':>9} {'пик, МБ':>9} {'удерживается, МБ':>17}")
+    results = {}
+    for name, compact in (('обычный', False), ('компактный', True)):
+        elapsed, peak, retained = measure(yaml_parser, compact, corpus)
+        results[name] = (peak, retained)
+        print(f"{name:<10} {elapsed:>9.2f} {peak / 1024 / 1024:>9.1f} {retained / 1024 / 1024:>17.1f}")
+
+    (peak, retained), (compact_peak, compact_retained) = results['обычный'], results['компактный']
+    print(f"Пик памяти: -{(1 - compact_peak / peak) * 100:.0f}%, "
+          f"удерживаемая память: -{(1 - compact_retained / retained) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from typing import Any, List, Tuple
+
+# Бенчмарк реализаций парсера YAML (src.lexer_parser.backends):
+# пропускная способность парсинга тестовых плейбуков из tests/positive
+# и tests/negative для rt, safe и c. Перед замером проверяется, что все
+# реализации возвращают одинаковые данные и позиции - на корпусе и на
+# значениях с тегами Ansible (TAGGED_CASE).
+#
+# Запуск: python -m benchmarks.bench_parsers [--repeat N]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Значения с тегами: все реализации возвращают их как значения без тега
+TAGGED_CASE = '''- hosts: all
+  vars:
+    installer: !unsafe "curl http://x | sh"
+    password: !vault |
+      $ANSIBLE_VAULT;1.1;AES256
+      3132
+    ports: !unsafe [80, 443]
+    options: !unsafe {mode: '0644'}
+    version: !!str 5
+  tasks:
+    - name: Install
+      shell: !unsafe "curl http://x | sh"
+'''
+
+
+def load_corpus() -> List[Tuple[str, str]]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'tests', '*', '*.yml'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus.append((os.path.relpath(path, ROOT), f.read()))
+    return corpus
+
+
+def plain(data: Any) -> Any:
+    # Данные без типов-оберток ruamel и позиции всех словарей и списков
+    if isinstance(data, dict):
+        return [(plain(key), data.lc.key(key), plain(value)) for key, value in data.items()]
+    if isinstance(data, list):
+        return [(data.lc.item(index), plain(value)) for index, value in enumerate(data)]
+    return data
+
+
+def measure(parser: Any, corpus: List[Tuple[str, str]], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, text in corpus:
+            parser.parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    from src.lexer_parser import PARSER_BACKENDS, create_parser
+    from src.lexer_parser.safe_parser import C_LOADER_AVAILABLE
+
+    parser = argparse.ArgumentParser(description='Бенчмарк парсеров YAML')
+    parser.add_argument('--repeat', type=int, default=5, help='Число повторов (берется лучший)')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    size = sum(len(text.encode('utf-8')) for _, text in corpus)
+    print(f"Файлов: {len(corpus)}, объем: {size / 1024:.0f} КБ, C-расширение: {'да' if C_LOADER_AVAILABLE else 'нет'}")
+
+    parsers = {name: create_parser(name) for name in PARSER_BACKENDS}
+
+    # Все реализации должны давать одинаковый результат
+    for path, text in corpus + [('<tagged>', TAGGED_CASE)]:
+        reference = plain(parsers['rt'].parse(text))
+        for name, backend in parsers.items():
+            assert plain(backend.parse(text)) == reference, (name, path)
+
+    print(f"{'Парсер':<8} {'время, мс':>10} {'файлов/с':>10} {'МБ/с':>8} {'ускорение':>10}")
+    baseline = None
+    for name, backend in parsers.items():
+        elapsed = measure(backend, corpus, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:<8} {elapsed * 1000:>10.1f} {len(corpus) / elapsed:>10.1f} "
+              f"{size / elapsed / 1024 / 1024:>8.2f} {baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import gc
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks.generator import TASK_TEMPLATES, DEFAULT_MIX, iter_corpus, parse_mix
+
+# Бенчмарк масштабируемости: синтетический корпус (benchmarks.generator)
+# проходит все этапы анализа - парсинг, build_ast, RulesEngine.run и отчет.
+# Для каждого этапа отдельно измеряются время, пропускная способность
+# (задач/с и МБ/с входного YAML, для отчета - нарушений/с и МБ/с отчета)
+# и пиковая память этапа (tracemalloc, прирост относительно начала этапа).
+#
+# Файлы корпуса генерируются и обрабатываются по одному, поэтому корпус
+# любого размера (10 000 файлов, 100 000 задач в одном плейбуке) не держится
+# в памяти целиком; нарушения накапливаются для этапа отчета.
+# Время измеряется в отдельном проходе без tracemalloc, который сильно
+# замедляет выполнение (--no-memory отключает проход с замером памяти).
+#
+# Результаты сохраняются в JSON (--save) и сравниваются с сохраненными (--compare).
+#
+# Запуск: python -m benchmarks.bench_scale [--files N] [--tasks N] [--plays N] [--mix ...]
+#                                          [--parser rt|safe|c] [--compact-ast] [--format json|text|jsonl|sarif]
+#                                          [--save FILE] [--compare FILE]
+
+STAGES = ('parse', 'build_ast', 'rules', 'report')
+
+MB = 1024 * 1024
+
+
+class StageMeter:
+    """Накапливает время и пиковую память вызовов одного этапа"""
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.seconds = 0.0
+        self.peak = 0
+
+    def __call__(self, function: Callable, *args: Any) -> Any:
+        if self.trace_memory:
+            # Трассировка заново для каждого вызова: пик - память, выделенная этим вызовом
+            tracemalloc.start()
+            result = function(*args)
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            return result
+
+        start = time.perf_counter()
+        result = function(*args)
+        self.seconds += time.perf_counter() - start
+        return result
+
+
+def build_report(violations: List[Dict[str, Any]], report_format: str) -> str:
+    from src.reports import ReportGenerator, STREAMING_FORMATS, create_writer
+
+    if report_format in STREAMING_FORMATS:
+        stream = io.StringIO()
+        writer = create_writer(report_format, stream)
+        writer.write_all(violations)
+        writer.finish()
+        return stream.getvalue()
+    if report_format == 'json':
+        return json.dumps(ReportGenerator.build_json_report(violations), ensure_ascii=False, indent=2, default=str)
+    return ReportGenerator.generate_text_report(violations)
+
+
+def run_pipeline(args: argparse.Namespace, trace_memory: bool) -> Tuple[Dict[str, StageMeter], Dict[str, int]]:
+    from src.lexer_parser import create_parser
+    from src.ast_model.builder import ASTBuilder
+    from src.rules_engine.engine import RulesEngine
+    from src.rules_engine.rules import load_all_rules
+
+    parser = create_parser(args.parser)
+    builder = ASTBuilder(compact=args.compact_ast)
+    engine = RulesEngine(load_all_rules())
+    meters = {stage: StageMeter(trace_memory) for stage in STAGES}
+    counts = {'files': 0, 'plays': 0, 'tasks': 0, 'bytes': 0, 'violations': 0, 'report_bytes': 0}
+
+    violations: List[Dict[str, Any]] = []
+    gc.collect()
+    for text in iter_corpus(args.files, args.tasks, args.plays, args.mix, args.seed):
+        counts['files'] += 1
+        counts['bytes'] += len(text.encode('utf-8'))
+        parsed_data = meters['parse'](parser.parse, text)
+        ast = meters['build_ast'](builder.build_ast, parsed_data or [])
+        del parsed_data
+        violations.extend(meters['rules'](engine.run, ast))
+        counts['plays'] += len(ast)
+        counts['tasks'] += sum(len(play.tasks) for play in ast)
+        del ast
+
+    report = meters['report'](build_report, violations, args.format)
+    counts['violations'] = len(violations)
+    counts['report_bytes'] = len(report.encode('utf-8'))
+    return meters, counts
+
+
+def stage_results(times: Dict[str, StageMeter], memory: Optional[Dict[str, StageMeter]],
+                  counts: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for stage in STAGES:
+        seconds = times[stage].seconds
+        rate = 1 / seconds if seconds else 0.0
+        if stage == 'report':
+            result = {'seconds': seconds, 'violations_per_s': counts['violations'] * rate,
+                      'mb_per_s': counts['report_bytes'] / MB * rate}
+        else:
+            result = {'seconds': seconds, 'tasks_per_s': counts['tasks'] * rate,
+                      'mb_per_s': counts['bytes'] / MB * rate}
+        result['peak_mb'] = memory[stage].peak / MB if memory is not None else None
+        results[stage] = result
+    return results
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"{'Этап':<10} {'время, с':>9} {'задач/с':>10} {'МБ/с':>8} {'пик, МБ':>9}")
+    for stage, result in results.items():
+        rate = result.get('tasks_per_s', result.get('violations_per_s'))
+        peak = f"{result['peak_mb']:.2f}" if result['peak_mb'] is not None else '-'
+        unit = '' if 'tasks_per_s' in result else ' (нарушений/с)'
+        print(f"{stage:<10} {result['seconds']:>9.3f} {rate:>10.0f} {result['mb_per_s']:>8.2f} {peak:>9}{unit}")
+
+
+def print_comparison(results: Dict[str, Dict[str, Any]], previous: Dict[str, Any]):
+    print("\nСравнение с сохраненными результатами (время, с):")
+    for stage, result in results.items():
+        before = previous.get('stages', {}).get(stage)
+        if not before or not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        print(f"{stage:<10} {before['seconds']:>9.3f} -> {result['seconds']:>9.3f}  x{ratio:.2f}")
+
+
+def main():
+    from src.lexer_parser import PARSER_BACKENDS, DEFAULT_PARSER
+
+    parser = argparse.ArgumentParser(description='Бенчмарк масштабируемости по этапам анализа')
+    parser.add_argument('--files', type=int, default=100, help='Число файлов корпуса')
+    parser.add_argument('--tasks', type=int, default=100, help='Число задач в плейбуке')
+    parser.add_argument('--plays', type=int, default=1, help='Число плейбуков в файле')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help=f"Доли видов задач, например command=3,file=2 ({', '.join(TASK_TEMPLATES)})")
+    parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='Парсер YAML')
+    parser.add_argument('--compact-ast', action='store_true', help='Компактный AST')
+    parser.add_argument('--format', choices=['text', 'json', 'jsonl', 'sarif'], default='json',
+                        help='Формат отчета (по умолчанию %(default)s)')
+    parser.add_argument('--no-memory', action='store_true', help='Не выполнять проход с замером памяти')
+    parser.add_argument('--save', metavar='FILE', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', metavar='FILE', help='Сравнить с сохраненными результатами')
+    args = parser.parse_args()
+
+    times, counts = run_pipeline(args, trace_memory=False)
+    memory = None if args.no_memory else run_pipeline(args, trace_memory=True)[0]
+    results = stage_results(times, memory, counts)
+
+    print(f"Файлов: {counts['files']}, плейбуков: {counts['plays']}, задач: {counts['tasks']}, "
+          f"объем: {counts['bytes'] / MB:.1f} МБ, нарушений: {counts['violations']}, "
+          f"парсер: {args.parser}{', компактный AST' if args.compact_ast else ''}")
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(results, json.load(f))
+
+    if args.save:
+        data = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'config': {'files': args.files, 'tasks': args.tasks, 'plays': args.plays,
+                       'mix': args.mix or DEFAULT_MIX, 'seed': args.seed, 'parser': args.parser,
+                       'compact_ast': args.compact_ast, 'format': args.format},
+            'counts': counts,
+            'stages': results,
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
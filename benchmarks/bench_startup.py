@@ -0,0 +1,120 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import subprocess
+import statistics
+from typing import Dict, List, Tuple
+
+# Бенчмарк холодного старта анализатора (python -m src.main).
+#
+# Каждый сценарий запускается в новом процессе интерпретатора; замеряется
+# медиана времени до завершения процесса. Для тех же сценариев снимается
+# вывод python -X importtime: время импорта модулей без учета вложенных
+# (self) и с ними (cumulative) и самые медленные модули.
+#
+# С --save результаты записываются в JSON, с --compare сравниваются с
+# сохраненными: если медиана сценария выросла больше чем на --threshold,
+# бенчмарк завершается с кодом 1 (проверка регрессии в CI).
+#
+# Запуск: python -m benchmarks.bench_startup [--repeat N] [--save FILE] [--compare FILE]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def smallest_playbook() -> str:
+    paths = glob.glob(os.path.join(ROOT, 'tests', '*', '*.yml'))
+    return os.path.relpath(min(paths, key=os.path.getsize), ROOT)
+
+
+def scenarios() -> Dict[str, List[str]]:
+    playbook = smallest_playbook()
+    return {
+        'help': ['--help'],
+        'playbook': [playbook, '--no-ast', '--no-cache'],
+        'no-rules': [playbook, '--no-ast', '--no-cache', '--rules', ''],
+    }
+
+
+def run(args: List[str], importtime: bool = False) -> Tuple[float, str]:
+    """Запускает анализатор в новом процессе; возвращает время и stderr"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-m', 'src.main'] + args
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               universal_newlines=True, encoding='utf-8')
+    return time.perf_counter() - start, completed.stderr
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Модуль -> (self, cumulative) в микросекундах из вывода -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(args: List[str], repeat: int) -> Dict[str, float]:
+    run(args)  # Прогрев кеша байт-кода и файловой системы
+    times = [run(args)[0] for _ in range(repeat)]
+    return {'median_ms': statistics.median(times) * 1000, 'min_ms': min(times) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк холодного старта анализатора')
+    parser.add_argument('--repeat', type=int, default=10, help='Число запусков сценария (берется медиана)')
+    parser.add_argument('--top', type=int, default=10, help='Число самых медленных модулей в выводе')
+    parser.add_argument('--save', metavar='FILE', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', metavar='FILE', help='Сравнить с сохраненными результатами')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Допустимый рост медианы относительно --compare (по умолчанию %(default)s = 20%%)')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'Сценарий':<10} {'медиана, мс':>12} {'мин, мс':>9} {'импорт, мс':>11} {'модулей':>8}")
+    for name, scenario in scenarios().items():
+        result = measure(scenario, args.repeat)
+        modules = parse_importtime(run(scenario, importtime=True)[1])
+        # Сумма self по всем модулям - полное время импорта
+        result['import_ms'] = sum(self_us for self_us, _ in modules.values()) / 1000
+        result['modules'] = len(modules)
+        result['slowest'] = [[module, self_us / 1000] for module, (self_us, _) in
+                             sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]]
+        results[name] = result
+        print(f"{name:<10} {result['median_ms']:>12.1f} {result['min_ms']:>9.1f} "
+              f"{result['import_ms']:>11.1f} {result['modules']:>8}")
+
+    for name, result in results.items():
+        print(f"\nСамые медленные модули ({name}), self мс:")
+        for module, self_ms in result['slowest']:
+            print(f"  {self_ms:>7.2f}  {module}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = []
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            limit = previous[name]['median_ms'] * (1 + args.threshold)
+            status = 'OK' if result['median_ms'] <= limit else 'РЕГРЕССИЯ'
+            print(f"{name:<10} {previous[name]['median_ms']:>8.1f} -> {result['median_ms']:>8.1f} мс "
+                  f"(предел {limit:.1f}) {status}")
+            if result['median_ms'] > limit:
+                regressions.append(name)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import os
+import sys
+import random
+import argparse
+from typing import Dict, Iterator, List, Optional
+
+# Генератор синтетических плейбуков для бенчмарков.
+#
+# Задачи строятся по шаблонам, повторяющим тестовые плейбуки из tests/positive
+# и tests/negative: установка пакетов, управление службами через command и
+# service, копирование файлов и шаблонов с правами, загрузки, пользователи,
+# cron и т.п. Часть шаблонов содержит нарушения правил, часть - нет.
+# Шаблоны сгруппированы по видам; доля каждого вида задается смесью (mix).
+# Вид dataflow (источники, set_fact и команды с общими переменными) в смесь
+# по умолчанию не входит: --mix dataflow=1,command=3.
+#
+# Каждый плейбук определяется номером и начальным значением (seed): генерация
+# воспроизводима, а корпус любого размера можно обходить, не держа его в памяти.
+#
+# Запуск: python -m benchmarks.generator OUT_DIR [--files N] [--tasks N] [--plays N]
+#                                                [--mix command=3,file=2] [--seed N]
+
+TASK_TEMPLATES: Dict[str, List[str]] = {
+    'package': [
+        '''    # Установка пакета {n}
+    - name: Install package {n}
+      ansible.builtin.apt:
+        name: "pkg-{n}"
+        state: present
+''',
+        '''    - name: Install python requirements {n}
+      pip:
+        name: "lib{n}"
+        virtualenv: /opt/app/venv
+        state: latest
+''',
+        '''    - name: Install packages {n}
+      apt:
+        name:
+          - nginx
+          - curl
+          - "tool-{n}"
+        state: present
+        update_cache: yes
+''',
+    ],
+    'command': [
+        '''    - name: Restart service {n}
+      command: systemctl restart app-{n}
+      become: yes
+''',
+        '''    - name: Check service status {n}
+      command: systemctl status app-{n}
+      register: status_{n}
+      changed_when: false
+''',
+        '''    - name: Run script {n}
+      shell: |
+        curl -s https://example.com/setup-{n}.sh | bash
+        echo done
+      args:
+        chdir: /opt/app
+      when: run_setup | default(false)
+''',
+        '''    - name: Run migration {n}
+      command: /opt/app/bin/migrate --step {n}
+      args:
+        chdir: /opt/app
+      environment:
+        APP_ENV: production
+      changed_when: "'applied' in migrate_{n}.stdout"
+      register: migrate_{n}
+''',
+        '''    - name: Grant database permissions {n}
+      command: sudo -u postgres psql -c "GRANT ALL ON DATABASE db{n} TO {{{{ db_user }}}};"
+''',
+    ],
+    'service': [
+        '''    - name: Ensure service {n} is running
+      service:
+        name: "app-{n}"
+        state: started
+        enabled: yes
+''',
+        '''    - name: Reload systemd for unit {n}
+      systemd:
+        name: "app-{n}"
+        daemon_reload: yes
+        state: restarted
+''',
+    ],
+    'file': [
+        '''    - name: Copy config {n}
+      copy:
+        src: files/app-{n}.conf
+        dest: /etc/app/app-{n}.conf
+        owner: root
+        group: root
+        mode: "0644"
+''',
+        '''    - name: Template {n}
+      template:
+        src: app.j2
+        dest: "/etc/app/{n}.yml"
+      changed_when: false
+''',
+        '''    - name: Set directory permissions {n}
+      file:
+        path: "/var/www/site-{n}"
+        state: directory
+        mode: "0777"
+''',
+        '''    - name: Configure authentication {n}
+      lineinfile:
+        path: /etc/app/auth-{n}.conf
+        line: "password = secret{n}"
+        state: present
+''',
+    ],
+    'download': [
+        '''    - name: Download archive {n}
+      get_url:
+        url: "http://example.com/releases/app-{n}.tar.gz"
+        dest: "/tmp/app-{n}.tar.gz"
+        validate_certs: no
+''',
+        '''    - name: Clone repository {n}
+      git:
+        repo: "https://github.com/example/app-{n}.git"
+        dest: "/opt/app-{n}"
+        version: main
+''',
+    ],
+    'misc': [
+        '''    - name: Create user {n}
+      user:
+        name: "user{n}"
+        groups: [wheel, docker]
+        shell: /bin/bash
+      loop: "{{{{ users }}}}"
+      register: created_{n}
+      notify: restart app
+''',
+        '''    - name: Schedule backup {n}
+      cron:
+        name: "backup {n}"
+        minute: "{minute}"
+        hour: "2"
+        job: "/opt/backup/run.sh {n}"
+''',
+        '''    - name: Open firewall port {n}
+      ufw:
+        rule: allow
+        port: "{port}"
+        proto: tcp
+''',
+        '''    - name: Create database user with raw SQL {n}
+      raw: "psql -c \\"CREATE USER user{n} WITH PASSWORD 'pass{n}';\\""
+      become_user: postgres
+''',
+        '''    - shell: echo {n} >> /var/log/app.log
+''',
+    ],
+    # Цепочки переменных для анализа потоков данных (ANS015): имена общие для всего
+    # плейбука, поэтому определения и использования из разных задач связываются
+    'dataflow': [
+        '''    - name: Ask for release {n}
+      pause:
+        prompt: "Release for step {n}"
+      register: release_answer
+''',
+        '''    - name: Fetch build info {n}
+      uri:
+        url: "https://ci.example.com/builds/{n}"
+        return_content: yes
+      register: build_info
+''',
+        '''    - name: Compute release dir {n}
+      set_fact:
+        release_dir: "/srv/app/{{{{ release_answer.user_input }}}}-{n}"
+''',
+        '''    - name: Compute artifact {n}
+      set_fact:
+        artifact: "{{{{ release_dir }}}}/{{{{ build_info.json.name }}}}.tgz"
+''',
+        '''    - name: Unpack artifact {n}
+      shell: tar -xzf {{{{ artifact }}}} -C {{{{ release_dir }}}}
+''',
+        '''    - name: Remove old release {n}
+      command: rm -rf {{{{ release_dir | quote }}}}.old
+''',
+        '''    - name: Read version {n}
+      command: cat /srv/app/VERSION
+      register: release_answer
+''',
+    ],
+}
+
+# Доли видов задач по умолчанию (примерно как в тестовых плейбуках)
+DEFAULT_MIX: Dict[str, int] = {'package': 3, 'command': 4, 'service': 2, 'file': 5, 'download': 1, 'misc': 2}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Смесь видов задач из строки вида 'command=3,file=2'"""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in TASK_TEMPLATES:
+            raise ValueError(f"неизвестный вид задач: {kind} (доступны: {', '.join(TASK_TEMPLATES)})")
+        mix[kind] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("смесь задач пуста")
+    return mix
+
+
+def generate_playbook(index: int, tasks: int, plays: int = 1, mix: Optional[Dict[str, int]] = None,
+                      seed: int = 0) -> str:
+    """Текст плейбука с номером index: plays плейбуков по tasks задач"""
+    mix = mix or DEFAULT_MIX
+    kinds = [kind for kind in mix if mix[kind] > 0]
+    weights = [mix[kind] for kind in kinds]
+    rnd = random.Random(seed * 1000003 + index)
+
+    parts = ['---\n']
+    for play in range(plays):
+        number = (index * plays + play) * tasks
+        parts.append(f'''- name: Synthetic play {index}.{play}
+  hosts: group_{index % 10}
+  become: yes
+  vars:
+    app_version: "1.{index}"
+    app_port: {8000 + index % 100}
+  tasks:
+''')
+        for task in range(tasks):
+            template = rnd.choice(TASK_TEMPLATES[rnd.choices(kinds, weights)[0]])
+            parts.append(template.format(n=number + task, minute=rnd.randrange(60), port=rnd.randrange(1024, 65536)))
+        parts.append('''  handlers:
+    - name: restart app
+      service:
+        name: app
+        state: restarted
+
+''')
+    return ''.join(parts)
+
+
+def iter_corpus(files: int, tasks: int, plays: int = 1, mix: Optional[Dict[str, int]] = None,
+                seed: int = 0) -> Iterator[str]:
+    """Тексты плейбуков корпуса по одному (корпус целиком в памяти не хранится)"""
+    for index in range(files):
+        yield generate_playbook(index, tasks, plays, mix, seed)
+
+
+def synthetic_corpus(files: int, tasks: int, plays: int = 1, mix: Optional[Dict[str, int]] = None,
+                     seed: int = 0) -> List[str]:
+    return list(iter_corpus(files, tasks, plays, mix, seed))
+
+
+def write_corpus(directory: str, files: int, tasks: int, plays: int = 1, mix: Optional[Dict[str, int]] = None,
+                 seed: int = 0) -> List[str]:
+    """Записывает корпус в каталог (по 1000 файлов в подкаталоге); возвращает пути файлов"""
+    paths = []
+    for index, text in enumerate(iter_corpus(files, tasks, plays, mix, seed)):
+        subdirectory = os.path.join(directory, f"{index // 1000:03d}")
+        os.makedirs(subdirectory, exist_ok=True)
+        path = os.path.join(subdirectory, f"playbook_{index:06d}.yml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор синтетических плейбуков')
+    parser.add_argument('directory', help='Каталог для плейбуков')
+    parser.add_argument('--files', type=int, default=100, help='Число файлов')
+    parser.add_argument('--tasks', type=int, default=100, help='Число задач в плейбуке')
+    parser.add_argument('--plays', type=int, default=1, help='Число плейбуков в файле')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help=f"Доли видов задач, например command=3,file=2 ({', '.join(TASK_TEMPLATES)})")
+    parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+    args = parser.parse_args()
+
+    paths = write_corpus(args.directory, args.files, args.tasks, args.plays, args.mix, args.seed)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Файлов: {len(paths)}, задач: {len(paths) * args.plays * args.tasks}, "
+          f"объем: {size / 1024 / 1024:.1f} МБ -> {args.directory}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
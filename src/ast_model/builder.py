@@ -1,12 +1,104 @@
-import os
 import sys
-from typing import Any, Dict, List
-from .nodes import PlayNode, TaskNode, ExpressionNode, VariableNode
+from typing import Any, Dict, List, Tuple
+from .nodes import PlayNode, TaskNode, BlockNode, ExpressionNode, VariableNode
+from .modules import canonical_module, build_module_index
+from .table import TaskTable, SECTIONS, BLOCK_PARTS, TASKS, HANDLERS, flag
+
+# Позиции узлов берутся из атрибута lc словарей и списков парсера
+# (строки и колонки с 0) и сохраняются в узлах AST с 1; 0 - позиция неизвестна.
+
+
+def node_position(data: Any, line_offset: int = 0, column_offset: int = 0) -> Tuple[int, int]:
+    """Позиция начала словаря или списка (строка и колонка с 1)"""
+    lc = getattr(data, 'lc', None)
+    if lc is None or not isinstance(lc.line, int):
+        return 0, 0
+    return lc.line + line_offset + 1, lc.col + column_offset + 1
+
+
+def value_position(data: Any, key: Any, line_offset: int = 0, column_offset: int = 0) -> Tuple[int, int]:
+    """Позиция значения ключа key (или элемента списка с индексом key)"""
+    lc = getattr(data, 'lc', None)
+    try:
+        line, column = lc.item(key) if isinstance(data, list) else lc.value(key)
+    except (AttributeError, KeyError, IndexError, TypeError):
+        return 0, 0
+    return line + line_offset + 1, column + column_offset + 1
+
+
+def last_line(data: Any) -> int:
+    """Последняя строка (с 0), на которой начинается элемент данных; -1 - неизвестна"""
+    lc = getattr(data, 'lc', None)
+    last = lc.line if lc is not None and isinstance(lc.line, int) else -1
+    if lc is not None and lc.data:
+        for position in lc.data.values():
+            last = max(last, position[-2])
+    if isinstance(data, dict):
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return last
+    for child in children:
+        if isinstance(child, (dict, list)):
+            last = max(last, last_line(child))
+    return last
+
+
+def plain_data(data: Any) -> Any:
+    """
+    Копия данных парсера из обычных dict, list и скалярных типов Python.
+
+    Ключи словарей интернируются: одни и те же имена параметров повторяются
+    во всех задачах. Копия не ссылается на дерево ruamel (комментарии, позиции),
+    и оно может быть освобождено сразу после построения AST.
+    """
+    if isinstance(data, dict):
+        return {(sys.intern(str(key)) if isinstance(key, str) else plain_data(key)): plain_data(value)
+                for key, value in data.items()}
+    if isinstance(data, list):
+        return [plain_data(item) for item in data]
+    if isinstance(data, tuple):
+        return tuple(plain_data(item) for item in data)
+    data_type = type(data)
+    if data_type is str or data_type is int or data_type is float or data_type is bool or data is None:
+        return data
+    # Скаляры ruamel: строки со стилем, числа с форматом, булевы значения с якорем
+    if isinstance(data, str):
+        return str(data)
+    if isinstance(data, int):
+        return int(data)
+    if isinstance(data, float):
+        return float(data)
+    return data
+
+
+def _same(data: Any) -> Any:
+    return data
+
+
+# Ключи, по которым элемент документа распознается как плейбук, а не задача
+PLAY_KEYS = ('hosts', 'import_playbook', 'tasks', 'roles', 'pre_tasks', 'post_tasks', 'handlers')
+
+
+def is_play_data(data: Any) -> bool:
+    """
+    Плейбук ли элемент документа. Документ, первый элемент которого - словарь
+    без ключей плейбука, считается файлом задач (роли, include_tasks и т.п.)
+    """
+    return not isinstance(data, dict) or any(key in data for key in PLAY_KEYS)
+
 
 class ASTBuilder:
     """Класс для построения AST из данных, полученных от парсера YAML"""
     
-    def __init__(self):
+    def __init__(self, compact: bool = False):
+        """
+        :param compact: Компактный AST: значения из узлов копируются в обычные
+                        контейнеры Python (см. plain_data), имена модулей интернируются
+        """
+        self.compact = compact
+        self._value = plain_data if compact else _same
         self.current_line = 0
         self.current_column = 0
     
@@ -17,94 +109,201 @@ class ASTBuilder:
         :param parsed_data: Данные, полученные от ruamel.yaml парсера
         :return: Список узлов PlayNode (AST)
         """
+        if parsed_data and not is_play_data(parsed_data[0]):
+            return [self.build_tasks_file(parsed_data)]
+
         plays = []
         
         for play_data in parsed_data:
-            play_node = self._build_play(play_data)
+            play_node = self.build_play(play_data)
             plays.append(play_node)
         
         return plays
     
-    def _build_play(self, play_data: Dict[str, Any]) -> PlayNode:
-        """Строит узел плейбука из данных"""
+    def build_play(self, play_data: Dict[str, Any]) -> PlayNode:
+        """Строит узел плейбука из данных (для потоковой обработки - по одному плейбуку)"""
+        play_node = self.build_play_header(play_data)
+        table = TaskTable(play_node.become)
+        for section, key in enumerate(SECTIONS):
+            for task_data in self._items(play_data.get(key)):
+                self.build_item(task_data, table, section)
+        self.attach_table(play_node, table)
+        return play_node
+    
+    def build_play_header(self, play_data: Dict[str, Any]) -> PlayNode:
+        """Строит узел плейбука без задач и обработчиков (имя, хосты, переменные, запросы, роли)"""
         play_node = PlayNode()
+        play_node.line, play_node.column = node_position(play_data)
         
         if 'name' in play_data:
-            play_node.name = play_data['name']
+            play_node.name = self._value(play_data['name'])
         
         if 'hosts' in play_data:
-            play_node.hosts = play_data['hosts']
+            play_node.hosts = self._value(play_data['hosts'])
         
         if 'vars' in play_data:
             play_node.vars = self._build_variables(play_data['vars'])
+
+        if 'vars_prompt' in play_data:
+            play_node.prompts = self._build_prompts(play_data['vars_prompt'])
+
+        if 'roles' in play_data:
+            play_node.roles = self._build_roles(play_data['roles'])
+
+        if 'import_playbook' in play_data:
+            play_node.import_playbook = self._value(play_data['import_playbook'])
+
+        play_node.become = flag(play_data.get('become'))
         
-        if 'tasks' in play_data:
-            play_node.tasks = self._build_tasks(play_data['tasks'])
-        
-        if 'handlers' in play_data:
-            play_node.handlers = self._build_tasks(play_data['handlers'])
-        
         return play_node
+
+    def build_tasks_file(self, tasks_data: List[Dict[str, Any]]) -> PlayNode:
+        """Строит узел файла задач (документ - список задач без плейбука)"""
+        play_node = PlayNode(tasks_file=True)
+        play_node.line, play_node.column = node_position(tasks_data[0]) if tasks_data else (0, 0)
+        table = TaskTable()
+        for task_data in tasks_data:
+            self.build_item(task_data, table)
+        self.attach_table(play_node, table)
+        return play_node
+
+    @staticmethod
+    def attach_table(play_node: PlayNode, table: TaskTable):
+        """Делает таблицу задачами плейбука: tasks, handlers и индекс модулей"""
+        play_node.table = table
+        play_node.tasks = table.tasks
+        play_node.handlers = table.section_tasks(HANDLERS)
+        play_node.module_index = build_module_index(table.tasks)
+
+    @staticmethod
+    def _items(items: Any) -> List[Any]:
+        # Раздел задач без элементов (tasks: null) пуст
+        return items if isinstance(items, list) else []
+
+    def _build_roles(self, roles_data: Any) -> List[str]:
+        """Имена ролей: строки или словари с ключом role (name)"""
+        roles = []
+        for role in roles_data if isinstance(roles_data, list) else [roles_data]:
+            if isinstance(role, dict):
+                role = role.get('role') or role.get('name')
+            if role:
+                roles.append(str(role))
+        return roles
+
+    def build_item(self, task_data: Dict[str, Any], table: TaskTable, section: int = TASKS,
+                   line_offset: int = 0, column_offset: int = 0, block: int = -1, part: int = 0):
+        """
+        Добавляет в таблицу строки элемента списка задач: задачу или блок
+        (block/rescue/always) со всеми вложенными задачами
+
+        :param section: Раздел плейбука (индекс в SECTIONS)
+        :param block: Индекс объемлющего блока в таблице (-1 - элемент верхнего уровня)
+        :param part: Часть объемлющего блока (индекс в BLOCK_PARTS)
+        """
+        if not (isinstance(task_data, dict) and 'block' in task_data):
+            task_node = self.build_task(task_data, line_offset, column_offset)
+            table.append(task_node, section, block, part, flag(task_data.get('become')))
+            return
+
+        block_node = BlockNode(part=BLOCK_PARTS[part] if block >= 0 else '')
+        block_node.line, block_node.column = node_position(task_data, line_offset, column_offset)
+        end = last_line(task_data)
+        block_node.end_line = end + line_offset + 1 if end >= 0 else block_node.line
+        if 'name' in task_data:
+            block_node.name = self._value(task_data['name'])
+        if 'when' in task_data:
+            block_node.when = self._build_expression(
+                task_data['when'], value_position(task_data, 'when', line_offset, column_offset),
+                line_offset, column_offset)
+        block_node.become = flag(task_data.get('become'))
+
+        index = table.add_block(block_node, block)
+        for part_index, key in enumerate(BLOCK_PARTS):
+            for item in self._items(task_data.get(key)):
+                self.build_item(item, table, section, line_offset, column_offset, index, part_index)
     
-    def _build_tasks(self, tasks_data: List[Dict[str, Any]]) -> List[TaskNode]:
-        """Строит список узлов задач из данных"""
-        tasks = []
+    def build_task(self, task_data: Dict[str, Any], line_offset: int = 0, column_offset: int = 0) -> TaskNode:
+        """
+        Строит узел одной задачи из данных
+
+        :param line_offset: Смещение строк, если задача разобрана из фрагмента документа
+        :param column_offset: Смещение колонок фрагмента
+        """
+        task_node = TaskNode()
+        task_node.line, task_node.column = node_position(task_data, line_offset, column_offset)
+        end = last_line(task_data)
+        task_node.end_line = end + line_offset + 1 if end >= 0 else task_node.line
         
-        for task_data in tasks_data:
-            task_node = TaskNode()
-            
-            if 'name' in task_data:
-                task_node.name = task_data['name']
-            
-            # Определяем модуль и его параметры
-            for key, value in task_data.items():
-                if key not in ['name', 'when', 'loop', 'register', 'notify']:
-                    task_node.module = key
-                    task_node.parameters = value
-                    break
-            
-            if 'when' in task_data:
-                task_node.when = self._build_expression(task_data['when'])
-
-            if 'changed_when' in task_data:
-                task_node.changed_when = self._build_expression(task_data['changed_when'])
-            
-            if 'loop' in task_data:
-                task_node.loop = self._build_expression(task_data['loop'])
-            
-            if 'register' in task_data:
-                task_node.register = task_data['register']
-            
-            if 'notify' in task_data:
-                task_node.notify = task_data['notify'] if isinstance(task_data['notify'], list) else [task_data['notify']]
-            
-            tasks.append(task_node)
-        
-        return tasks
+        if 'name' in task_data:
+            task_node.name = self._value(task_data['name'])
+        
+        # Определяем модуль и его параметры
+        for key, value in task_data.items():
+            if key not in ['name', 'when', 'loop', 'register', 'notify']:
+                task_node.module = sys.intern(str(key)) if self.compact else key
+                task_node.module_id = canonical_module(key)
+                task_node.parameters = self._value(value)
+                break
+        
+        if 'when' in task_data:
+            task_node.when = self._build_expression(
+                task_data['when'], value_position(task_data, 'when', line_offset, column_offset),
+                line_offset, column_offset)
+
+        if 'changed_when' in task_data:
+            task_node.changed_when = self._build_expression(
+                task_data['changed_when'], value_position(task_data, 'changed_when', line_offset, column_offset),
+                line_offset, column_offset)
+        
+        if 'loop' in task_data:
+            task_node.loop = self._build_expression(
+                task_data['loop'], value_position(task_data, 'loop', line_offset, column_offset),
+                line_offset, column_offset)
+        
+        if 'register' in task_data:
+            task_node.register = self._value(task_data['register'])
+        
+        if 'notify' in task_data:
+            notify = self._value(task_data['notify'])
+            task_node.notify = notify if isinstance(notify, list) else [notify]
+        
+        return task_node
     
-    def _build_expression(self, expression_data: Any) -> ExpressionNode:
-        """Строит узел выражения из данных"""
+    def _build_expression(self, expression_data: Any, position: Tuple[int, int] = (0, 0),
+                          line_offset: int = 0, column_offset: int = 0) -> ExpressionNode:
+        """Строит узел выражения из данных (position - строка и колонка значения)"""
+        line, column = position
         if isinstance(expression_data, (str, int, float, bool)):
             # Простой литерал
             return ExpressionNode(
+                line=line,
+                column=column,
                 expression_type='literal',
-                value=expression_data
+                value=self._value(expression_data)
             )
         elif isinstance(expression_data, dict):
             # Сложное выражение
             return ExpressionNode(
+                line=line,
+                column=column,
                 expression_type='complex',
                 value=str(expression_data)
             )
         elif isinstance(expression_data, list):
             # Список выражений
             return ExpressionNode(
+                line=line,
+                column=column,
                 expression_type='list',
-                value=[self._build_expression(item) for item in expression_data]
+                value=[self._build_expression(item, value_position(expression_data, index, line_offset, column_offset),
+                                             line_offset, column_offset)
+                       for index, item in enumerate(expression_data)]
             )
         else:
             # Неизвестный тип выражения
             return ExpressionNode(
+                line=line,
+                column=column,
                 expression_type='unknown',
                 value=str(expression_data)
             )
@@ -114,28 +313,64 @@ class ASTBuilder:
         variables = {}
         
         for name, value in vars_data.items():
+            line, column = value_position(vars_data, name)
+            if self.compact and isinstance(name, str):
+                name = sys.intern(str(name))
             variables[name] = VariableNode(
+                line=line,
+                column=column,
                 name=name,
-                value=value
+                value=self._value(value)
             )
         
         return variables
 
+    def _build_prompts(self, prompts_data: Any) -> Dict[str, VariableNode]:
+        """Строит словарь переменных vars_prompt: элементы списка с ключами name и prompt"""
+        prompts = {}
+        for index, prompt in enumerate(self._items(prompts_data)):
+            if not isinstance(prompt, dict) or not prompt.get('name'):
+                continue
+            line, column = node_position(prompt)
+            name = self._value(prompt['name'])
+            if self.compact and isinstance(name, str):
+                name = sys.intern(str(name))
+            prompts[name] = VariableNode(line=line, column=column, name=name,
+                                         value=self._value(prompt.get('prompt', '')))
+        return prompts
+
 def print_ast(ast_nodes: List[PlayNode], indent: int = 0):
     """Рекурсивная функция для печати AST"""
     for play in ast_nodes:
-        print('  ' * indent + f"Play: {play.name}")
-        print('  ' * (indent + 1) + f"Hosts: {play.hosts}")
+        if play.tasks_file:
+            print('  ' * indent + "Tasks file:")
+        else:
+            print('  ' * indent + f"Play: {play.name}")
+            print('  ' * (indent + 1) + f"Hosts: {play.hosts}")
         
         if play.vars:
             print('  ' * (indent + 1) + "Variables:")
             for var_name, var_node in play.vars.items():
                 print('  ' * (indent + 2) + f"{var_name}: {var_node.value}")
+
+        if play.prompts:
+            print('  ' * (indent + 1) + "Vars prompt:")
+            for prompt_name, prompt_node in play.prompts.items():
+                print('  ' * (indent + 2) + f"{prompt_name}: {prompt_node.value}")
         
-        if play.tasks:
-            print('  ' * (indent + 1) + "Tasks:")
-            for task in play.tasks:
+        table = play.table
+        for section, key in enumerate(SECTIONS):
+            if section == HANDLERS:
+                continue
+            tasks = table.section_tasks(section) if table is not None else (play.tasks if section == TASKS else [])
+            if not tasks:
+                continue
+            print('  ' * (indent + 1) + f"{key.capitalize()}:")
+            for task in tasks:
                 print('  ' * (indent + 2) + f"Task: {task.name}")
+                if table is not None:
+                    for block, part in table.block_chain(task):
+                        print('  ' * (indent + 3) + f"Block: {block.name} ({part})")
                 print('  ' * (indent + 3) + f"Module: {task.module}")
                 print('  ' * (indent + 3) + f"Parameters: {task.parameters}")
                 
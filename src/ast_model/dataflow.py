@@ -0,0 +1,261 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .nodes import PlayNode, TaskNode
+from .facts import TaskFacts
+from .templates import analyze_template
+
+# Анализ потоков недоверенных данных (taint) внутри плейбука.
+#
+# Источники - значения, которые задает не автор плейбука: переменные
+# vars_prompt и результаты (register) задач модулей SOURCE_MODULES - ввод
+# pause, ответы uri, содержимое файлов slurp. Каждой переменной-источнику
+# назначается бит (один на имя: register той же переменной в другой задаче
+# бит не добавляет, поэтому ширина множеств не растет с числом задач);
+# множество источников, от которых зависит переменная, - целое число
+# (битовое множество произвольной длины).
+#
+# Определения переменных - vars плейбука, set_fact и register задач. Значение
+# определения зависит от переменных, подставленных в его шаблоны без
+# экранирующего фильтра (templates.TemplateInfo.unfiltered).
+# vars плейбука вычисляются лениво и могут ссылаться друг на друга в любом
+# порядке: их биты распространяются по графу определение-использование
+# алгоритмом рабочего списка до неподвижной точки. set_fact и register
+# действуют с места задачи: задачи таблицы проходятся один раз в порядке
+# выполнения, определение заменяет предыдущее (set_fact под условием when -
+# дополняет его: задача может быть пропущена). Переменная цикла item
+# зависит от переменных выражения loop задачи.
+#
+# Приемники - команды задач SINK_MODULES. Для каждой переменной команды,
+# зависящей от источников, строится путь: источник, цепочка определений,
+# задача-приемник. Время анализа линейно по числу задач и определений
+# (операции с битовыми множествами - по числу источников в словах).
+# Переменные ролей, подключаемых файлов задач, vars задач и inventory не
+# учитываются.
+
+SOURCE_MODULES = {
+    'pause': 'ввод пользователя',
+    'uri': 'ответ HTTP-запроса',
+    'slurp': 'содержимое удаленного файла',
+}
+SINK_MODULES = frozenset(['command', 'shell', 'script', 'raw'])
+
+LOOP_VARIABLE = 'item'
+
+# Ключи set_fact, не являющиеся переменными
+_SET_FACT_OPTIONS = frozenset(['cacheable'])
+
+
+class Definition:
+    """Определение переменной: источник, vars плейбука, set_fact, register или item"""
+
+    __slots__ = ('kind', 'name', 'node', 'taint', 'origin', 'parents')
+
+    def __init__(self, kind: str, name: str, node: Any, origin: int = 0):
+        self.kind = kind  # 'vars_prompt', 'vars', 'set_fact', 'register', 'loop'
+        self.name = name
+        self.node = node  # VariableNode или TaskNode определения
+        self.taint = origin  # Биты источников
+        self.origin = origin  # Бит самого определения, если оно - источник
+        # (биты, определение): откуда впервые пришли эти биты; по ним восстанавливается путь
+        self.parents: List[Tuple[int, 'Definition']] = []
+
+    @property
+    def line(self) -> int:
+        return self.node.line if self.node is not None else 0
+
+    def merge(self, other: 'Definition') -> bool:
+        """Добавляет биты other; True - появились новые"""
+        new = other.taint & ~self.taint
+        if not new:
+            return False
+        self.taint |= new
+        self.parents.append((new, other))
+        return True
+
+    def __repr__(self) -> str:
+        return f"Definition({self.kind!r}, {self.name!r}, line={self.line})"
+
+
+class TaintFlow:
+    """Поток недоверенных данных от источника в команду задачи"""
+
+    __slots__ = ('task', 'variable', 'steps', 'sources')
+
+    def __init__(self, task: TaskNode, variable: str, steps: List[Definition], sources: int):
+        self.task = task  # Задача-приемник
+        self.variable = variable  # Переменная шаблона команды
+        self.steps = steps  # Определения от источника до переменной команды
+        self.sources = sources  # Число переменных-источников, от которых зависит переменная
+
+    @property
+    def source(self) -> Definition:
+        return self.steps[0]
+
+    def __repr__(self) -> str:
+        return f"TaintFlow({self.variable!r}, steps={self.steps!r})"
+
+
+def _root(path: str) -> str:
+    # Имя переменной пути шаблона: item для item.path, users для users[0]
+    return path.split('.', 1)[0].split('[', 1)[0]
+
+
+def _strings(value: Any) -> Iterator[str]:
+    # Строки значения (вложенные словари и списки - рекурсивно)
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def _expression_strings(node: Any) -> Iterator[str]:
+    # Строки выражения (loop и т.п.)
+    if node is None:
+        return
+    if node.expression_type == 'list':
+        for item in node.value:
+            yield from _expression_strings(item)
+    elif isinstance(node.value, str):
+        yield node.value
+
+
+def _used_names(strings: Iterator[str]) -> List[str]:
+    # Переменные, подставленные в строки без экранирующего фильтра
+    names: List[str] = []
+    for text in strings:
+        for path in analyze_template(text).unfiltered:
+            name = _root(path)
+            if name not in names:
+                names.append(name)
+    return names
+
+
+class TaintAnalysis:
+    """Потоки недоверенных данных одного плейбука (ast_model.nodes.PlayNode)"""
+
+    def __init__(self, play: PlayNode):
+        self.play = play
+        self.source_bits: Dict[Tuple[str, str], int] = {}  # (вид, имя) источника -> номер бита
+        self.flows: List[TaintFlow] = []
+        self._environment: Dict[str, Definition] = {}
+
+    def run(self) -> List[TaintFlow]:
+        self._play_variables()
+        self._tasks()
+        return self.flows
+
+    def _source(self, kind: str, name: str, node: Any) -> Definition:
+        bit = self.source_bits.setdefault((kind, name), len(self.source_bits))
+        return Definition(kind, name, node, 1 << bit)
+
+    def _play_variables(self):
+        # vars плейбука: неподвижная точка рабочим списком по графу использований
+        environment = self._environment
+        for name, prompt in self.play.prompts.items():
+            environment[name] = self._source('vars_prompt', name, prompt)
+
+        users: Dict[str, List[Definition]] = {}
+        for name, variable in self.play.vars.items():
+            if name in environment:
+                continue  # vars_prompt приоритетнее vars
+            definition = Definition('vars', name, variable)
+            environment[name] = definition
+            for used in _used_names(_strings(variable.value)):
+                users.setdefault(used, []).append(definition)
+
+        worklist = [definition for definition in environment.values() if definition.taint]
+        while worklist:
+            definition = worklist.pop()
+            for user in users.get(definition.name, ()):
+                if user is not definition and user.merge(definition):
+                    worklist.append(user)
+
+    def _lookup(self, name: str, loop: Optional[Definition]) -> Optional[Definition]:
+        if loop is not None and name == LOOP_VARIABLE:
+            return loop
+        return self._environment.get(name)
+
+    def _derive(self, definition: Definition, strings: Iterator[str], loop: Optional[Definition]) -> Definition:
+        # Биты переменных, от которых зависят строки значения определения
+        for name in _used_names(strings):
+            used = self._lookup(name, loop)
+            if used is not None and used is not definition:
+                definition.merge(used)
+        return definition
+
+    def _tasks(self):
+        # set_fact и register - по порядку выполнения задач
+        table = self.play.table
+        tasks = table.tasks if table is not None else self.play.tasks
+        environment = self._environment
+        for row, task in enumerate(tasks):
+            loop = None
+            if task.loop is not None:
+                loop = self._derive(Definition('loop', LOOP_VARIABLE, task), _expression_strings(task.loop), None)
+
+            if task.module_id in SINK_MODULES:
+                self._sink(task, loop)
+
+            if task.module_id == 'set_fact' and isinstance(task.parameters, dict):
+                conditional = task.when is not None or (table is not None and bool(table.conditions[row]))
+                for name, value in task.parameters.items():
+                    if name in _SET_FACT_OPTIONS:
+                        continue
+                    definition = self._derive(Definition('set_fact', name, task), _strings(value), loop)
+                    previous = environment.get(name)
+                    if conditional and previous is not None:
+                        definition.merge(previous)
+                    environment[name] = definition
+
+            if task.register:
+                name = str(task.register)
+                if task.module_id in SOURCE_MODULES:
+                    environment[name] = self._source('register', name, task)
+                else:
+                    # Результат задачи заменяет прежнее значение, даже если задача пропущена
+                    environment[name] = Definition('register', name, task)
+
+    def _sink(self, task: TaskNode, loop: Optional[Definition]):
+        # Отдельный TaskFacts: кеш task.facts движок сбрасывает только после проверки задачи
+        for path in TaskFacts(task).command_template.unfiltered:
+            definition = self._lookup(_root(path), loop)
+            if definition is None or not definition.taint:
+                continue
+            taint = definition.taint
+            bit = (taint & -taint).bit_length() - 1
+            self.flows.append(TaintFlow(task, path, self._path(definition, bit), bin(taint).count('1')))
+
+    def _path(self, definition: Definition, bit: int) -> List[Definition]:
+        # Определения от источника с битом bit до definition (биты приходят раньше по времени: путь без циклов)
+        mask = 1 << bit
+        steps = [definition]
+        while not definition.origin & mask:
+            parent = next((parent for bits, parent in definition.parents if bits & mask), None)
+            if parent is None:
+                break
+            steps.append(parent)
+            definition = parent
+        return steps[::-1]
+
+
+def taint_flows(play: PlayNode) -> List[TaintFlow]:
+    """Потоки недоверенных данных от источников в команды задач плейбука"""
+    return TaintAnalysis(play).run()
+
+
+def describe_step(definition: Definition) -> str:
+    """Шаг пути для сообщения: вид определения, имя переменной и строка"""
+    if definition.kind == 'vars_prompt':
+        text = f"vars_prompt '{definition.name}'"
+    elif definition.kind == 'register':
+        module = definition.node.module_id
+        origin = SOURCE_MODULES.get(module)
+        text = f"register '{definition.name}' ({module}: {origin})" if origin else f"register '{definition.name}'"
+    elif definition.kind == 'loop':
+        text = f"loop → {definition.name}"
+    else:
+        text = f"{definition.kind} '{definition.name}'"
+    return f"{text}, строка {definition.line}" if definition.line else text
@@ -0,0 +1,101 @@
+from typing import Any
+from .templates import TemplateInfo, analyze_template
+
+# Производные данные задачи, которые нужны сразу нескольким правилам:
+# строка команды, ее нижний регистр, шаблон команды, параметры одной строкой и пути.
+# Значения вычисляются при первом обращении и кешируются; объект доступен
+# через TaskNode.facts и сбрасывается движком после обработки задачи.
+
+_MISSING = object()
+
+COMMAND_KEYS = ('cmd', 'command', '_raw_params')
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+class TaskFacts:
+    """Лениво вычисляемое и кешируемое представление задачи для правил"""
+
+    __slots__ = ('_parameters', '_command', '_command_lower', '_command_template',
+                 '_parameters_text', '_parameters_text_lower')
+
+    def __init__(self, task: Any):
+        self._parameters = task.parameters
+        self._command = _MISSING
+        self._command_lower = _MISSING
+        self._command_template = _MISSING
+        self._parameters_text = _MISSING
+        self._parameters_text_lower = _MISSING
+
+    @property
+    def command(self) -> str:
+        """Команда задачи: cmd, command или _raw_params (либо строка параметров)"""
+        if self._command is _MISSING:
+            params = self._parameters
+            command = ''
+            if params:
+                if isinstance(params, dict):
+                    for key in COMMAND_KEYS:
+                        command = params.get(key)
+                        if command:
+                            break
+                elif isinstance(params, str):
+                    command = params
+            self._command = str(command) if command else ''
+        return self._command
+
+    @property
+    def command_lower(self) -> str:
+        if self._command_lower is _MISSING:
+            self._command_lower = self.command.lower()
+        return self._command_lower
+
+    @property
+    def command_template(self) -> TemplateInfo:
+        """Переменные и фильтры шаблона Jinja2 в команде (см. templates.analyze_template)"""
+        if self._command_template is _MISSING:
+            self._command_template = analyze_template(self.command)
+        return self._command_template
+
+    @property
+    def parameters_text(self) -> str:
+        """Все параметры одной строкой вида 'ключ=значение ...'"""
+        if self._parameters_text is _MISSING:
+            params = self._parameters
+            if not params:
+                self._parameters_text = ''
+            elif isinstance(params, dict):
+                self._parameters_text = " ".join([f"{k}={v}" for k, v in params.items()])
+            else:
+                self._parameters_text = str(params)
+        return self._parameters_text
+
+    @property
+    def parameters_text_lower(self) -> str:
+        if self._parameters_text_lower is _MISSING:
+            self._parameters_text_lower = self.parameters_text.lower()
+        return self._parameters_text_lower
+
+    def _param(self, key: str) -> str:
+        params = self._parameters
+        if isinstance(params, dict):
+            return _text(params.get(key))
+        return ''
+
+    @property
+    def dest(self) -> str:
+        return self._param('dest')
+
+    @property
+    def path(self) -> str:
+        return self._param('path')
+
+    @property
+    def src(self) -> str:
+        return self._param('src')
+
+    @property
+    def url(self) -> str:
+        return self._param('url')
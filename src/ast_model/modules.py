@@ -0,0 +1,33 @@
+from typing import Any, Dict, List
+
+# Канонические идентификаторы модулей Ansible.
+# Короткое имя и FQCN встроенного модуля (command, ansible.builtin.command,
+# ansible.legacy.command) считаются одним и тем же модулем.
+
+BUILTIN_PREFIXES = ('ansible.builtin.', 'ansible.legacy.')
+
+_canonical_cache: Dict[str, str] = {}
+
+
+def canonical_module(name: Any) -> str:
+    """Возвращает канонический идентификатор модуля (короткое имя для встроенных модулей)"""
+    if not name:
+        return ""
+    name = str(name)
+    module_id = _canonical_cache.get(name)
+    if module_id is None:
+        module_id = name
+        for prefix in BUILTIN_PREFIXES:
+            if name.startswith(prefix):
+                module_id = name[len(prefix):]
+                break
+        _canonical_cache[name] = module_id
+    return module_id
+
+
+def build_module_index(tasks: List[Any]) -> Dict[str, List[Any]]:
+    """Строит индекс: канонический идентификатор модуля -> задачи в порядке следования"""
+    index: Dict[str, List[Any]] = {}
+    for task in tasks:
+        index.setdefault(task.module_id, []).append(task)
+    return index
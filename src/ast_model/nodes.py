@@ -1,33 +1,90 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Any, Optional, Union
+from .modules import canonical_module
+from .facts import TaskFacts
 
+# Узлы хранятся в __slots__, без словаря атрибутов у каждого экземпляра:
+# в больших AST их миллионы. dataclass(slots=True) появился только в
+# Python 3.10, поэтому класс со слотами пересоздается декоратором slotted.
+
+def slotted(cls):
+    """Пересоздает dataclass cls с __slots__ для собственных полей класса"""
+    own = tuple(f.name for f in fields(cls) if f.name in cls.__dict__.get('__annotations__', {}))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in own and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = own
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@slotted
 @dataclass
 class Node:
     """Базовый класс для всех узлов AST"""
+    # Позиция в документе: строка и колонка начала, последняя строка (с 1; 0 - неизвестна)
     line: int = 0
     column: int = 0
+    end_line: int = 0
 
+@slotted
 @dataclass
 class PlayNode(Node):
     """Узел, представляющий плейбук (play)"""
     name: str = ""
     hosts: str = ""
     vars: Dict[str, Any] = field(default_factory=dict)
+    prompts: Dict[str, 'VariableNode'] = field(default_factory=dict)  # vars_prompt: значение - текст запроса
     tasks: List['TaskNode'] = field(default_factory=list)
     handlers: List['TaskNode'] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)  # Имена ролей из roles:
+    import_playbook: str = ""  # Элемент вида "- import_playbook: other.yml"
+    tasks_file: bool = False  # Не плейбук, а файл задач (роль, include_tasks): задачи без заголовка
+    become: Optional[bool] = None  # become плейбука (None - не задан или шаблон)
+    # Плоская таблица задач всех разделов и блоков (ast_model.table.TaskTable);
+    # tasks - ее столбец задач, handlers - задачи раздела handlers
+    table: Any = field(default=None, repr=False, compare=False)
+    # Канонический идентификатор модуля -> задачи плейбука (заполняет ASTBuilder)
+    module_index: Dict[str, List['TaskNode']] = field(default_factory=dict, repr=False)
 
+@slotted
 @dataclass
 class TaskNode(Node):
     """Узел, представляющий задачу (task)"""
     name: str = ""
     module: str = ""
+    module_id: str = ""  # Каноническое имя модуля: 'command' для 'ansible.builtin.command'
     parameters: Dict[str, Any] = field(default_factory=dict)
     when: Optional['ExpressionNode'] = None
     changed_when: Optional['ExpressionNode'] = None
     loop: Optional['ExpressionNode'] = None
     register: Optional[str] = None
     notify: List[str] = field(default_factory=list)
+    _facts: Optional[TaskFacts] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.module and not self.module_id:
+            self.module_id = canonical_module(self.module)
 
+    @property
+    def facts(self) -> TaskFacts:
+        """Кешируемые производные данные задачи (команда, параметры строкой, пути)"""
+        if self._facts is None:
+            self._facts = TaskFacts(self)
+        return self._facts
+
+    def drop_facts(self):
+        self._facts = None
+
+@slotted
+@dataclass
+class BlockNode(Node):
+    """Узел блока задач (block/rescue/always); задачи блока - строки TaskTable"""
+    name: str = ""
+    when: Optional['ExpressionNode'] = None
+    become: Optional[bool] = None
+    part: str = ""  # Часть объемлющего блока (block, rescue, always), в которой лежит блок
+    parent: Optional['BlockNode'] = field(default=None, repr=False, compare=False)
+
+@slotted
 @dataclass
 class ExpressionNode(Node):
     """Узел, представляющий выражение (например, условие when)"""
@@ -38,11 +95,48 @@ class ExpressionNode(Node):
     right: Optional['ExpressionNode'] = None
     operator: Optional[str] = None
 
+@slotted
 @dataclass
 class VariableNode(Node):
     """Узел, представляющий переменную"""
     name: str = ""
     value: Any = None
 
+def shift_lines(node: Any, delta: int, start: int = 1):
+    """
+    Сдвигает на delta строки позиций узла и вложенных узлов (выражений,
+    переменных и запросов vars_prompt плейбука), начиная со строки start.
+    Задачи и обработчики плейбука не сдвигаются: ими управляет вызывающий
+    код (см. TaskTable.shift_lines).
+    """
+    if isinstance(node, list):
+        for item in node:
+            shift_lines(item, delta, start)
+        return
+    if isinstance(node, dict):
+        for item in node.values():
+            shift_lines(item, delta, start)
+        return
+    if not isinstance(node, Node):
+        return
+
+    if node.line >= start:
+        node.line += delta
+    if node.end_line >= start:
+        node.end_line += delta
+
+    if isinstance(node, PlayNode):
+        children = [node.vars, node.prompts]
+    elif isinstance(node, TaskNode):
+        children = [node.when, node.changed_when, node.loop]
+    elif isinstance(node, BlockNode):
+        children = [node.when]
+    elif isinstance(node, ExpressionNode):
+        children = [node.value, node.left, node.right]
+    else:
+        children = []
+    for child in children:
+        shift_lines(child, delta, start)
+
 # Псевдоним для типов выражений
 Expression = Union[ExpressionNode, VariableNode, str, int, float, bool]
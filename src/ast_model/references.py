@@ -0,0 +1,52 @@
+from typing import Any, List, Optional, Tuple
+
+# Ссылки плейбука или файла задач на другие файлы проекта:
+# import_playbook, роли (roles:, include_role, import_role) и файлы задач
+# (include_tasks, import_tasks, include). Ссылки возвращаются как записаны
+# в документе; пути разрешает scanner.project. Ссылки с шаблонами Jinja2
+# ({{ ... }}) статически не разрешаются и пропускаются.
+
+PLAYBOOK = 'playbook'
+ROLE = 'role'
+TASKS = 'tasks'
+
+INCLUDE_TASKS_MODULES = frozenset(['include_tasks', 'import_tasks', 'include'])
+INCLUDE_ROLE_MODULES = frozenset(['include_role', 'import_role'])
+
+# (вид ссылки, цель, строка, имя плейбука)
+Reference = Tuple[str, str, int, str]
+
+
+def _target(parameters: Any, key: str) -> Optional[str]:
+    if isinstance(parameters, dict):
+        parameters = parameters.get(key) or parameters.get('_raw_params')
+    if not isinstance(parameters, str):
+        return None
+    target = parameters.strip()
+    if not target or '{{' in target or '{%' in target:
+        return None
+    return target
+
+
+def play_references(play: Any) -> List[Reference]:
+    """Ссылки узла плейбука (или файла задач) на другие файлы в порядке документа"""
+    name = '' if play.tasks_file else str(play.name or '')
+    references: List[Reference] = []
+    if play.import_playbook:
+        target = _target(play.import_playbook, '')
+        if target:
+            references.append((PLAYBOOK, target, play.line, name))
+    for role in play.roles:
+        target = _target(role, '')
+        if target:
+            references.append((ROLE, target, play.line, name))
+    for task in play.tasks:
+        if task.module_id in INCLUDE_TASKS_MODULES:
+            kind, target = TASKS, _target(task.parameters, 'file')
+        elif task.module_id in INCLUDE_ROLE_MODULES:
+            kind, target = ROLE, _target(task.parameters, 'name')
+        else:
+            continue
+        if target:
+            references.append((kind, target, task.line, name))
+    return references
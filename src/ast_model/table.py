@@ -0,0 +1,165 @@
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from .nodes import BlockNode, ExpressionNode, TaskNode, shift_lines
+
+# Плоская таблица задач плейбука.
+#
+# Строка таблицы - задача (TaskNode) в порядке выполнения: pre_tasks, tasks,
+# post_tasks, handlers; задачи блоков (block/rescue/always) на любой глубине
+# вложенности - отдельные строки, сами блоки - узлы BlockNode в списке blocks.
+# Столбцы хранятся в массивах array: раздел, ближайший объемлющий блок и его
+# часть, действующий become. Условия when объемлющих блоков (от внешнего
+# к внутреннему) - кортеж, общий для всех строк одного блока.
+#
+# Движок и правила проходят таблицу одним циклом, без рекурсии по блокам;
+# PlayNode.tasks - столбец задач таблицы, PlayNode.handlers - задачи раздела
+# handlers. Контекст задачи правило получает через play.table.
+
+SECTIONS = ('pre_tasks', 'tasks', 'post_tasks', 'handlers')
+BLOCK_PARTS = ('block', 'rescue', 'always')
+
+PRE_TASKS, TASKS, POST_TASKS, HANDLERS = range(len(SECTIONS))
+
+# Значения столбца become
+BECOME_UNKNOWN = -1  # Не задан нигде в цепочке или задан шаблоном
+
+
+def flag(value: Any) -> Optional[bool]:
+    """Булево значение ключа вроде become (yes/no, true/false); None - не задано или шаблон"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ('yes', 'true', 'on', '1', 'y'):
+            return True
+        if text in ('no', 'false', 'off', '0', 'n'):
+            return False
+    return None
+
+
+class TaskTable:
+    """Задачи плейбука одной таблицей: строка - задача, столбцы - ее контекст"""
+
+    __slots__ = ('become', 'tasks', 'sections', 'blocks', 'parts', 'becomes', 'conditions',
+                 'block_nodes', '_block_conditions', '_block_becomes', '_rows')
+
+    def __init__(self, become: Optional[bool] = None):
+        self.become = become  # become плейбука
+        self.tasks: List[TaskNode] = []
+        self.sections = array('b')
+        self.blocks = array('i')  # Индекс ближайшего объемлющего блока в block_nodes; -1 - нет
+        self.parts = array('b')  # Часть этого блока (индекс в BLOCK_PARTS)
+        self.becomes = array('b')  # Действующий become: 1, 0 или BECOME_UNKNOWN
+        self.conditions: List[Tuple[ExpressionNode, ...]] = []
+        self.block_nodes: List[BlockNode] = []
+        self._block_conditions: List[Tuple[ExpressionNode, ...]] = []
+        self._block_becomes: List[Optional[bool]] = []
+        self._rows: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __getstate__(self):
+        # Индекс строк по id задач после загрузки из кеша недействителен
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_rows'}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._rows = None
+
+    def add_block(self, block: BlockNode, parent: int = -1) -> int:
+        """Добавляет блок, вложенный в блок с индексом parent; возвращает индекс блока"""
+        if parent >= 0:
+            block.parent = self.block_nodes[parent]
+            conditions = self._block_conditions[parent]
+            become = self._block_becomes[parent]
+        else:
+            conditions, become = (), self.become
+        if block.when is not None:
+            conditions = conditions + (block.when,)
+        if block.become is not None:
+            become = block.become
+        self.block_nodes.append(block)
+        self._block_conditions.append(conditions)
+        self._block_becomes.append(become)
+        return len(self.block_nodes) - 1
+
+    def append(self, task: TaskNode, section: int = TASKS, block: int = -1, part: int = 0,
+               become: Optional[bool] = None):
+        """
+        Добавляет строку задачи
+
+        :param section: Индекс раздела в SECTIONS
+        :param block: Индекс ближайшего объемлющего блока (-1 - задача вне блоков)
+        :param part: Часть блока (индекс в BLOCK_PARTS)
+        :param become: become самой задачи; None - наследуется от блоков и плейбука
+        """
+        if become is None:
+            become = self._block_becomes[block] if block >= 0 else self.become
+        self.tasks.append(task)
+        self.sections.append(section)
+        self.blocks.append(block)
+        self.parts.append(part)
+        self.becomes.append(BECOME_UNKNOWN if become is None else int(become))
+        self.conditions.append(self._block_conditions[block] if block >= 0 else ())
+        self._rows = None
+
+    def extend(self, other: 'TaskTable'):
+        """Добавляет строки и блоки другой таблицы (фрагмента того же плейбука)"""
+        offset = len(self.block_nodes)
+        self.block_nodes.extend(other.block_nodes)
+        self._block_conditions.extend(other._block_conditions)
+        self._block_becomes.extend(other._block_becomes)
+        self.tasks.extend(other.tasks)
+        self.sections.extend(other.sections)
+        self.blocks.extend(block + offset if block >= 0 else block for block in other.blocks)
+        self.parts.extend(other.parts)
+        self.becomes.extend(other.becomes)
+        self.conditions.extend(other.conditions)
+        self._rows = None
+
+    def section_tasks(self, section: int) -> List[TaskNode]:
+        """Задачи раздела в порядке строк"""
+        return [task for task, task_section in zip(self.tasks, self.sections) if task_section == section]
+
+    def row(self, task: TaskNode) -> int:
+        """Номер строки задачи; -1 - задачи нет в таблице"""
+        if self._rows is None:
+            self._rows = {id(node): index for index, node in enumerate(self.tasks)}
+        return self._rows.get(id(task), -1)
+
+    def section_of(self, task: TaskNode) -> str:
+        row = self.row(task)
+        return SECTIONS[self.sections[row]] if row >= 0 else ''
+
+    def conditions_of(self, task: TaskNode) -> Tuple[ExpressionNode, ...]:
+        """Условия when объемлющих блоков задачи (без собственного when задачи)"""
+        row = self.row(task)
+        return self.conditions[row] if row >= 0 else ()
+
+    def become_of(self, task: TaskNode) -> Optional[bool]:
+        """Действующий become задачи с учетом блоков и плейбука; None - неизвестен"""
+        row = self.row(task)
+        if row < 0 or self.becomes[row] == BECOME_UNKNOWN:
+            return None
+        return bool(self.becomes[row])
+
+    def block_chain(self, task: TaskNode) -> List[Tuple[BlockNode, str]]:
+        """Объемлющие блоки задачи от внешнего к внутреннему с частью блока, в которой лежит задача"""
+        row = self.row(task)
+        if row < 0 or self.blocks[row] < 0:
+            return []
+        block = self.block_nodes[self.blocks[row]]
+        chain = [(block, BLOCK_PARTS[self.parts[row]])]
+        while block.parent is not None:
+            chain.append((block.parent, block.part))
+            block = block.parent
+        return chain[::-1]
+
+    def shift_lines(self, delta: int, start: int = 1):
+        """Сдвигает строки позиций задач и блоков таблицы (см. nodes.shift_lines)"""
+        shift_lines(self.tasks, delta, start)
+        shift_lines(self.block_nodes, delta, start)
@@ -0,0 +1,255 @@
+import re
+import functools
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Анализ шаблонов Jinja2 в значениях задач (команды, аргументы).
+#
+# Шаблон разбирается лексером и парсером jinja2 (как его видит Ansible):
+# находятся переменные, на которые он ссылается ({{ ... }} и {% ... %},
+# в том числе вложенные выражения и атрибуты: item.path, hostvars['web'].ip),
+# и фильтры. Отдельно выделяются переменные, значения которых попадают в
+# результат шаблона без экранирующего фильтра (quote, int и т.п.): именно
+# они подставляются в команду как есть. Имена, объявленные в самом шаблоне
+# ({% for x in ... %}, {% set x = ... %}), переменными не считаются; вывод
+# переменной цикла считается выводом итерируемой переменной (users для
+# {% for x in users %}{{ x }}{% endfor %}).
+#
+# Результаты кешируются по тексту шаблона (LRU): одинаковые шаблоны,
+# повторяющиеся в тысячах задач, разбираются один раз. Шаблоны только из
+# простых выражений {{ путь | фильтр ... }} (самые частые) разбираются
+# регулярным выражением с тем же результатом, что и парсером jinja2,
+# который в несколько сотен раз медленнее.
+#
+# jinja2 - необязательная зависимость и импортируется при первом разборе.
+# Без нее и для текста, который jinja2 не разбирает (например, '{#' в команде
+# оболочки), переменные и фильтры выделяются регулярным выражением из {{ ... }}.
+
+TEMPLATE_CACHE_SIZE = 4096
+
+# Фильтры, после которых значение безопасно подставлять в команду оболочки
+SANITIZING_FILTERS = frozenset([
+    'quote', 'int', 'float', 'bool', 'length', 'count',
+    'hash', 'checksum', 'password_hash', 'b64encode',
+])
+
+EXPRESSION_PATTERN = re.compile(r'\{\{\s*([^}]+?)\s*\}\}')
+# {{ путь | фильтр | ... }}: путь из имени, атрибутов и постоянных индексов, фильтры без аргументов
+SIMPLE_EXPRESSION_PATTERN = re.compile(
+    r"\{\{-?\s*([A-Za-z_]\w*(?:\.[A-Za-z_]\w*|\[(?:0|[1-9]\d*)\]|\['[^'\\\]]*'\])*)\s*"
+    r"((?:\|\s*[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*\s*)*)-?\}\}", re.ASCII)
+# Имена, которые jinja2 разбирает как константы или которые всегда локальны
+_NOT_VARIABLES = frozenset(['true', 'false', 'none', 'True', 'False', 'None', 'loop'])
+FILTER_NAME_PATTERN = re.compile(r'^\s*([A-Za-z_][\w.]*)')
+
+_jinja: Any = None
+
+
+class TemplateInfo:
+    """Результат анализа шаблона (неизменяемый: разделяется кешем между задачами)"""
+
+    __slots__ = ('variables', 'filters', 'unfiltered', 'parsed')
+
+    def __init__(self, variables: Tuple[str, ...] = (), filters: Tuple[str, ...] = (),
+                 unfiltered: Tuple[str, ...] = (), parsed: bool = True):
+        self.variables = variables  # Переменные шаблона в порядке первого упоминания
+        self.filters = filters  # Имена фильтров
+        self.unfiltered = unfiltered  # Переменные, подставляемые в результат без экранирующего фильтра
+        self.parsed = parsed  # False - шаблон разобран регулярным выражением
+
+    def __bool__(self) -> bool:
+        return bool(self.variables)
+
+    def __repr__(self) -> str:
+        return (f"TemplateInfo(variables={self.variables!r}, filters={self.filters!r}, "
+                f"unfiltered={self.unfiltered!r}, parsed={self.parsed!r})")
+
+
+EMPTY = TemplateInfo()
+
+
+def is_template(text: Any) -> bool:
+    """Содержит ли строка выражения или инструкции Jinja2"""
+    return isinstance(text, str) and ('{{' in text or '{%' in text)
+
+
+def analyze_template(text: Any) -> TemplateInfo:
+    """Переменные и фильтры шаблона text (строки без {{ и {% - пустой результат)"""
+    if not is_template(text):
+        return EMPTY
+    return _analyze_cached(text)
+
+
+def template_cache_info() -> Any:
+    """Статистика кеша анализа шаблонов (functools.lru_cache.cache_info)"""
+    return _analyze_cached.cache_info()
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _analyze_cached(text: str) -> TemplateInfo:
+    info = _analyze_simple(text)
+    if info is not None:
+        return info
+    jinja = _load_jinja()
+    if jinja is not None:
+        environment, nodes = jinja
+        try:
+            tree = environment.parse(text)
+        except Exception:
+            pass
+        else:
+            return _TemplateWalker(nodes).analyze(tree)
+    return _analyze_with_pattern(text)
+
+
+def _load_jinja() -> Optional[Tuple[Any, Any]]:
+    # (окружение, модуль узлов) jinja2; None - jinja2 не установлен
+    global _jinja
+    if _jinja is None:
+        try:
+            from jinja2 import Environment, nodes
+            _jinja = (Environment(), nodes)
+        except ImportError:
+            _jinja = ()
+    return _jinja or None
+
+
+class _TemplateWalker:
+    # Обход дерева шаблона jinja2
+
+    def __init__(self, nodes: Any):
+        self.nodes = nodes
+        self.variables: List[str] = []
+        self.filters: List[str] = []
+        self.unfiltered: List[str] = []
+        self.local_names: Set[str] = set()
+        self.loop_sources: Dict[str, List[str]] = {}  # Переменная цикла -> пути итерируемых переменных
+
+    def analyze(self, tree: Any) -> TemplateInfo:
+        nodes = self.nodes
+        for node in tree.find_all((nodes.For, nodes.Assign, nodes.AssignBlock, nodes.Macro)):
+            targets = [node.target] if not isinstance(node, nodes.Macro) else node.args
+            for target in targets:
+                for name in target.find_all(nodes.Name) if not isinstance(target, nodes.Name) else [target]:
+                    self.local_names.add(name.name)
+                    if isinstance(node, nodes.For):
+                        self.loop_sources.setdefault(name.name, []).extend(self._sources(node.iter))
+        self.local_names.add('loop')
+        self._visit(tree, output=False, sanitized=False)
+        return TemplateInfo(tuple(self.variables), tuple(self.filters), tuple(self.unfiltered))
+
+    def _visit(self, node: Any, output: bool, sanitized: bool):
+        nodes = self.nodes
+        if isinstance(node, nodes.Output):
+            for child in node.nodes:
+                self._visit(child, True, sanitized)
+            return
+        if isinstance(node, (nodes.For, nodes.If)):
+            # Условие и итерируемое значение не подставляются в результат
+            for field in node.fields:
+                value = getattr(node, field)
+                in_output = output if field in ('body', 'else_', 'elif_') else False
+                for child in value if isinstance(value, list) else [value]:
+                    if isinstance(child, nodes.Node):
+                        self._visit(child, in_output, sanitized)
+            return
+        if isinstance(node, nodes.Filter):
+            if node.name not in self.filters:
+                self.filters.append(node.name)
+            if node.node is not None:
+                self._visit(node.node, output, sanitized or node.name in SANITIZING_FILTERS)
+            for child in self._arguments(node):
+                self._visit(child, output, sanitized)
+            return
+        path = self._path(node)
+        if path is not None:
+            root = path.split('.', 1)[0].split('[', 1)[0]
+            if root in self.local_names:
+                if output and not sanitized:
+                    for source in self.loop_sources.get(root, ()):
+                        if source not in self.unfiltered:
+                            self.unfiltered.append(source)
+                return
+            if path not in self.variables:
+                self.variables.append(path)
+            if output and not sanitized and path not in self.unfiltered:
+                self.unfiltered.append(path)
+            return
+        for child in node.iter_child_nodes():
+            self._visit(child, output, sanitized)
+
+    def _arguments(self, node: Any) -> Iterator[Any]:
+        yield from node.args
+        for keyword in node.kwargs:
+            yield keyword.value
+        for extra in (node.dyn_args, node.dyn_kwargs):
+            if extra is not None:
+                yield extra
+
+    def _sources(self, node: Any) -> List[str]:
+        # Пути переменных выражения (итерируемого значения цикла)
+        path = self._path(node)
+        if path is not None:
+            return [path]
+        return [name.name for name in node.find_all(self.nodes.Name) if name.ctx == 'load']
+
+    def _path(self, node: Any) -> Optional[str]:
+        # Путь переменной: имя, атрибуты и постоянные индексы (item.path, users[0]); None - не переменная
+        nodes = self.nodes
+        if isinstance(node, nodes.Name):
+            return node.name if node.ctx == 'load' else None
+        if isinstance(node, nodes.Getattr):
+            base = self._path(node.node)
+            return f"{base}.{node.attr}" if base is not None else None
+        if isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+            base = self._path(node.node)
+            return f"{base}[{node.arg.value!r}]" if base is not None else None
+        return None
+
+
+def _analyze_simple(text: str) -> Optional[TemplateInfo]:
+    # Шаблон только из простых выражений (см. SIMPLE_EXPRESSION_PATTERN); None - нужен парсер
+    if '{%' in text or '{#' in text:
+        return None
+    matches = SIMPLE_EXPRESSION_PATTERN.findall(text)
+    if len(matches) != text.count('{{'):
+        return None
+    variables: List[str] = []
+    filters: List[str] = []
+    unfiltered: List[str] = []
+    for path, chain in matches:
+        if path.split('.', 1)[0].split('[', 1)[0] in _NOT_VARIABLES:
+            return None
+        names = [name.strip() for name in chain.split('|')[1:]]
+        for name in names:
+            if name not in filters:
+                filters.append(name)
+        if path not in variables:
+            variables.append(path)
+        if not any(name in SANITIZING_FILTERS for name in names) and path not in unfiltered:
+            unfiltered.append(path)
+    return TemplateInfo(tuple(variables), tuple(filters), tuple(unfiltered))
+
+
+def _analyze_with_pattern(text: str) -> TemplateInfo:
+    # Приближенный анализ: выражения {{ ... }}, переменная - часть до первого '|'
+    variables: List[str] = []
+    filters: List[str] = []
+    unfiltered: List[str] = []
+    for expression in EXPRESSION_PATTERN.findall(text):
+        parts = expression.split('|')
+        variable = parts[0].strip()
+        names = []
+        for part in parts[1:]:
+            match = FILTER_NAME_PATTERN.match(part)
+            if match:
+                names.append(match.group(1))
+        for name in names:
+            if name not in filters:
+                filters.append(name)
+        if not variable:
+            continue
+        if variable not in variables:
+            variables.append(variable)
+        if not any(name in SANITIZING_FILTERS for name in names) and variable not in unfiltered:
+            unfiltered.append(variable)
+    return TemplateInfo(tuple(variables), tuple(filters), tuple(unfiltered), parsed=False)
@@ -0,0 +1,22 @@
+from .defaults import default_cache_dir, DEFAULT_MAX_BYTES
+
+# Сам кеш импортируется при первом обращении (PEP 562): для разбора
+# аргументов достаточно значений по умолчанию.
+_EXPORTS = {
+    'ResultCache': 'result_cache',
+    'content_hash': 'result_cache',
+    'file_content_hash': 'result_cache',
+    'rule_version': 'result_cache',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
+
+__all__ = ['ResultCache', 'content_hash', 'file_content_hash', 'default_cache_dir', 'rule_version',
+           'DEFAULT_MAX_BYTES']
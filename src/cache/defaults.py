@@ -0,0 +1,11 @@
+import os
+
+# Параметры кеша по умолчанию. Модуль без зависимостей: main импортирует его
+# для значений аргументов командной строки, не загружая сам кеш (json, hashlib).
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sast-yaml')
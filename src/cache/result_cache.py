@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .defaults import DEFAULT_MAX_BYTES
+
+# Постоянный кеш результатов анализа, адресуемый содержимым.
+#
+# Ключ результата - хеш содержимого файла и идентификатор правила; вместе с
+# результатом хранится хеш версии правила (исходный код модуля правила и общих
+# модулей движка). Если изменилось только одно правило, перезапускается только
+# оно, причем на AST из кеша, без повторного парсинга файла.
+# Для файла хранятся также ссылки на другие файлы проекта (см. scanner.project),
+# чтобы файл, все результаты которого в кеше, не приходилось разбирать ради них.
+# Размер кеша ограничен; при превышении удаляются давно не использованные файлы.
+# sqlite3, pickle и inspect импортируются при первом обращении к кешу,
+# чтобы запуски без кеша (и --help) не тратили время на их загрузку.
+
+ANALYZER_VERSION = "1.0.0"
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, от которых зависит построенный AST
+AST_SOURCES = [
+    os.path.join('lexer_parser', 'ruamel_parser.py'),
+    os.path.join('lexer_parser', 'safe_parser.py'),
+    os.path.join('lexer_parser', 'documents.py'),
+    os.path.join('ast_model', 'builder.py'),
+    os.path.join('ast_model', 'nodes.py'),
+    os.path.join('ast_model', 'modules.py'),
+    os.path.join('ast_model', 'facts.py'),
+    os.path.join('ast_model', 'references.py'),
+    os.path.join('ast_model', 'table.py'),
+    os.path.join('ast_model', 'templates.py'),
+    os.path.join('ast_model', 'dataflow.py'),
+]
+
+# Общие модули, от которых зависит результат любого правила
+ENGINE_SOURCES = [
+    os.path.join('rules_engine', 'rule.py'),
+    os.path.join('rules_engine', 'engine.py'),
+    os.path.join('rules_engine', 'matcher.py'),
+    os.path.join('rules_engine', 'fingerprint.py'),
+    os.path.join('rules_engine', 'columns.py'),
+]
+
+
+def content_hash(data: bytes, variant: str = '') -> str:
+    """Хеш содержимого файла; variant различает результаты разных настроек анализа"""
+    digest = hashlib.sha256()
+    if variant:
+        digest.update(variant.encode() + b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def file_content_hash(path: str, variant: str = '', chunk_size: int = 1024 * 1024) -> str:
+    """То же, что content_hash для содержимого файла, но без чтения файла в память целиком"""
+    digest = hashlib.sha256()
+    if variant:
+        digest.update(variant.encode() + b'\0')
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sources_digest(paths: Iterable[str], extra: Iterable[str] = ()) -> str:
+    digest = hashlib.sha256(ANALYZER_VERSION.encode())
+    digest.update(sys.version.encode())
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(path.encode())
+    for value in extra:
+        digest.update(value.encode())
+    return digest.hexdigest()
+
+
+_digests: Dict[str, str] = {}
+
+
+def ast_version() -> str:
+    """Хеш версии построителя AST"""
+    if 'ast' not in _digests:
+        _digests['ast'] = _sources_digest(os.path.join(_SRC_DIR, p) for p in AST_SOURCES)
+    return _digests['ast']
+
+
+def rule_version(rule: Any) -> str:
+    """Хеш версии правила: исходный код правила, общих модулей движка и построителя AST"""
+    rule_class = type(getattr(rule, 'rule', rule))
+    key = f"{rule_class.__module__}.{rule_class.__qualname__}"
+    if key not in _digests:
+        import inspect
+        try:
+            rule_file = inspect.getsourcefile(rule_class)
+        except TypeError:
+            rule_file = None
+        paths = [os.path.join(_SRC_DIR, p) for p in ENGINE_SOURCES]
+        if rule_file:
+            paths.append(rule_file)
+        _digests[key] = _sources_digest(paths, extra=(ast_version(), key))
+    return _digests[key]
+
+
+class ResultCache:
+    """Кеш нарушений по (содержимое файла, правило) и построенных AST на SQLite"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.path = os.path.join(cache_dir, 'results.sqlite3')
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[Any] = None  # sqlite3.Connection
+
+    def _connect(self) -> Any:
+        if self._connection is None:
+            import sqlite3
+            os.makedirs(self.cache_dir, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=60)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' file_hash TEXT NOT NULL, rule_id TEXT NOT NULL, rule_hash TEXT NOT NULL,'
+                ' data TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL,'
+                ' PRIMARY KEY (file_hash, rule_id))'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS asts ('
+                ' file_hash TEXT PRIMARY KEY, ast_hash TEXT NOT NULL,'
+                ' data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                ' file_hash TEXT PRIMARY KEY, ast_hash TEXT NOT NULL,'
+                ' data TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+            connection.execute('CREATE INDEX IF NOT EXISTS asts_last_used ON asts (last_used)')
+            connection.execute('CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)')
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get_results(self, file_hash: str, rules: List[Any]) -> Dict[str, List[List[Dict[str, Any]]]]:
+        """
+        Возвращает сохраненные нарушения актуальных версий правил для файла
+
+        :return: rule_id -> нарушения правила по плейбукам файла
+        """
+        connection = self._connect()
+        rows = connection.execute(
+            'SELECT rule_id, rule_hash, data FROM results WHERE file_hash = ?', (file_hash,)
+        ).fetchall()
+        stored = {rule_id: (rule_hash, data) for rule_id, rule_hash, data in rows}
+
+        found = {}
+        for rule in rules:
+            entry = stored.get(rule.id)
+            if entry is not None and entry[0] == rule_version(rule):
+                found[rule.id] = json.loads(entry[1])
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if found:
+            connection.execute('UPDATE results SET last_used = ? WHERE file_hash = ?', (time.time(), file_hash))
+            connection.commit()
+        return found
+
+    def put_results(self, file_hash: str, results: Dict[str, Tuple[Any, List[List[Dict[str, Any]]]]]):
+        """Сохраняет нарушения: rule_id -> (правило, нарушения по плейбукам)"""
+        now = time.time()
+        rows = []
+        for rule_id, (rule, per_play) in results.items():
+            data = json.dumps(per_play, ensure_ascii=False, default=str)
+            rows.append((file_hash, rule_id, rule_version(rule), data, len(data), now))
+        connection = self._connect()
+        connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', rows)
+        connection.commit()
+
+    def get_ast(self, file_hash: str) -> Optional[List[Any]]:
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT data FROM asts WHERE file_hash = ? AND ast_hash = ?', (file_hash, ast_version())
+        ).fetchone()
+        if row is None:
+            return None
+        import pickle
+        try:
+            ast = pickle.loads(row[0])
+        except Exception:
+            return None
+        connection.execute('UPDATE asts SET last_used = ? WHERE file_hash = ?', (time.time(), file_hash))
+        connection.commit()
+        return ast
+
+    def put_ast(self, file_hash: str, ast: List[Any]):
+        import pickle
+        try:
+            data = pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # AST с непредусмотренными объектами просто не кешируется
+            return
+        connection = self._connect()
+        connection.execute('INSERT OR REPLACE INTO asts VALUES (?, ?, ?, ?, ?)',
+                           (file_hash, ast_version(), data, len(data), time.time()))
+        connection.commit()
+
+    def get_file_info(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Сведения о файле, извлеченные из AST (ссылки на другие файлы и т.п.)"""
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT data FROM files WHERE file_hash = ? AND ast_hash = ?', (file_hash, ast_version())
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE files SET last_used = ? WHERE file_hash = ?', (time.time(), file_hash))
+        connection.commit()
+        return json.loads(row[0])
+
+    def put_file_info(self, file_hash: str, info: Dict[str, Any]):
+        data = json.dumps(info, ensure_ascii=False, default=str)
+        connection = self._connect()
+        connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                           (file_hash, ast_version(), data, len(data), time.time()))
+        connection.commit()
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока размер кеша превышает лимит"""
+        connection = self._connect()
+        total = sum(connection.execute(f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+                    for table in ('results', 'asts', 'files'))
+        if total <= self.max_bytes:
+            return
+
+        # Освобождаем с запасом, чтобы не вытеснять записи на каждом запуске
+        target = int(self.max_bytes * 0.9)
+        rows = connection.execute(
+            "SELECT 'results', rowid, size, last_used FROM results "
+            "UNION ALL SELECT 'asts', rowid, size, last_used FROM asts "
+            "UNION ALL SELECT 'files', rowid, size, last_used FROM files ORDER BY last_used"
+        ).fetchall()
+        for table, rowid, size, _ in rows:
+            if total <= target:
+                break
+            connection.execute(f'DELETE FROM {table} WHERE rowid = ?', (rowid,))
+            total -= size
+        connection.commit()
+        connection.execute('VACUUM')
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,3 @@
+from .backends import PARSER_BACKENDS, DEFAULT_PARSER, create_parser
+
+__all__ = ['PARSER_BACKENDS', 'DEFAULT_PARSER', 'create_parser']
@@ -0,0 +1,26 @@
+import sys
+
+# Выбор реализации парсера YAML (--parser):
+#   rt   - ruamel.yaml в режиме round-trip (комментарии, кавычки, форматирование)
+#   safe - безопасный загрузчик ruamel.yaml на Python
+#   c    - безопасный загрузчик на C-расширении ruamel.yaml (libyaml);
+#          если расширение не установлено, используется safe
+# Все реализации возвращают словари и списки с позициями в атрибуте lc.
+
+PARSER_BACKENDS = ('rt', 'safe', 'c')
+DEFAULT_PARSER = 'rt'
+
+
+def create_parser(name: str = DEFAULT_PARSER):
+    """Создает парсер с методами parse(text, quiet=False), parse_file(path) и parse_documents(stream)"""
+    if name == 'rt':
+        from .ruamel_parser import RuamelYAMLParser
+        return RuamelYAMLParser()
+
+    if name in ('safe', 'c'):
+        from .safe_parser import SafeYAMLParser, C_LOADER_AVAILABLE
+        if name == 'c' and not C_LOADER_AVAILABLE:
+            print("⚠️  C-расширение ruamel.yaml не установлено, используется парсер safe", file=sys.stderr)
+        return SafeYAMLParser(pure=(name == 'safe'))
+
+    raise ValueError(f"Неизвестный парсер: {name} (доступны: {', '.join(PARSER_BACKENDS)})")
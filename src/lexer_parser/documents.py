@@ -0,0 +1,82 @@
+from typing import Any, Iterable, Iterator
+from ruamel.yaml.events import SequenceEndEvent, SequenceStartEvent, StreamEndEvent
+from ruamel.yaml.nodes import SequenceNode
+
+# Потоковая загрузка многодокументных YAML-файлов (документы через '---').
+#
+# В отличие от YAML.load_all, документ-список (плейбук) не строится целиком:
+# элементы верхнего уровня (плейбуки) компонуются и конструируются по одному,
+# так что в памяти одновременно находится только текущий плейбук. Позиции
+# (атрибут lc) отсчитываются от начала файла, а не документа.
+#
+# C-загрузчик компонует документ целиком внутри расширения, поэтому для него
+# потоковая обработка идет по документам.
+
+
+def iter_documents(yaml: Any, stream: Any) -> Iterator[Iterable[Any]]:
+    """
+    Выдает документы потока по одному
+
+    Документ-список выдается как итератор по его элементам, который нужно
+    пройти до перехода к следующему документу; пустой документ - пустой список;
+    остальные документы - построенные данные как есть.
+
+    :param yaml: Настроенный объект ruamel.yaml.YAML
+    :param stream: Строка или открытый текстовый файл
+    """
+    constructor, parser = yaml.get_constructor_parser(stream)
+    try:
+        if parser is constructor:
+            # C-загрузчик: парсер, компоновщик и конструктор в одном объекте
+            while constructor.check_data():
+                document = constructor.get_data()
+                yield document if document is not None else []
+            return
+
+        composer = yaml.composer
+        composer.check_node()  # Пропускает начало потока
+        while not parser.check_event(StreamEndEvent):
+            composer.anchors = {}
+            parser.get_event()  # Начало документа
+            if _is_plain_sequence(parser.peek_event()):
+                items = _iter_items(composer, constructor)
+                yield items
+                # Элементы, которые не запросил потребитель, все равно нужно пройти
+                for _ in items:
+                    pass
+            else:
+                document = constructor.construct_document(composer.compose_node(None, None))
+                yield document if document is not None else []
+            parser.get_event()  # Конец документа
+    finally:
+        parser.dispose()
+        for component in ('reader', 'scanner'):
+            try:
+                getattr(getattr(yaml, '_' + component), f'reset_{component}')()
+            except AttributeError:
+                pass
+
+
+def _is_plain_sequence(event: Any) -> bool:
+    # Список без якоря и явного тега: его элементы можно конструировать по отдельности
+    return (isinstance(event, SequenceStartEvent) and event.anchor is None
+            and (event.ctag is None or str(event.ctag) == '!'))
+
+
+def _iter_items(composer: Any, constructor: Any) -> Iterator[Any]:
+    # Аналог Composer.compose_sequence_node, но без накопления элементов в узле
+    start_event = composer.parser.get_event()
+    node = SequenceNode(
+        composer.resolver.resolve(SequenceNode, None, start_event.implicit),
+        [],
+        start_event.start_mark,
+        None,
+        flow_style=start_event.flow_style,
+        comment=start_event.comment,
+    )
+    index = 0
+    while not composer.parser.check_event(SequenceEndEvent):
+        item = composer.compose_node(node, index)
+        yield constructor.construct_document(item)
+        index += 1
+    composer.parser.get_event()
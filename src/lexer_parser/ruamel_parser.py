@@ -1,32 +1,56 @@
-import os
 import sys
 from ruamel.yaml import YAML
 from ruamel.yaml.composer import ComposerError
+from ruamel.yaml.constructor import RoundTripConstructor
+from ruamel.yaml.nodes import MappingNode, SequenceNode
 from ruamel.yaml.parser import ParserError
 from ruamel.yaml.scanner import ScannerError
+from .documents import iter_documents
 
 # Парсер YAML-файлов на основе ruamel.yaml
 
+
+class PlainTagConstructor(RoundTripConstructor):
+    """Round-trip конструктор, строящий значения с тегами Ansible как значения без тега"""
+
+    def construct_unknown(self, node):
+        # Теги Ansible (!vault, !unsafe и др.) и явный !!str: значение без учета тега,
+        # как в safe_parser (ruamel по умолчанию строит TaggedScalar, а у списков
+        # с тегом не сохраняет позиции элементов)
+        if isinstance(node, MappingNode):
+            return self.construct_yaml_map(node)
+        if isinstance(node, SequenceNode):
+            return self.construct_yaml_seq(node)
+        return self.construct_scalar(node)
+
+
+PlainTagConstructor.add_constructor(None, PlainTagConstructor.construct_unknown)
+
+
 class RuamelYAMLParser:
     def __init__(self):
         self.yaml = YAML()
+        self.yaml.Constructor = PlainTagConstructor
         self.yaml.preserve_quotes = True
         self.yaml.allow_duplicate_keys = False
     
-    def parse(self, yaml_text: str):
+    def parse(self, yaml_text: str, quiet: bool = False):
 
         # Парсит YAML-текст и возвращает структуру данных Python
         # :param yaml_text: Строка с YAML-содержимым
+        # :param quiet: Не выводить ошибку в stderr (ошибка ожидаема и обрабатывается вызывающим)
         # :return: Распарсенная структура данных
         # :raises: Exception при ошибках парсинга
         
         try:
             return self.yaml.load(yaml_text)
         except (ComposerError, ParserError, ScannerError) as e:
-            print(f"Ошибка парсинга YAML: {e}")
+            if not quiet:
+                print(f"Ошибка парсинга YAML: {e}", file=sys.stderr)
             raise
         except Exception as e:
-            print(f"Неизвестная ошибка: {e}")
+            if not quiet:
+                print(f"Неизвестная ошибка: {e}", file=sys.stderr)
             raise
     
     def parse_file(self, file_path: str):
@@ -39,13 +63,25 @@ class RuamelYAMLParser:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return self.yaml.load(f)
         except FileNotFoundError:
-            print(f"Файл не найден: {file_path}")
+            print(f"Файл не найден: {file_path}", file=sys.stderr)
             raise
         except (ComposerError, ParserError, ScannerError) as e:
-            print(f"Ошибка парсинга YAML в файле {file_path}: {e}")
+            print(f"Ошибка парсинга YAML в файле {file_path}: {e}", file=sys.stderr)
             raise
         except Exception as e:
-            print(f"Неизвестная ошибка при чтении файла {file_path}: {e}")
+            print(f"Неизвестная ошибка при чтении файла {file_path}: {e}", file=sys.stderr)
+            raise
+
+    def parse_documents(self, stream):
+
+        # Потоково парсит все документы YAML (см. documents.iter_documents)
+        # :param stream: Строка или открытый текстовый файл
+        # :return: Генератор документов; документ-список - итератор по плейбукам
+
+        try:
+            yield from iter_documents(self.yaml, stream)
+        except (ComposerError, ParserError, ScannerError) as e:
+            print(f"Ошибка парсинга YAML: {e}", file=sys.stderr)
             raise
 
 def print_structure(data, indent=0):
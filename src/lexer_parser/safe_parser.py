@@ -0,0 +1,156 @@
+import sys
+from typing import Any, Dict
+from ruamel.yaml import YAML
+from ruamel.yaml.constructor import SafeConstructor
+from ruamel.yaml.nodes import MappingNode, SequenceNode
+from .documents import iter_documents
+
+# Парсер YAML-файлов на основе безопасного загрузчика ruamel.yaml (typ='safe').
+#
+# В отличие от режима round-trip, загрузчик не сохраняет комментарии,
+# кавычки и форматирование, которые правилам не нужны, и может использовать
+# C-расширение ruamel.yaml (libyaml). Словари и списки документа получают
+# атрибут lc с позициями, совместимый с объектами ruamel: line/col узла,
+# key()/value() для ключей словаря и item() для элементов списка
+# (строки и колонки считаются с 0).
+
+try:
+    from _ruamel_yaml import CParser  # noqa: F401
+    C_LOADER_AVAILABLE = True
+except ImportError:
+    C_LOADER_AVAILABLE = False
+
+
+class LineCol:
+    """Позиции узла и его элементов"""
+
+    __slots__ = ('line', 'col', 'data')
+
+    def __init__(self, line: int, col: int):
+        self.line = line
+        self.col = col
+        self.data: Dict[Any, tuple] = {}
+
+    def key(self, k: Any) -> tuple:
+        position = self.data[k]
+        return position[0], position[1]
+
+    def value(self, k: Any) -> tuple:
+        position = self.data[k]
+        return position[2], position[3]
+
+    def item(self, index: int) -> tuple:
+        position = self.data[index]
+        return position[0], position[1]
+
+
+class PositionedMap(dict):
+    __slots__ = ('lc',)
+
+
+class PositionedList(list):
+    __slots__ = ('lc',)
+
+
+class PositionedConstructor(SafeConstructor):
+    """Безопасный конструктор, сохраняющий позиции словарей и списков"""
+
+    def construct_yaml_map(self, node: Any) -> Any:
+        data = PositionedMap()
+        mark = node.start_mark
+        data.lc = LineCol(mark.line, mark.column)
+        yield data
+        data.update(self.construct_mapping(node))
+
+        # После construct_mapping ключи уже построены; ключи из слияния (<<)
+        # перекрываются собственными ключами словаря, как и значения
+        positions = data.lc.data
+        pairs = list(getattr(node, 'merge', None) or []) + list(node.value)
+        for key_node, value_node in pairs:
+            key = self.constructed_objects.get(key_node)
+            if isinstance(key, list):
+                key = tuple(key)
+            try:
+                positions[key] = (key_node.start_mark.line, key_node.start_mark.column,
+                                  value_node.start_mark.line, value_node.start_mark.column)
+            except TypeError:
+                pass
+
+    def construct_yaml_seq(self, node: Any) -> Any:
+        data = PositionedList()
+        mark = node.start_mark
+        data.lc = LineCol(mark.line, mark.column)
+        yield data
+        data.extend(self.construct_sequence(node))
+
+        positions = data.lc.data
+        for index, child in enumerate(node.value):
+            positions[index] = (child.start_mark.line, child.start_mark.column)
+
+    def construct_unknown(self, node: Any) -> Any:
+        # Теги Ansible (!vault, !unsafe и др.): значение без учета тега
+        if isinstance(node, MappingNode):
+            return self.construct_yaml_map(node)
+        if isinstance(node, SequenceNode):
+            return self.construct_yaml_seq(node)
+        return self.construct_scalar(node)
+
+
+PositionedConstructor.add_constructor('tag:yaml.org,2002:map', PositionedConstructor.construct_yaml_map)
+PositionedConstructor.add_constructor('tag:yaml.org,2002:seq', PositionedConstructor.construct_yaml_seq)
+PositionedConstructor.add_constructor(None, PositionedConstructor.construct_unknown)
+
+
+class SafeYAMLParser:
+    def __init__(self, pure: bool = False):
+        """
+        :param pure: Использовать только Python-реализацию загрузчика,
+                     даже если C-расширение доступно
+        """
+        self.yaml = YAML(typ='safe', pure=pure)
+        self.yaml.Constructor = PositionedConstructor
+        self.yaml.allow_duplicate_keys = False
+        self.uses_c_loader = C_LOADER_AVAILABLE and not pure
+
+    def parse(self, yaml_text: str, quiet: bool = False):
+
+        # Парсит YAML-текст и возвращает структуру данных Python
+        # :param yaml_text: Строка с YAML-содержимым
+        # :param quiet: Не выводить ошибку в stderr (ошибка ожидаема и обрабатывается вызывающим)
+        # :return: Распарсенная структура данных
+        # :raises: Exception при ошибках парсинга
+
+        try:
+            return self.yaml.load(yaml_text)
+        except Exception as e:
+            if not quiet:
+                print(f"Ошибка парсинга YAML: {e}", file=sys.stderr)
+            raise
+
+    def parse_file(self, file_path: str):
+
+        # Парсит YAML-файл и возвращает структуру данных Python
+        # :param file_path: Путь к YAML-файлу
+        # :return: Распарсенная структура данных
+
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return self.yaml.load(f)
+        except FileNotFoundError:
+            print(f"Файл не найден: {file_path}", file=sys.stderr)
+            raise
+        except Exception as e:
+            print(f"Ошибка парсинга YAML в файле {file_path}: {e}", file=sys.stderr)
+            raise
+
+    def parse_documents(self, stream: Any):
+
+        # Потоково парсит все документы YAML (см. documents.iter_documents)
+        # :param stream: Строка или открытый текстовый файл
+        # :return: Генератор документов; документ-список - итератор по плейбукам
+
+        try:
+            yield from iter_documents(self.yaml, stream)
+        except Exception as e:
+            print(f"Ошибка парсинга YAML: {e}", file=sys.stderr)
+            raise
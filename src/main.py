@@ -1,53 +1,280 @@
 import os
 import sys
 import argparse
-import json
-from datetime import datetime
-from src.lexer_parser.ruamel_parser import RuamelYAMLParser
-from src.ast_model.builder import ASTBuilder, print_ast
-from src.rules_engine.engine import RulesEngine
-from src.rules_engine.rules import load_all_rules
-from src.reports import ReportGenerator
+from src.cache import default_cache_dir, DEFAULT_MAX_BYTES
+from src.lexer_parser import PARSER_BACKENDS, DEFAULT_PARSER
+from src.rules_engine.manifest import SEVERITY_LEVELS
+from src.reports import STREAMING_FORMATS
+
+# Модули анализа (парсер, AST, правила, пул процессов, отчеты) импортируются
+# в main() после разбора аргументов и только на тех путях, где они нужны:
+# --help и ошибки в аргументах не платят за их загрузку.
 
 def main():
     parser = argparse.ArgumentParser(description='SAST-анализ плейбуков')
-    parser.add_argument('playbook_path', help='Путь к YAML-файлу плейбука для анализа')
-    parser.add_argument('--format', '-f', choices=['text', 'json'],
-                        default='text', help='Формат отчета (по умолчанию text)')
+    parser.add_argument('paths', nargs='*',
+                        help='Пути к YAML-файлам, каталогам или glob-шаблонам для анализа')
+    parser.add_argument('--files-from', metavar='FILE',
+                        help="Файл со списком путей для анализа ('-' для stdin)")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Число процессов для анализа (по умолчанию - число ядер)')
+    parser.add_argument('--format', '-f', choices=['text', 'json'] + list(STREAMING_FORMATS),
+                        default='text', help='Формат отчета (по умолчанию text); jsonl и sarif '
+                                             'записываются потоком, по мере анализа')
     parser.add_argument('--output', '-o', nargs='?', const=True, default=None,
                         help='Сохранить отчет в файл')
     parser.add_argument('--no-ast', action='store_true', help='Не выводить структуру AST-дерева')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help='Парсер YAML: rt - round-trip, safe - безопасный загрузчик, '
+                             'c - безопасный загрузчик на C (по умолчанию %(default)s)')
+    parser.add_argument('--compact-ast', action='store_true',
+                        help='Компактный AST: меньше памяти на больших наборах плейбуков')
+    parser.add_argument('--rules', type=rule_list, metavar='ID[,ID...]',
+                        help='Проверять только эти правила (например, ANS001,ANS004)')
+    parser.add_argument('--exclude-rules', type=rule_list, default=[], metavar='ID[,ID...]',
+                        help='Не проверять эти правила')
+    parser.add_argument('--min-severity', choices=SEVERITY_LEVELS, default=None,
+                        help='Проверять только правила с критичностью не ниже указанной')
+    parser.add_argument('--rule-timeout', type=float, default=1.0, metavar='SEC',
+                        help='Бюджет времени правила на одну задачу (по умолчанию %(default)s с, 0 - без ограничения)')
+    parser.add_argument('--rule-file-timeout', type=float, default=10.0, metavar='SEC',
+                        help='Бюджет времени правила на один файл (по умолчанию %(default)s с, 0 - без ограничения)')
+    parser.add_argument('--shard-tasks', type=int, default=10000, metavar='N',
+                        help='Проверять задачи плейбуков из N задач и более частями в нескольких процессах '
+                             '(0 - отключить; по умолчанию %(default)s)')
+    parser.add_argument('--no-resolve', action='store_true',
+                        help='Не анализировать роли и файлы, подключаемые через include/import')
+    parser.add_argument('--stats', action='store_true',
+                        help='Статистика выполнения правил: время, задачи, нарушения '
+                             '(в stderr и в metadata.rule_stats отчета); результаты из кеша '
+                             'не замеряются, для полной статистики добавьте --no-cache')
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='Каталог кеша результатов (по умолчанию %(default)s)')
+    parser.add_argument('--no-cache', action='store_true', help='Не использовать кеш результатов')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help='Максимальный размер кеша в МБ (по умолчанию %(default)s)')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Файл базовой линии: в отчет попадают только новые нарушения')
+    parser.add_argument('--write-baseline', action='store_true',
+                        help='Записать все нарушения запуска в файл --baseline')
+
+    parser.add_argument('--watch', action='store_true',
+                        help='Отслеживать изменения файлов и повторять анализ инкрементально')
+    parser.add_argument('--watch-interval', type=float, default=1.0, metavar='SEC',
+                        help='Период опроса файлов в режиме --watch (по умолчанию %(default)s с)')
 
     args = parser.parse_args()
 
+    from src.scanner import collect_files, ScanOptions, configure, analyze_file, scan_files, iter_scan, shard_pool
+    from src.rules_engine.manifest import load_manifest, select_rules
+    from src.rules_engine.stats import sorted_stats, format_stats_table
+
+    files = collect_files(args.paths, args.files_from)
+    if not files:
+        parser.error('не указаны файлы для анализа')
+    known_rules = {entry['id'] for entry in load_manifest()}
+    unknown_rules = [rule_id for rule_id in (args.rules or []) + args.exclude_rules if rule_id not in known_rules]
+    if unknown_rules:
+        parser.error(f"неизвестные правила: {', '.join(unknown_rules)}")
+    if args.write_baseline and not args.baseline:
+        parser.error('--write-baseline требует --baseline FILE')
+
+    baseline = baseline_writer = None
+    if args.baseline:
+        from src.reports import Baseline, BaselineError, BaselineWriter
+        try:
+            baseline = Baseline.load(args.baseline)
+        except BaselineError as e:
+            parser.error(str(e))
+        if args.write_baseline:
+            # Принятые нарушения правил, не выбранных запуском, сохраняются
+            selected = select_rules(load_manifest(), args.rules, args.exclude_rules, args.min_severity)
+            baseline_writer = BaselineWriter(baseline, [entry['id'] for entry in selected])
+
+    options = ScanOptions(
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_max_bytes=args.cache_size * 1024 * 1024,
+        parser=args.parser,
+        compact_ast=args.compact_ast,
+        rules=tuple(args.rules) if args.rules is not None else None,
+        exclude_rules=tuple(args.exclude_rules),
+        min_severity=args.min_severity,
+        stats=args.stats,
+        task_budget=args.rule_timeout,
+        file_budget=args.rule_file_timeout,
+        shard_tasks=args.shard_tasks,
+        resolve=not args.no_resolve,
+    )
+
     print("🔄 Запуск SAST-анализатора", file=sys.stderr)
 
-    parser_obj = RuamelYAMLParser()
-    try:
-        parsed_data = parser_obj.parse_file(args.playbook_path)
-        print("✅ YAML успешно распарсен", file=sys.stderr)
-    except Exception as e:
-        print(f"❌ Ошибка при парсинге YAML: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+    if args.watch:
+        watch(files, args, options)
+        return
 
-    ast_builder = ASTBuilder()
-    try:
-        ast = ast_builder.build_ast(parsed_data)
-        print("✅ AST успешно построен", file=sys.stderr)
-    except Exception as e:
-        print(f"❌ Ошибка при построении AST: {str(e)}", file=sys.stderr)
+    # Потоковые форматы получают нарушения сразу, без накопления в памяти
+    writer = None
+    if args.format in STREAMING_FORMATS:
+        from src.reports import ReportGenerator, create_writer
+        stream, report_path = ReportGenerator.open_report_stream(
+            args.output if isinstance(args.output, str) else None, args.format, args.output is not None)
+        writer = create_writer(args.format, stream)
+
+    def new_violations(violations):
+        """Нарушения для отчета: без известных по базовой линии"""
+        if baseline is None:
+            return violations
+        if baseline_writer is not None:
+            baseline_writer.add(violations)
+        return baseline.filter(violations)
+
+    def write_violations(violations):
+        writer.write_all(new_violations(violations))
+
+    if len(files) == 1:
+        # Один файл анализируем в текущем процессе, чтобы можно было вывести AST;
+        # плейбуки выводятся по мере построения, AST файла целиком не хранится
+        configure(options)
+        # Потоковый отчет в stdout не перемежается с выводом AST
+        show_ast = not args.no_ast and (writer is None or report_path is not None)
+        # Задачи очень большого плейбука проверяются частями в нескольких процессах
+        with shard_pool(files, args.jobs):
+            results = [analyze_file(files[0], on_play=ast_printer() if show_ast else None,
+                                    on_violations=write_violations if writer else None)]
+    else:
+        jobs = args.jobs or os.cpu_count() or 1
+        print(f"📂 Файлов для анализа: {len(files)}, процессов: {min(jobs, len(files))}", file=sys.stderr)
+        results = iter_scan(files, jobs, options) if writer else scan_files(files, jobs, options)
+
+    # Роли и включаемые файлы анализируются по одному разу, сколько бы файлов на них ни ссылалось
+    project = None
+    if options.resolve:
+        from src.scanner.project import ProjectGraph, iter_project
+        project = ProjectGraph()
+        results = iter_project(files, results, args.jobs, options, project)
+
+    def report_violations(result):
+        """Нарушения успешно проанализированного файла: в потоковый отчет или в общий список"""
+        if baseline_writer is not None:
+            baseline_writer.analyzed(result.path, result.diagnostics)
+        if writer is not None:
+            write_violations(result.violations)
+            return []
+        return new_violations(result.violations)
+
+    violations, summary = collect_violations(results, report_violations)
+    total, failed = summary['total'], summary['failed']
+    hits, misses = summary['cache_hits'], summary['cache_misses']
+    rule_stats, diagnostics = summary['rule_stats'], summary['diagnostics']
+
+    metadata = {}
+    if options.cache_dir:
+        from src.cache import ResultCache
+        cache = ResultCache(options.cache_dir, options.cache_max_bytes)
+        cache.evict()
+        cache.close()
+
+        metadata['cache'] = {'hits': hits, 'misses': misses}
+        print(f"💾 Кеш: попаданий {hits}, промахов {misses}", file=sys.stderr)
+
+    if project is not None and project.referenced + len(project.unresolved):
+        metadata['project'] = project.summary()
+        print(f"🧩 Файлов по ссылкам: {project.referenced}, неразрешенных ссылок: {len(project.unresolved)}",
+              file=sys.stderr)
+
+    if diagnostics:
+        timeouts = sum(1 for diagnostic in diagnostics if diagnostic['type'] == 'rule_timeout')
+        if timeouts:
+            metadata['rule_timeouts'] = timeouts
+        truncated = sum(1 for diagnostic in diagnostics if diagnostic['type'] == 'scan_truncated')
+        if truncated:
+            metadata['scan_truncations'] = truncated
+        metadata['diagnostics'] = diagnostics
+
+    if args.stats:
+        # Правила, результаты которых взяты из кеша, не выполнялись и в статистику не входят
+        metadata['rule_stats'] = sorted_stats(rule_stats)
+        print("\n⏱️ Статистика правил:", file=sys.stderr)
+        for line in format_stats_table(rule_stats):
+            print(line, file=sys.stderr)
+        if hits:
+            metadata['rule_stats_cached'] = {'files': summary['cached_files'], 'results': hits}
+            print(f"ℹ️ Результатов правил из кеша: {hits} (файлов: {summary['cached_files']}); эти правила не выполнялись "
+                  f"и в статистику не входят, для полной статистики запустите с --no-cache", file=sys.stderr)
+
+    if baseline is not None:
+        metadata['baseline'] = baseline.metadata(args.baseline)
+        print(f"📉 Базовая линия: известных нарушений {baseline.known}, новых {baseline.new}", file=sys.stderr)
+        if baseline_writer is not None:
+            count = baseline_writer.write(args.baseline)
+            print(f"📝 Базовая линия записана: {args.baseline} (нарушений {count})", file=sys.stderr)
+
+    print(f"\n✅ Проанализировано файлов: {total - failed} из {total}", file=sys.stderr)
+
+    if writer is not None:
+        writer.finish(metadata)
+        if report_path:
+            writer.stream.close()
+            print(f"📄 {args.format.upper()} отчет сохранен: {report_path}")
+    elif failed < total:
+        write_report(violations, args, metadata)
+
+    if failed:
         sys.exit(1)
 
-    if not args.no_ast:
-        print("Структура AST:", file=sys.stderr)
-        print_ast(ast)
+def rule_list(value):
+    """Список идентификаторов правил через запятую"""
+    return [rule_id.strip().upper() for rule_id in value.split(',') if rule_id.strip()]
+
+def collect_violations(results, on_violations=None):
+    """
+    Объединяет нарушения файлов, выводит диагностики правил и ошибки анализа,
+    суммирует статистику кеша и правил
 
-    rules = load_all_rules()
-    print(f"\n📋 Загружено правил: {len(rules)}", file=sys.stderr)
+    :param on_violations: Обработчик результата файла без ошибки; возвращает нарушения
+                          для общего списка (по умолчанию - все нарушения файла)
+    :return: (нарушения, сводка): total, failed, cache_hits, cache_misses,
+             cached_files, rule_stats, diagnostics
+    """
+    violations = []
+    summary = {'total': 0, 'failed': 0, 'cache_hits': 0, 'cache_misses': 0, 'cached_files': 0,
+               'rule_stats': {}, 'diagnostics': []}
+    for result in results:
+        summary['total'] += 1
+        summary['cache_hits'] += result.cache_hits
+        summary['cache_misses'] += result.cache_misses
+        if result.cache_hits:
+            summary['cached_files'] += 1
+        if result.rule_stats:
+            from src.rules_engine.stats import merge_stats
+            merge_stats(summary['rule_stats'], result.rule_stats)
+        for diagnostic in result.diagnostics:
+            summary['diagnostics'].append(diagnostic)
+            icon = {'rule_timeout': "⏳", 'scan_truncated': "✂️"}.get(diagnostic['type'], "🔁")
+            print(f"{icon} {diagnostic['file']}:{diagnostic['line']}: {diagnostic['message']}", file=sys.stderr)
+        if result.error:
+            summary['failed'] += 1
+            print(f"❌ {result.path}: {result.error}", file=sys.stderr)
+            continue
 
-    engine = RulesEngine(rules)
-    violations = engine.run(ast)
+        violations.extend(on_violations(result) if on_violations is not None else result.violations)
+    return violations, summary
 
+def ast_printer():
+    """Функция, печатающая AST плейбуков по одному (с заголовком перед первым)"""
+    from src.ast_model.builder import print_ast
+    started = False
+
+    def print_play(play):
+        nonlocal started
+        if not started:
+            print("Структура AST:", file=sys.stderr)
+            started = True
+        print_ast([play])
+
+    return print_play
+
+def write_report(violations, args, metadata=None):
     save_to_file = args.output is not None
     output_file = None
 
@@ -56,15 +283,40 @@ def main():
     elif isinstance(args.output, str):
         output_file = args.output
 
+    from src.reports import ReportGenerator
     report_generator = ReportGenerator()
 
     if args.format == 'json':
-        report = report_generator.generate_json_report(violations, output_file if save_to_file else None)
+        report = report_generator.generate_json_report(violations, output_file if save_to_file else None, metadata)
     else:
         report = report_generator.generate_text_report(violations, output_file if save_to_file else None)
 
     if not save_to_file:
         print(report)
 
+def watch(files, args, options):
+    """Повторяет анализ при изменении файлов, перепроверяя только измененные задачи"""
+    from dataclasses import replace
+    from src.scanner import configure
+    from src.scanner.incremental import IncrementalAnalyzer, watch_files
+
+    # Кеш результатов в режиме --watch не используется: состояние задач хранится в памяти
+    options = replace(options, cache_dir=None)
+    analyzer = IncrementalAnalyzer(configure(options))
+    results = {}
+
+    print("👀 Отслеживание изменений файлов (Ctrl+C для выхода)", file=sys.stderr)
+    try:
+        for changed in watch_files(files, args.watch_interval):
+            for path in changed:
+                results[path] = analyzer.analyze_file(path)
+                print(f"🔁 {path}: задач переиспользовано {analyzer.reused_tasks}, "
+                      f"перепроверено {analyzer.rebuilt_tasks}", file=sys.stderr)
+
+            violations, _ = collect_violations([results[path] for path in files])
+            write_report(violations, args)
+    except KeyboardInterrupt:
+        pass
+
 if __name__ == "__main__":
     main()
@@ -1,3 +1,26 @@
-from .generator import ReportGenerator
+from .streaming import STREAMING_FORMATS
 
-__all__ = ['ReportGenerator']
+# Генератор отчетов, потоковые писатели и базовая линия импортируются при первом
+# обращении (PEP 562): для разбора аргументов достаточно списка форматов.
+_EXPORTS = {
+    'ReportGenerator': 'generator',
+    'Baseline': 'baseline',
+    'BaselineError': 'baseline',
+    'BaselineWriter': 'baseline',
+    'StreamingReportWriter': 'streaming',
+    'JSONLinesWriter': 'streaming',
+    'SARIFWriter': 'streaming',
+    'create_writer': 'streaming',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
+
+__all__ = ['ReportGenerator', 'Baseline', 'BaselineError', 'BaselineWriter', 'STREAMING_FORMATS', 'StreamingReportWriter', 'JSONLinesWriter', 'SARIFWriter',
+           'create_writer']
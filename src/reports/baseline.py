@@ -0,0 +1,173 @@
+import os
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Базовая линия: принятые (известные) нарушения, которые не попадают в отчет.
+#
+# Нарушение идентифицируется нормализованным путем файла и отпечатком
+# (поле fingerprint, см. rules_engine.fingerprint), не зависящим от номеров
+# строк. Одинаковые задачи файла (например, скопированные) дают одинаковый
+# отпечаток, поэтому для пары (файл, отпечаток) хранится число вхождений
+# (поле count, по умолчанию 1): известными считаются не больше count
+# нарушений с этой парой, остальные - новые. Файл базовой линии - JSON со
+# списком принятых нарушений, отсортированным для удобного просмотра
+# изменений в системе контроля версий; при загрузке пары помещаются в
+# словарь, и проверка каждого нарушения выполняется за O(1).
+#
+# Запись базовой линии (--write-baseline) заменяет только нарушения,
+# которые запуск действительно проверил: правила, выбранные запуском, в
+# успешно проанализированных файлах. Принятые нарушения других правил и
+# файлов (не указанных в запуске или с ошибкой анализа), а также правил,
+# проверка которых в файле не завершилась (превышение бюджета, усеченный
+# поиск), переносятся из прежней базовой линии без изменений.
+
+BASELINE_VERSION = 1
+
+BaselineKey = Tuple[str, str]
+
+
+def normalize_path(path: str) -> str:
+    """Путь относительно текущего каталога в формате с '/' (как в файле базовой линии)"""
+    if not path:
+        return ''
+    relative = os.path.relpath(os.path.abspath(path))
+    return relative.replace(os.sep, '/')
+
+
+class BaselineError(Exception):
+    """Некорректный файл базовой линии"""
+
+
+class Baseline:
+    def __init__(self, findings: Optional[List[Dict[str, Any]]] = None):
+        self.findings: List[Dict[str, Any]] = findings or []  # Принятые нарушения файла базовой линии
+        self.counts: Dict[BaselineKey, int] = {}  # (файл, отпечаток) -> число принятых вхождений
+        for finding in self.findings:
+            key = (finding['file'], finding['fingerprint'])
+            self.counts[key] = self.counts.get(key, 0) + finding_count(finding)
+        self.known = 0  # Отфильтровано известных нарушений
+        self.new = 0  # Пропущено новых нарушений
+        self._remaining = dict(self.counts)  # Еще не встреченные вхождения
+        self._paths: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Baseline':
+        """Загружает базовую линию; отсутствующий файл - пустая базовая линия"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            raise BaselineError(f"Не удалось прочитать базовую линию {path}: {e}")
+
+        findings = data.get('findings') if isinstance(data, dict) else None
+        if not isinstance(findings, list):
+            raise BaselineError(f"Файл {path} не является базовой линией: нет списка findings")
+        try:
+            return cls(findings)
+        except (KeyError, TypeError):
+            raise BaselineError(f"Файл {path}: у нарушения нет полей file и fingerprint")
+        except ValueError:
+            raise BaselineError(f"Файл {path}: некорректное число вхождений count")
+
+    def path(self, path: str) -> str:
+        """Нормализованный путь (с кешем: нарушения одного файла идут подряд)"""
+        normalized = self._paths.get(path)
+        if normalized is None:
+            normalized = self._paths[path] = normalize_path(path)
+        return normalized
+
+    def key(self, violation: Dict[str, Any]) -> BaselineKey:
+        return self.path(violation.get('file') or ''), violation.get('fingerprint', '')
+
+    def filter(self, violations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Оставляет только нарушения, которых нет в базовой линии (сверх принятого числа вхождений)"""
+        new = []
+        remaining = self._remaining
+        for violation in violations:
+            key = self.key(violation)
+            if remaining.get(key, 0) > 0:
+                remaining[key] -= 1
+                self.known += 1
+            else:
+                new.append(violation)
+        self.new += len(new)
+        return new
+
+    def metadata(self, path: str) -> Dict[str, Any]:
+        return {'file': path, 'known': self.known, 'new': self.new}
+
+
+def finding_count(finding: Dict[str, Any]) -> int:
+    """Число вхождений принятого нарушения (поле count, по умолчанию 1)"""
+    count = int(finding.get('count', 1))
+    if count < 1:
+        raise ValueError(count)
+    return count
+
+
+class BaselineWriter:
+    """Собирает нарушения запуска и записывает их как новую базовую линию
+
+    previous - прежняя базовая линия, rule_ids - правила, выбранные запуском
+    (None - все): принятые нарушения вне области запуска сохраняются.
+    """
+
+    def __init__(self, previous: Optional[Baseline] = None, rule_ids: Optional[Iterable[str]] = None):
+        self._findings: Dict[BaselineKey, Dict[str, Any]] = {}
+        self._baseline = Baseline()
+        self._previous = previous.findings if previous is not None else []
+        self._rule_ids: Optional[Set[str]] = set(rule_ids) if rule_ids is not None else None
+        self._files: Set[str] = set()  # Успешно проанализированные файлы
+        self._incomplete: Set[Tuple[str, str]] = set()  # (файл, правило) с незавершенной проверкой
+
+    def add(self, violations: Iterable[Dict[str, Any]]):
+        for violation in violations:
+            key = self._baseline.key(violation)
+            finding = self._findings.get(key)
+            if finding is not None:
+                finding['count'] = finding.get('count', 1) + 1
+                continue
+            self._findings[key] = {
+                'file': key[0],
+                'fingerprint': key[1],
+                'rule_id': violation.get('rule_id', ''),
+                'play': violation.get('play', ''),
+                'task': violation.get('task', ''),
+            }
+
+    def analyzed(self, path: str, diagnostics: Iterable[Dict[str, Any]] = ()):
+        """Отмечает файл как проанализированный без ошибки; diagnostics - диагностики его правил"""
+        file = self._baseline.path(path)
+        self._files.add(file)
+        for diagnostic in diagnostics:
+            if diagnostic.get('rule_id'):
+                self._incomplete.add((self._baseline.path(diagnostic.get('file') or path), diagnostic['rule_id']))
+
+    def _in_scope(self, finding: Dict[str, Any]) -> bool:
+        # Проверил ли запуск это принятое нарушение заново
+        file, rule_id = finding['file'], finding.get('rule_id', '')
+        if file not in self._files or (file, rule_id) in self._incomplete:
+            return False
+        return self._rule_ids is None or rule_id in self._rule_ids
+
+    def write(self, path: str) -> int:
+        """Записывает файл базовой линии; возвращает число принятых нарушений"""
+        merged = dict(self._findings)
+        for finding in self._previous:
+            if self._in_scope(finding):
+                continue
+            key = (finding['file'], finding['fingerprint'])
+            current = merged.get(key)
+            if current is None or finding_count(current) < finding_count(finding):
+                merged[key] = finding
+        findings = [merged[key] for key in sorted(merged)]
+        data = {
+            'version': BASELINE_VERSION,
+            'findings': findings,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            f.write('\n')
+        return sum(finding_count(finding) for finding in findings)
@@ -1,7 +1,9 @@
 import os
+import sys
 import json
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TextIO, Tuple
+from .streaming import ReportSummary, report_metadata
 
 class ReportGenerator:
     @staticmethod
@@ -22,38 +24,34 @@ class ReportGenerator:
 
     @staticmethod
 
-    # JSON-отчет
-    def generate_json_report(violations: List[Dict[str, Any]], output_file: Optional[str] = None) -> str:
-        report = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "analyzer_version": "1.0.0",
-                "report_format": "json",
-                "total_violations": len(violations)
-            },
-            "summary": {
-                "by_severity": {
-                    "HIGH": 0,
-                    "MEDIUM": 0, 
-                    "LOW": 0
-                },
-                "by_rule": {}
-            },
+    # Выходной поток потокового отчета: файл (путь как у _get_output_path) или stdout
+    def open_report_stream(output_file: Optional[str], format: str, save_to_file: bool) -> Tuple[TextIO, Optional[str]]:
+        if not save_to_file:
+            return sys.stdout, None
+        output_path = ReportGenerator._get_output_path(output_file, format)
+        return open(output_path, 'w', encoding='utf-8'), output_path
+
+    @staticmethod
+
+    # Структура JSON-отчета (используется также сервером анализа)
+    def build_json_report(violations: List[Dict[str, Any]], metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        summary = ReportSummary()
+        for violation in violations:
+            summary.add(violation)
+
+        # Дополнительные сведения о запуске (например, статистика кеша) попадают в metadata
+        return {
+            "metadata": report_metadata("json", len(violations), metadata),
+            "summary": summary.to_dict(),
             "violations": violations
         }
-        
-        for violation in violations:
-            report["summary"]["by_severity"][violation["severity"]] += 1
-            
-            rule_id = violation["rule_id"]
-            if rule_id not in report["summary"]["by_rule"]:
-                report["summary"]["by_rule"][rule_id] = {
-                    "count": 0,
-                    "description": violation.get("description", ""),
-                    "severity": violation["severity"]
-                }
-            report["summary"]["by_rule"][rule_id]["count"] += 1
-        
+
+    @staticmethod
+
+    # JSON-отчет
+    def generate_json_report(violations: List[Dict[str, Any]], output_file: Optional[str] = None,
+                             metadata: Optional[Dict[str, Any]] = None) -> str:
+        report = ReportGenerator.build_json_report(violations, metadata)
         report_json = json.dumps(report, ensure_ascii=False, indent=2, default=str)
         
         if output_file is not None:
@@ -81,7 +79,17 @@ class ReportGenerator:
                 if by_severity[severity]:
                     report_lines.append(f"\n🔴 {severity} ({len(by_severity[severity])}):")
                     for violation in by_severity[severity]:
-                        report_lines.append(f"   ⚡ {violation['rule_id']}: {violation['message']}")
+                        location = violation.get('file') or ""
+                        if violation.get('line'):
+                            location = f"{location}:{violation['line']}" if location else f"строка {violation['line']}"
+                        location = f" [{location}]" if location else ""
+                        report_lines.append(f"   ⚡ {violation['rule_id']}{location}: {violation['message']}")
+                        if violation.get('reached_from'):
+                            sources = ", ".join(f"{source['file']}:{source['line']}" for source in violation['reached_from'])
+                            report_lines.append(f"      ↳ подключается из: {sources}")
+                        for path in violation.get('taint_paths') or ():
+                            steps = " → ".join(f"{step['name']} ({step['kind']}, строка {step['line']})" for step in path)
+                            report_lines.append(f"      ↳ путь данных: {steps}")
 
         else:
             report_lines.append("\n✅ Нарушений не обнаружено!\n")
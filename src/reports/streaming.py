@@ -0,0 +1,227 @@
+import os
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+# Потоковые форматы отчета: JSON Lines и SARIF 2.1.0.
+#
+# Нарушения записываются в выходной поток сразу по мере получения и не
+# накапливаются в памяти; сводка (by_severity, by_rule) ведется счетчиками и
+# записывается в конце отчета вместе с метаданными запуска.
+
+ANALYZER_VERSION = "1.0.0"
+
+STREAMING_FORMATS = ('jsonl', 'sarif')
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+SARIF_LEVELS = {'HIGH': 'error', 'MEDIUM': 'warning', 'LOW': 'note'}
+
+
+class ReportSummary:
+    """Счетчики сводки отчета, обновляемые по одному нарушению"""
+
+    def __init__(self):
+        self.total = 0
+        self.by_severity: Dict[str, int] = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+        self.by_rule: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, violation: Dict[str, Any]):
+        self.total += 1
+        self.by_severity[violation["severity"]] += 1
+
+        rule_id = violation["rule_id"]
+        rule = self.by_rule.get(rule_id)
+        if rule is None:
+            rule = self.by_rule[rule_id] = {
+                "count": 0,
+                "description": violation.get("description", ""),
+                "severity": violation["severity"]
+            }
+        rule["count"] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"by_severity": self.by_severity, "by_rule": self.by_rule}
+
+
+def report_metadata(report_format: str, total: int, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Метаданные отчета; metadata - дополнительные сведения о запуске (например, статистика кеша)"""
+    from datetime import datetime
+    result = {
+        "generated_at": datetime.now().isoformat(),
+        "analyzer_version": ANALYZER_VERSION,
+        "report_format": report_format,
+        "total_violations": total
+    }
+    if metadata:
+        result.update(metadata)
+    return result
+
+
+class StreamingReportWriter(ABC):
+    """Базовый класс потоковых отчетов: write() для каждого нарушения, finish() в конце"""
+
+    format = ''
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.summary = ReportSummary()
+        self._started = False
+
+    def write(self, violation: Dict[str, Any]):
+        if not self._started:
+            self._started = True
+            self._begin()
+        self.summary.add(violation)
+        self._write(violation)
+
+    def write_all(self, violations: Iterable[Dict[str, Any]]):
+        """Записывает группу нарушений (например, файла или плейбука) и сбрасывает буфер потока"""
+        for violation in violations:
+            self.write(violation)
+        self.stream.flush()
+
+    def finish(self, metadata: Optional[Dict[str, Any]] = None):
+        if not self._started:
+            self._started = True
+            self._begin()
+        self._finish(report_metadata(self.format, self.summary.total, metadata))
+        self.stream.flush()
+
+    def _begin(self):
+        pass
+
+    @abstractmethod
+    def _write(self, violation: Dict[str, Any]):
+        """Записывает одно нарушение"""
+
+    @abstractmethod
+    def _finish(self, metadata: Dict[str, Any]):
+        """Записывает окончание отчета: сводку и метаданные запуска"""
+
+
+class JSONLinesWriter(StreamingReportWriter):
+    """
+    JSON Lines: по одному нарушению на строку (те же поля, что в JSON-отчете),
+    последняя строка - {"metadata": ..., "summary": ...}
+    """
+
+    format = 'jsonl'
+
+    def _write(self, violation: Dict[str, Any]):
+        self.stream.write(json.dumps(violation, ensure_ascii=False, default=str))
+        self.stream.write('\n')
+
+    def _finish(self, metadata: Dict[str, Any]):
+        footer = {"metadata": metadata, "summary": self.summary.to_dict()}
+        self.stream.write(json.dumps(footer, ensure_ascii=False, default=str))
+        self.stream.write('\n')
+
+
+class SARIFWriter(StreamingReportWriter):
+    """
+    SARIF 2.1.0: массив results записывается по мере поступления нарушений,
+    описания правил (tool.driver.rules) и сводка - после него
+    """
+
+    format = 'sarif'
+
+    def _begin(self):
+        self.stream.write('{\n  "$schema": %s,\n  "version": "2.1.0",\n  "runs": [\n    {\n      "results": [' %
+                          json.dumps(SARIF_SCHEMA))
+        self._first = True
+
+    def _write(self, violation: Dict[str, Any]):
+        self.stream.write('\n        ' if self._first else ',\n        ')
+        self._first = False
+        self.stream.write(json.dumps(sarif_result(violation), ensure_ascii=False, default=str))
+
+    def _finish(self, metadata: Dict[str, Any]):
+        rules = [{
+            "id": rule_id,
+            "shortDescription": {"text": rule["description"]},
+            "defaultConfiguration": {"level": SARIF_LEVELS.get(rule["severity"], "none")},
+            "properties": {"severity": rule["severity"]}
+        } for rule_id, rule in self.summary.by_rule.items()]
+        tool = {"driver": {"name": "sast-yaml", "version": ANALYZER_VERSION, "rules": rules}}
+        properties = {"metadata": metadata, "summary": self.summary.to_dict()}
+        # Диагностики анализа (например, правило пропущено из-за бюджета времени)
+        invocation = {
+            "executionSuccessful": True,
+            "toolExecutionNotifications": [sarif_notification(d) for d in metadata.get("diagnostics", [])]
+        }
+
+        self.stream.write('\n      ],\n' if not self._first else '],\n')
+        self.stream.write('      "tool": %s,\n' % json.dumps(tool, ensure_ascii=False, default=str))
+        self.stream.write('      "invocations": [%s],\n' % json.dumps(invocation, ensure_ascii=False, default=str))
+        self.stream.write('      "properties": %s\n' % json.dumps(properties, ensure_ascii=False, default=str))
+        self.stream.write('    }\n  ]\n}\n')
+
+
+def sarif_result(violation: Dict[str, Any]) -> Dict[str, Any]:
+    """Нарушение в виде объекта result SARIF"""
+    result: Dict[str, Any] = {
+        "ruleId": violation["rule_id"],
+        "level": SARIF_LEVELS.get(violation["severity"], "none"),
+        "message": {"text": violation["message"]}
+    }
+
+    path = violation.get("file")
+    if path:
+        artifact: Dict[str, Any] = {"uri": path.replace(os.sep, '/')}
+        if not os.path.isabs(path):
+            artifact["uriBaseId"] = "%SRCROOT%"
+        location: Dict[str, Any] = {"artifactLocation": artifact}
+        if violation.get("line"):
+            region = {"startLine": violation["line"]}
+            if violation.get("column"):
+                region["startColumn"] = violation["column"]
+            if violation.get("end_line"):
+                region["endLine"] = violation["end_line"]
+            location["region"] = region
+        result["locations"] = [{"physicalLocation": location}]
+        if violation.get("taint_paths"):
+            result["codeFlows"] = [sarif_code_flow(artifact, path) for path in violation["taint_paths"]]
+
+    properties = {key: violation[key] for key in ("severity", "play", "task", "reached_from") if violation.get(key)}
+    if properties:
+        result["properties"] = properties
+    return result
+
+
+def sarif_code_flow(artifact: Dict[str, Any], path: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Путь данных нарушения (шаги с kind, name, line) в виде объекта codeFlow SARIF"""
+    locations = []
+    for step in path:
+        location: Dict[str, Any] = {"artifactLocation": artifact}
+        if step.get("line"):
+            location["region"] = {"startLine": step["line"]}
+        locations.append({"location": {"physicalLocation": location,
+                                       "message": {"text": f"{step['kind']} '{step['name']}'"}}})
+    return {"threadFlows": [{"locations": locations}]}
+
+
+def sarif_notification(diagnostic: Dict[str, Any]) -> Dict[str, Any]:
+    """Диагностика анализа в виде объекта notification SARIF"""
+    notification: Dict[str, Any] = {
+        "descriptor": {"id": diagnostic.get("type", "diagnostic")},
+        "level": "warning",
+        "message": {"text": diagnostic["message"]}
+    }
+    if diagnostic.get("rule_id"):
+        notification["associatedRule"] = {"id": diagnostic["rule_id"]}
+    if diagnostic.get("file"):
+        location: Dict[str, Any] = {"artifactLocation": {"uri": diagnostic["file"].replace(os.sep, '/')}}
+        if diagnostic.get("line"):
+            location["region"] = {"startLine": diagnostic["line"]}
+        notification["locations"] = [{"physicalLocation": location}]
+    return notification
+
+
+def create_writer(report_format: str, stream: TextIO) -> StreamingReportWriter:
+    """Потоковый писатель отчета для формата из STREAMING_FORMATS"""
+    if report_format == 'jsonl':
+        return JSONLinesWriter(stream)
+    if report_format == 'sarif':
+        return SARIFWriter(stream)
+    raise ValueError(f"Неизвестный потоковый формат отчета: {report_format}")
@@ -0,0 +1,206 @@
+import re
+import importlib.util
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.ast_model.facts import TaskFacts
+from src.ast_model.table import BECOME_UNKNOWN
+
+# Столбцовое представление задач для векторных предварительных проверок правил.
+#
+# Задачи одного или нескольких плейбуков (в том числе разных файлов) хранятся
+# столбцами: код модуля, номер файла и плейбука, битовая маска флагов
+# (WHEN, CHANGED_WHEN, REGISTER, BECOME); команды задач для поиска подстрок
+# собираются в общую строку-буфер со смещениями начал команд. Предварительные условия правила - Rule.modules,
+# Rule.required_flags / Rule.excluded_flags и Rule.command_literals -
+# проверяются для всех строк сразу булевыми масками numpy; правило вызывается
+# только для задач, прошедших маску, и только для них строятся нарушения.
+#
+# numpy - необязательная зависимость и импортируется при первом построении
+# столбцов. Без numpy (и для плейбуков меньше VECTOR_MIN_TASKS задач, где
+# построение столбцов не окупается) движок проверяет задачи как раньше -
+# результат от этого не зависит: предварительные условия лишь отсеивают
+# задачи, на которых правило и так не находит нарушений.
+
+# Флаги задачи
+WHEN = 1  # Условие when у задачи или у объемлющего блока
+CHANGED_WHEN = 2
+REGISTER = 4
+BECOME = 8  # Действующий become (задача, блоки, плейбук) истинен
+
+VECTOR_MIN_TASKS = 256
+# Маски правил одной задачи объединяются в неотрицательное целое int64
+MAX_VECTOR_RULES = 62
+
+# Разделитель команд в буфере: подстрока команды не может его пересечь
+_SEPARATOR = '\x00'
+
+_numpy: Any = None
+
+
+def numpy_available() -> bool:
+    """Установлен ли numpy (без импорта)"""
+    return importlib.util.find_spec('numpy') is not None
+
+
+def _np() -> Any:
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+
+def has_prefilter(rule: Any) -> bool:
+    """Есть ли у правила предварительные условия, проверяемые по столбцам"""
+    return (rule.modules is not None or bool(rule.required_flags) or bool(rule.excluded_flags)
+            or rule.command_literals is not None)
+
+
+def _column(np: Any, data: array, dtype: Any) -> Any:
+    # Копия, а не представление буфера: array, на который ссылается numpy, нельзя дополнять
+    return np.frombuffer(data, dtype=dtype).copy() if len(data) else np.zeros(0, dtype=dtype)
+
+
+class TaskColumns:
+    """Задачи плейбуков столбцами numpy"""
+
+    def __init__(self):
+        self.module_codes: Dict[str, int] = {}  # Канонический идентификатор модуля -> код
+        self.tasks: List[Any] = []
+        self._modules = array('i')
+        self._files = array('i')
+        self._plays = array('i')
+        self._flags = array('B')
+        self.plays = 0
+        self._arrays: Optional[Dict[str, Any]] = None
+        self._command_cache: Dict[int, str] = {}  # Номер строки -> команда в нижнем регистре
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def add_play(self, play: Any, tasks: Optional[Sequence[Any]] = None, file_id: int = 0):
+        """
+        Добавляет строки задач плейбука
+
+        :param tasks: Задачи плейбука (по умолчанию все, play.tasks) - например, часть задач
+        :param file_id: Номер файла, если в столбцах задачи нескольких файлов
+        """
+        tasks = play.tasks if tasks is None else tasks
+        table = play.table
+        if table is not None and tasks is table.tasks:
+            conditions, becomes = table.conditions, table.becomes
+        elif table is not None:
+            rows = [table.row(task) for task in tasks]
+            conditions = [table.conditions[row] if row >= 0 else () for row in rows]
+            becomes = [table.becomes[row] if row >= 0 else BECOME_UNKNOWN for row in rows]
+        else:
+            conditions = becomes = [None] * len(tasks)
+
+        codes = self.module_codes
+        play_id = self.plays
+        self.plays += 1
+        for task, inherited, become in zip(tasks, conditions, becomes):
+            code = codes.get(task.module_id)
+            if code is None:
+                code = codes[task.module_id] = len(codes)
+            flags = 0
+            if task.when is not None or inherited:
+                flags |= WHEN
+            if task.changed_when is not None:
+                flags |= CHANGED_WHEN
+            if task.register is not None:
+                flags |= REGISTER
+            if become == 1:
+                flags |= BECOME
+            self._modules.append(code)
+            self._flags.append(flags)
+            self.tasks.append(task)
+        self._files.extend([file_id] * len(tasks))
+        self._plays.extend([play_id] * len(tasks))
+        self._arrays = None
+
+    @property
+    def arrays(self) -> Dict[str, Any]:
+        """Столбцы numpy: modules, files, plays, flags"""
+        if self._arrays is None:
+            np = _np()
+            self._arrays = {
+                'modules': _column(np, self._modules, np.int32),
+                'files': _column(np, self._files, np.int32),
+                'plays': _column(np, self._plays, np.int32),
+                'flags': _column(np, self._flags, np.uint8),
+            }
+        return self._arrays
+
+    def module_mask(self, modules: Optional[Any]) -> Any:
+        """Строки задач модулей modules (None - все строки)"""
+        np = _np()
+        if modules is None:
+            return np.ones(len(self.tasks), dtype=bool)
+        codes = [self.module_codes[module_id] for module_id in modules if module_id in self.module_codes]
+        return np.isin(self.arrays['modules'], np.array(codes, dtype=np.int32))
+
+    def flags_mask(self, required: int = 0, excluded: int = 0) -> Any:
+        """Строки, у которых есть все флаги required и нет ни одного из excluded"""
+        flags = self.arrays['flags']
+        return ((flags & required) == required) & ((flags & excluded) == 0)
+
+    def command_mask(self, literals: Sequence[str], within: Optional[Any] = None) -> Any:
+        """
+        Строки, команда которых (в нижнем регистре) содержит хотя бы одну из подстрок
+
+        :param within: Маска строк, команды которых нужно проверить (None - все строки)
+        """
+        np = _np()
+        mask = np.zeros(len(self.tasks), dtype=bool)
+        literals = [literal for literal in literals if literal]
+        rows = np.arange(len(self.tasks)) if within is None else np.flatnonzero(within)
+        if not literals or not len(rows):
+            return mask
+        buffer, offsets = self._commands(rows)
+        pattern = re.compile('|'.join(re.escape(literal) for literal in literals))
+        positions = np.fromiter((match.start() for match in pattern.finditer(buffer)), dtype=np.int64)
+        if len(positions):
+            mask[rows[np.searchsorted(offsets, positions, side='right') - 1]] = True
+        return mask
+
+    def _commands(self, rows: Any) -> Tuple[str, Any]:
+        # Команды строк rows (в нижнем регистре) одной строкой и смещения их начал в ней
+        np = _np()
+        cache = self._command_cache
+        commands = []
+        for row in rows.tolist():
+            command = cache.get(row)
+            if command is None:
+                command = cache[row] = TaskFacts(self.tasks[row]).command_lower.replace(_SEPARATOR, ' ')
+            commands.append(command)
+        lengths = np.fromiter((len(command) + 1 for command in commands), dtype=np.int64, count=len(commands))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        return _SEPARATOR.join(commands), offsets
+
+    def rule_mask(self, rule: Any) -> Any:
+        """Строки, для которых выполнены предварительные условия правила"""
+        mask = self.module_mask(rule.modules)
+        if rule.required_flags or rule.excluded_flags:
+            mask &= self.flags_mask(rule.required_flags, rule.excluded_flags)
+        if rule.command_literals is not None:
+            mask = self.command_mask(rule.command_literals, mask)
+        return mask
+
+    def select(self, rules: Sequence[Any]) -> Any:
+        """
+        Маски правил (не больше MAX_VECTOR_RULES) одним столбцом int64:
+        бит j строки установлен, если строка проходит условия rules[j]
+        """
+        np = _np()
+        selected = np.zeros(len(self.tasks), dtype=np.int64)
+        for position, rule in enumerate(rules):
+            selected |= self.rule_mask(rule).astype(np.int64) << position
+        return selected
+
+
+def selected_rows(selected: Any, position: Optional[int] = None) -> List[int]:
+    """Номера строк, прошедших маску правила с номером position (None - хотя бы одного правила)"""
+    np = _np()
+    mask = selected if position is None else selected & (1 << position)
+    return np.flatnonzero(mask).tolist()
@@ -1,14 +1,342 @@
-from typing import List, Dict, Any
-from src.rules_engine.rule import Rule
+import time
+from typing import List, Dict, Any, Tuple, Callable, Iterable, Iterator, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
+from src.ast_model.modules import build_module_index
+from src.rules_engine.rule import Rule, CheckRuleAdapter, collect_violations
+from src.rules_engine.stats import RuleStats
+from src.rules_engine.guard import RuleGuard, SCAN_TRUNCATED, scan_truncated
+from src.rules_engine import columns, matcher
 
-# Движок для выполнения проверок правил на AST
+# Движок для выполнения проверок правил на AST.
+# AST обходится один раз: каждый плейбук и каждая задача передаются всем
+# правилам, которые реализуют соответствующий метод-посетитель.
+# Задачи плейбука (play.tasks) - строки плоской таблицы задач (ast_model.table):
+# pre_tasks, tasks, post_tasks, handlers и задачи вложенных блоков обходятся
+# одним циклом, без рекурсии.
+# Нарушения группируются по плейбукам, внутри плейбука - в порядке правил,
+# а для одного правила - в порядке следования задач в документе.
+# Задача передается только правилам, объявившим ее модуль в Rule.modules
+# (или не ограничившим модули вовсе).
+# Нарушения получают позицию задачи или плейбука (line, column, end_line).
+#
+# Со статистикой (stats=True) задачи плейбука обходятся отдельно для каждого
+# правила, чтобы измерить время прохода правила целиком (см. rules_engine.stats);
+# нарушения и их порядок при этом те же.
+#
+# С бюджетами времени (task_budget, file_budget) каждый вызов правила
+# замеряется, и правило, превысившее бюджет, пропускается до конца файла
+# (см. rules_engine.guard). Начало файла отмечается вызовом start_file().
+# Вызов правила, в котором набор выражений с возвратами проверил только
+# начало строки (matcher.MAX_SCAN_CHARS), дает диагностику "scan_truncated".
+#
+# Задачи плейбука можно проверять частями (run_tasks), в том числе в других
+# процессах (см. scanner.shards): нарушения частей, объединенные по порядку,
+# совпадают с результатом run_buckets.
+#
+# Если установлен numpy, для плейбука из columns.VECTOR_MIN_TASKS и более задач
+# предварительные условия правил (модули, флаги задачи, подстроки команды)
+# проверяются векторно по столбцам задач (см. rules_engine.columns), и задача
+# передается только правилам, условия которых она прошла.
 
 class RulesEngine:
-    def __init__(self, rules: List[Rule]):
+    def __init__(self, rules: List[Rule], stats: bool = False, task_budget: float = 0.0, file_budget: float = 0.0,
+                 vectorize: bool = True):
         self.rules = rules
-    
+        self._visitors = [rule if rule.is_visitor() else CheckRuleAdapter(rule) for rule in rules]
+
+        # Связанные методы заранее, чтобы не искать их на каждом узле
+        self._play_visitors = [(i, rule.visit_play) for i, rule in enumerate(self._visitors)
+                               if type(rule).visit_play is not Rule.visit_play]
+        self._task_visitors = [(i, rule.visit_task) for i, rule in enumerate(self._visitors)
+                               if type(rule).visit_task is not Rule.visit_task]
+        self._dispatch: Dict[str, List[Tuple[int, Callable]]] = {}
+        self._play_rules = {i for i, _ in self._play_visitors}
+        self.stats: Optional[List[RuleStats]] = [RuleStats() for _ in rules] if stats else None
+        self.guard: Optional[RuleGuard] = None
+        self._path = ''
+        self._truncations: List[Dict[str, Any]] = []  # Диагностики scan_truncated
+        if task_budget or file_budget:
+            self.guard = RuleGuard([rule.id for rule in rules], task_budget, file_budget)
+        self._vectorize = (vectorize and 0 < len(self._task_visitors) <= columns.MAX_VECTOR_RULES
+                           and any(columns.has_prefilter(self._visitors[index]) for index, _ in self._task_visitors)
+                           and columns.numpy_available())
+
+    def start_file(self, path: str = ''):
+        """Начало нового файла: бюджеты времени правил отсчитываются заново"""
+        self._path = path
+        if self.guard is not None:
+            self.guard.start_file(path)
+
+    def take_diagnostics(self) -> List[Dict[str, Any]]:
+        """Диагностики (превышения бюджетов, обрезанный вход шаблонов) с момента предыдущего вызова"""
+        diagnostics = self.guard.take_diagnostics() if self.guard is not None else []
+        diagnostics.extend(self._truncations)
+        self._truncations = []
+        return diagnostics
+
+    def add_diagnostics(self, diagnostics: List[Dict[str, Any]]):
+        """Добавляет диагностики, полученные в другом процессе"""
+        timeouts = []
+        for diagnostic in diagnostics:
+            if diagnostic['type'] == SCAN_TRUNCATED:
+                self._truncations.append(dict(diagnostic, file=self._path))
+            else:
+                timeouts.append(diagnostic)
+        if self.guard is not None:
+            self.guard.add(timeouts)
+
+    def _truncated(self, index: int, node: Any, play: PlayNode):
+        self._truncations.append(scan_truncated(self.rules[index].id, self._path, node, play))
+
     def run(self, ast: List[Any]) -> List[Dict[str, Any]]:
         violations = []
-        for rule in self.rules:
-            violations.extend(rule.check(ast))
+        self.start_file()
+        for play in ast:
+            if isinstance(play, PlayNode):
+                violations.extend(self.run_play(play))
         return violations
+
+    def run_play(self, play: PlayNode) -> List[Dict[str, Any]]:
+        violations = []
+        for bucket in self.run_buckets(play):
+            violations.extend(bucket)
+        return violations
+
+    def run_buckets(self, play: PlayNode) -> List[List[Dict[str, Any]]]:
+        """Нарушения плейбука, сгруппированные по правилам (в порядке self.rules)"""
+        buckets = self.run_play_visitors(play)
+        return self.run_tasks(play, play.tasks, buckets, play.module_index)
+
+    def run_tasks(self, play: PlayNode, tasks: List[TaskNode],
+                  buckets: Optional[List[List[Dict[str, Any]]]] = None,
+                  module_index: Optional[Dict[str, List[TaskNode]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Нарушения правил уровня задач (visit_task) для задач tasks плейбука play,
+        сгруппированные по правилам; tasks может быть частью задач плейбука (см. scanner.shards)
+
+        :param buckets: Добавить нарушения к этим группам (например, к результату run_play_visitors)
+        """
+        if buckets is None:
+            buckets = [[] for _ in self._visitors]
+
+        # Правила, модулей которых нет среди задач, не участвуют в обходе вовсе
+        module_index = module_index or build_module_index(tasks)
+        selected = self._select(play, tasks)
+        if self.stats is not None:
+            self._run_tasks_with_stats(play, tasks, module_index, buckets, selected)
+            return buckets
+        if self.guard is not None or selected is not None:
+            self._run_tasks_dispatched(play, self._dispatch_tasks(tasks, selected), buckets)
+            return buckets
+        dispatch = {module_id: self._visitors_for(module_id) for module_id in module_index}
+
+        for task in tasks:
+            visitors = dispatch.get(task.module_id)
+            if visitors is None:
+                visitors = self._visitors_for(task.module_id)
+            for index, visit in visitors:
+                scans = matcher.truncated_scans
+                result = visit(task, play)
+                if matcher.truncated_scans != scans:
+                    self._truncated(index, task, play)
+                if result:
+                    collect_violations(buckets[index], result, task)
+            # Общие для правил производные данные задачи больше не нужны
+            task.drop_facts()
+
+        return buckets
+
+    def _select(self, play: PlayNode, tasks: List[TaskNode]) -> Optional[Any]:
+        # Маски правил уровня задач (см. columns.TaskColumns.select); None - без векторной проверки
+        if not self._vectorize or len(tasks) < columns.VECTOR_MIN_TASKS:
+            return None
+        task_columns = columns.TaskColumns()
+        task_columns.add_play(play, tasks)
+        return task_columns.select([self._visitors[index] for index, _ in self._task_visitors])
+
+    def _dispatch_tasks(self, tasks: List[TaskNode],
+                        selected: Optional[Any]) -> Iterator[Tuple[TaskNode, List[Tuple[int, Callable]]]]:
+        # Задачи и правила, которым их нужно передать
+        if selected is None:
+            for task in tasks:
+                yield task, self._visitors_for(task.module_id)
+            return
+        by_bits: Dict[int, List[Tuple[int, Callable]]] = {}
+        rows = columns.selected_rows(selected)
+        for row, bits in zip(rows, selected[rows].tolist()):
+            visitors = by_bits.get(bits)
+            if visitors is None:
+                visitors = by_bits[bits] = [visitor for position, visitor in enumerate(self._task_visitors)
+                                            if bits >> position & 1]
+            yield tasks[row], visitors
+
+    def _run_tasks_dispatched(self, play: PlayNode, dispatched: Iterable[Tuple[TaskNode, List[Tuple[int, Callable]]]],
+                              buckets: List[List[Dict[str, Any]]]):
+        # То же, что обход в run_tasks, для готового списка правил каждой задачи;
+        # с бюджетами - с замером каждого вызова правила
+        guard = self.guard
+        if guard is None:
+            for task, visitors in dispatched:
+                for index, visit in visitors:
+                    scans = matcher.truncated_scans
+                    result = visit(task, play)
+                    if matcher.truncated_scans != scans:
+                        self._truncated(index, task, play)
+                    if result:
+                        collect_violations(buckets[index], result, task)
+                task.drop_facts()
+            return
+
+        clock = time.perf_counter
+        spent = guard.spent
+        task_budget, file_budget = guard.task_budget, guard.file_budget
+        for task, visitors in dispatched:
+            for index, visit in visitors:
+                if index in guard.disabled:
+                    continue
+                scans = matcher.truncated_scans
+                start = clock()
+                result = visit(task, play)
+                elapsed = clock() - start
+                if matcher.truncated_scans != scans:
+                    self._truncated(index, task, play)
+                if result:
+                    collect_violations(buckets[index], result, task)
+                spent[index] += elapsed
+                if elapsed > task_budget or spent[index] > file_budget:
+                    guard.timeout(index, elapsed, task, play)
+            task.drop_facts()
+
+    def run_play_visitors(self, play: PlayNode) -> List[List[Dict[str, Any]]]:
+        """Нарушения правил уровня плейбука (visit_play), сгруппированные по правилам"""
+        buckets: List[List[Dict[str, Any]]] = [[] for _ in self._visitors]
+        if self.stats is not None or self.guard is not None:
+            guard = self.guard
+            for index, visit in self._play_visitors:
+                if guard is not None and index in guard.disabled:
+                    continue
+                scans = matcher.truncated_scans
+                wall, cpu = time.perf_counter(), time.process_time()
+                collect_violations(buckets[index], visit(play), play)
+                elapsed = time.perf_counter() - wall
+                if matcher.truncated_scans != scans:
+                    self._truncated(index, play, play)
+                if self.stats is not None:
+                    stats = self.stats[index]
+                    stats.wall += elapsed
+                    stats.cpu += time.process_time() - cpu
+                    stats.plays += 1
+                    stats.violations += len(buckets[index])
+                if guard is not None:
+                    guard.spent[index] += elapsed
+                    if elapsed > guard.task_budget or guard.spent[index] > guard.file_budget:
+                        guard.timeout(index, elapsed, play)
+            if self.stats is not None:
+                # Плейбук учитывается и у правил только уровня задач (их задачи
+                # могут проверяться частями, см. run_tasks)
+                for index, _ in self._task_visitors:
+                    if index not in self._play_rules and (guard is None or index not in guard.disabled):
+                        self.stats[index].plays += 1
+            return buckets
+        for index, visit in self._play_visitors:
+            scans = matcher.truncated_scans
+            collect_violations(buckets[index], visit(play), play)
+            if matcher.truncated_scans != scans:
+                self._truncated(index, play, play)
+        return buckets
+
+    def _run_tasks_with_stats(self, play: PlayNode, tasks: List[TaskNode], module_index: Dict[str, List[TaskNode]],
+                              buckets: List[List[Dict[str, Any]]], selected: Optional[Any] = None):
+        # Каждое правило проходит все принимаемые задачи за один замер времени
+        guard = self.guard
+        for position, (index, visit) in enumerate(self._task_visitors):
+            if guard is not None and index in guard.disabled:
+                continue
+            rule = self._visitors[index]
+            stats = self.stats[index]
+            bucket = buckets[index]
+            found = len(bucket)
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            if selected is not None:
+                candidates = [tasks[row] for row in columns.selected_rows(selected, position)]
+                accepted_count = len(candidates)
+            else:
+                accepted = {module_id for module_id in module_index if rule.accepts_module(module_id)}
+                accepted_count = sum(len(module_index[module_id]) for module_id in accepted)
+                candidates = [task for task in tasks if task.module_id in accepted]
+            examined = accepted_count
+            if guard is None:
+                for task in candidates:
+                    scans = matcher.truncated_scans
+                    result = visit(task, play)
+                    if matcher.truncated_scans != scans:
+                        self._truncated(index, task, play)
+                    if result:
+                        collect_violations(bucket, result, task)
+            else:
+                examined = self._visit_guarded(index, visit, play, candidates, bucket)
+            stats.wall += time.perf_counter() - wall
+            stats.cpu += time.process_time() - cpu
+
+            stats.tasks += examined
+            stats.rejected += len(tasks) - accepted_count
+            stats.violations += len(bucket) - found
+
+        for task in tasks:
+            task.drop_facts()
+
+    def _visit_guarded(self, index: int, visit: Callable, play: PlayNode, tasks: List[TaskNode],
+                       bucket: List[Dict[str, Any]]) -> int:
+        # Проход правила по принимаемым задачам с бюджетами; возвращает число проверенных задач
+        guard = self.guard
+        clock = time.perf_counter
+        examined = 0
+        for task in tasks:
+            examined += 1
+            scans = matcher.truncated_scans
+            start = clock()
+            result = visit(task, play)
+            elapsed = clock() - start
+            if matcher.truncated_scans != scans:
+                self._truncated(index, task, play)
+            if result:
+                collect_violations(bucket, result, task)
+            guard.spent[index] += elapsed
+            if elapsed > guard.task_budget or guard.spent[index] > guard.file_budget:
+                guard.timeout(index, elapsed, task, play)
+                break
+        return examined
+
+    def take_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Статистика правил с момента предыдущего вызова: rule_id -> поля RuleStats"""
+        if self.stats is None:
+            return {}
+        taken = {rule.id: stats.to_dict() for rule, stats in zip(self.rules, self.stats)}
+        self.stats = [RuleStats() for _ in self.rules]
+        return taken
+
+    def add_stats(self, stats: Dict[str, Dict[str, Any]]):
+        """Добавляет статистику, полученную в другом процессе (например, для части задач плейбука)"""
+        if self.stats is None:
+            return
+        for rule, rule_stats in zip(self.rules, self.stats):
+            values = stats.get(rule.id)
+            if values is not None:
+                rule_stats.add(values)
+
+    def run_task(self, task: TaskNode, play: PlayNode) -> List[List[Dict[str, Any]]]:
+        """Нарушения одной задачи, сгруппированные по правилам (для инкрементального анализа)"""
+        buckets: List[List[Dict[str, Any]]] = [[] for _ in self._visitors]
+        for index, visit in self._visitors_for(task.module_id):
+            collect_violations(buckets[index], visit(task, play), task)
+        task.drop_facts()
+        return buckets
+
+    def _visitors_for(self, module_id: str) -> List[Tuple[int, Callable]]:
+        visitors = self._dispatch.get(module_id)
+        if visitors is None:
+            visitors = [(index, visit) for index, visit in self._task_visitors
+                        if self._visitors[index].accepts_module(module_id)]
+            self._dispatch[module_id] = visitors
+        return visitors
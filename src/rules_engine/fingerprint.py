@@ -0,0 +1,37 @@
+import re
+import json
+import hashlib
+from typing import Any
+
+# Отпечатки нарушений для базовой линии (см. reports.baseline).
+#
+# Отпечаток не зависит от позиции в файле: он строится из идентификатора
+# правила, нормализованной идентичности узла (имена плейбука и задачи,
+# канонический модуль) и содержимого параметров задачи. Перемещение задачи,
+# добавление строк и переформатирование YAML отпечаток не меняют;
+# изменение команды или параметров задачи - меняет.
+
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize(value: Any) -> str:
+    return _SPACES.sub(' ', str(value or '')).strip().lower()
+
+
+def _content(data: Any) -> str:
+    try:
+        return json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    except TypeError:
+        # Ключи разных типов не сортируются; порядок ключей в документе тоже стабилен
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def fingerprint(rule_id: str, node: Any) -> str:
+    """Отпечаток нарушения правила rule_id на узле node (задаче или плейбуке)"""
+    module_id = getattr(node, 'module_id', None)
+    if module_id is not None:
+        identity = ['task', _normalize(node.name), module_id, _content(node.parameters)]
+    else:
+        identity = ['play', _normalize(getattr(node, 'name', '')), _normalize(getattr(node, 'hosts', ''))]
+    text = '\0'.join([rule_id] + identity)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
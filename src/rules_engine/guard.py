@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional, Set
+
+# Бюджеты времени правил.
+#
+# Движок измеряет время каждого вызова правила и суммарное время правила
+# в текущем файле. Если вызов на одной задаче (или плейбуке) дольше бюджета
+# задачи либо суммарное время правила в файле превысило бюджет файла,
+# правило пропускается для оставшихся узлов файла, а в результат анализа
+# добавляется диагностика "rule_timeout". Результаты такого правила для
+# файла неполны и не сохраняются в кеше.
+#
+# Время проверяется после вызова: прервать один вызов нельзя, поэтому вход
+# наборов регулярных выражений с возвратами дополнительно ограничен
+# (см. matcher.MAX_SCAN_CHARS); каждая обрезка входа - диагностика
+# "scan_truncated" (scan_truncated), результаты правила для файла тоже
+# не сохраняются в кеше.
+
+DEFAULT_TASK_BUDGET = 1.0  # с, один вызов правила на задаче или плейбуке
+DEFAULT_FILE_BUDGET = 10.0  # с, все вызовы правила в одном файле
+
+RULE_TIMEOUT = 'rule_timeout'
+SCAN_TRUNCATED = 'scan_truncated'
+
+
+def scan_truncated(rule_id: str, path: str, node: Any, play: Optional[Any] = None) -> Dict[str, Any]:
+    """Диагностика: правило проверило только начало строки задачи (или плейбука) node"""
+    from src.rules_engine.matcher import MAX_SCAN_CHARS
+
+    play = play or node
+    task = node if node is not play else None
+    if task is None:
+        where = "плейбука"
+    else:
+        where = f"задачи '{task.name}'" if task.name else "задачи"
+    return {
+        'type': SCAN_TRUNCATED,
+        'rule_id': rule_id,
+        'file': path,
+        'play': getattr(play, 'name', None) or None,
+        'task': getattr(task, 'name', None) or None,
+        'line': getattr(node, 'line', 0),
+        'limit': MAX_SCAN_CHARS,
+        'message': (f"Правило {rule_id} проверило только первые {MAX_SCAN_CHARS} символов строки {where}: "
+                    f"остальная часть строки не проверялась"),
+    }
+
+
+class RuleGuard:
+    """Учет времени правил в текущем файле и диагностики превышения бюджетов"""
+
+    def __init__(self, rule_ids: List[str], task_budget: float = DEFAULT_TASK_BUDGET,
+                 file_budget: float = DEFAULT_FILE_BUDGET):
+        self.rule_ids = rule_ids
+        # 0 - бюджет не ограничен
+        self.task_budget = task_budget or float('inf')
+        self.file_budget = file_budget or float('inf')
+        self.path = ''
+        self.spent = [0.0] * len(rule_ids)
+        self.disabled: Set[int] = set()
+        self.diagnostics: List[Dict[str, Any]] = []
+
+    def start_file(self, path: str = ''):
+        self.path = path
+        self.spent = [0.0] * len(self.rule_ids)
+        self.disabled = set()
+
+    def timeout(self, index: int, elapsed: float, node: Any, play: Optional[Any] = None):
+        """Отключает правило до конца файла и записывает диагностику"""
+        rule_id = self.rule_ids[index]
+        if elapsed > self.task_budget:
+            scope, budget, spent = 'task', self.task_budget, elapsed
+        else:
+            scope, budget, spent = 'file', self.file_budget, self.spent[index]
+        self.disabled.add(index)
+
+        play = play or node
+        task = node if node is not play else None
+        if task is None:
+            where = "плейбуке"
+        else:
+            where = f"задаче '{task.name}'" if task.name else "задаче"
+        self.diagnostics.append({
+            'type': RULE_TIMEOUT,
+            'rule_id': rule_id,
+            'scope': scope,
+            'file': self.path,
+            'play': getattr(play, 'name', None) or None,
+            'task': getattr(task, 'name', None) or None,
+            'line': getattr(node, 'line', 0),
+            'elapsed': round(spent, 3),
+            'budget': budget,
+            'message': (f"Правило {rule_id} превысило бюджет времени {'задачи' if scope == 'task' else 'файла'} "
+                        f"({spent:.3g} с > {budget:g} с) на {where} и пропущено для оставшейся части файла"),
+        })
+
+    def add(self, diagnostics: List[Dict[str, Any]]):
+        """Диагностики, полученные в другом процессе (для части задач файла): правило отключается и здесь"""
+        for diagnostic in diagnostics:
+            index = self.rule_ids.index(diagnostic['rule_id'])
+            if index not in self.disabled:
+                self.disabled.add(index)
+                self.diagnostics.append(dict(diagnostic, file=self.path))
+
+    def take_diagnostics(self) -> List[Dict[str, Any]]:
+        diagnostics, self.diagnostics = self.diagnostics, []
+        return diagnostics
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import importlib
+from typing import Any, Dict, Iterable, List, Optional
+
+# Манифест правил: описание всех правил (идентификатор, критичность, модули
+# задач, модуль Python с классом правила) в файле rules/manifest.json.
+#
+# Манифест читается без импорта модулей правил, поэтому выбор правил
+# (--rules, --exclude-rules, --min-severity) не требует их загрузки:
+# импортируются и создаются только выбранные правила.
+#
+# Манифест генерируется после добавления или изменения правила:
+#     python -m src.rules_engine.manifest
+
+RULES_DIR = os.path.join(os.path.dirname(__file__), 'rules')
+MANIFEST_PATH = os.path.join(RULES_DIR, 'manifest.json')
+RULES_PACKAGE = 'src.rules_engine.rules'
+
+# Уровни критичности по возрастанию
+SEVERITY_LEVELS = ('LOW', 'MEDIUM', 'HIGH')
+
+
+def _rule_modules() -> List[str]:
+    """Имена модулей правил (ANSXXX) в каталоге rules"""
+    return sorted(filename[:-3] for filename in os.listdir(RULES_DIR)
+                  if filename.startswith('ANS') and filename.endswith('.py'))
+
+
+def _entry(module_name: str) -> Optional[Dict[str, Any]]:
+    """Запись манифеста для модуля правила (модуль импортируется)"""
+    rule = _create(f"{RULES_PACKAGE}.{module_name}", module_name)
+    if rule is None:
+        return None
+    return {
+        'id': rule.id,
+        'severity': rule.severity,
+        'description': rule.description,
+        'modules': sorted(rule.modules) if rule.modules is not None else None,
+        'module': f"{RULES_PACKAGE}.{module_name}",
+        'class': module_name,
+    }
+
+
+def _create(module_path: str, class_name: str) -> Optional[Any]:
+    """Импортирует модуль правила и создает правило; ошибки выводятся в stderr"""
+    try:
+        module = importlib.import_module(module_path)
+        rule_class = getattr(module, class_name, None)
+        if rule_class is None:
+            print(f"Класс {class_name} не найден в модуле {module_path}", file=sys.stderr)
+            return None
+        return rule_class()
+    except Exception as e:
+        print(f"Ошибка загрузки {module_path}: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def generate_manifest(path: str = MANIFEST_PATH) -> List[Dict[str, Any]]:
+    """Импортирует все правила каталога rules и записывает манифест"""
+    manifest = [entry for entry in map(_entry, _rule_modules()) if entry is not None]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'rules': manifest}, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> List[Dict[str, Any]]:
+    """
+    Читает манифест без импорта правил
+
+    Правила каталога rules, отсутствующие в манифесте (добавленные без его
+    генерации), описываются импортом модуля с предупреждением в stderr;
+    без файла манифеста так описываются все правила.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)['rules']
+    except FileNotFoundError:
+        manifest = []
+
+    listed = {entry['class'] for entry in manifest if entry['module'].startswith(RULES_PACKAGE + '.')}
+    unlisted = [name for name in _rule_modules() if name not in listed]
+    if unlisted:
+        print(f"⚠️ Правила отсутствуют в манифесте: {', '.join(unlisted)} "
+              f"(python -m src.rules_engine.manifest)", file=sys.stderr)
+        manifest = manifest + [entry for entry in map(_entry, unlisted) if entry is not None]
+    return manifest
+
+
+def select_rules(manifest: List[Dict[str, Any]], rule_ids: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None,
+                 min_severity: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Записи манифеста выбранных правил
+
+    :param rule_ids: Только эти правила (None - все)
+    :param exclude: Исключаемые правила
+    :param min_severity: Минимальная критичность (LOW, MEDIUM, HIGH)
+    """
+    selected = set(rule_ids) if rule_ids is not None else None
+    excluded = set(exclude or ())
+    level = SEVERITY_LEVELS.index(min_severity) if min_severity else 0
+    return [entry for entry in manifest
+            if (selected is None or entry['id'] in selected) and entry['id'] not in excluded
+            and SEVERITY_LEVELS.index(entry['severity']) >= level]
+
+
+def create_rules(entries: List[Dict[str, Any]]) -> List[Any]:
+    """Импортирует модули и создает правила для записей манифеста"""
+    rules = []
+    for entry in entries:
+        rule = _create(entry['module'], entry['class'])
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+if __name__ == "__main__":
+    rules = generate_manifest()
+    print(f"Манифест правил записан: {MANIFEST_PATH} (правил {len(rules)})")
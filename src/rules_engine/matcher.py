@@ -0,0 +1,169 @@
+import re
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+# Общий сопоставитель наборов шаблонов для правил.
+#
+# Правила регистрируют свои списки индикаторов и регулярных выражений один раз
+# при загрузке модуля (compile_literals / compile_patterns). Набор компилируется
+# в одно объединенное регулярное выражение, поэтому проверка "есть ли хоть одно
+# совпадение" - это один проход по строке вместо цикла по шаблонам.
+#
+# findall возвращает метки всех совпавших шаблонов в порядке регистрации.
+# Большинство строк не совпадает ни с одним шаблоном и отсеивается одним
+# проходом объединенного выражения; только для совпавших строк шаблоны
+# проверяются по отдельности (совпадения разных шаблонов могут перекрываться).
+# Для подстрок это оператор in: на реальных строках он быстрее, чем
+# поиск всех перекрывающихся совпадений одним выражением с просмотром вперед
+# (см. benchmarks/bench_matcher.py).
+#
+# Шаблоны вида "a, затем b, затем c в одной строке" регистрируются через
+# compile_sequences и проверяются за линейное время. Набор регулярных
+# выражений с возвратами ('a.*b.*c'), которые на многомегабайтной строке
+# работают квадратичное и большее время, регистрируется с backtracking=True:
+# такой набор проверяет не больше MAX_SCAN_CHARS символов строки, а каждая
+# обрезка учитывается в счетчике truncated_scans - движок правил превращает
+# ее в диагностику "scan_truncated" (см. rules_engine.guard). Остальные
+# наборы проверяют строку целиком.
+
+PatternSpec = Union[str, Tuple[str, str]]
+SequenceSpec = Union[Tuple[str, ...], Tuple[Tuple[str, ...], str]]
+
+MAX_SCAN_CHARS = 64 * 1024
+
+# Число проверок наборов с возвратами, вход которых был обрезан до MAX_SCAN_CHARS
+truncated_scans = 0
+
+
+class PatternMatcher:
+    """Скомпилированный набор подстрок или регулярных выражений"""
+
+    def __init__(self, patterns: Iterable[PatternSpec], regex: bool = False, flags: int = 0,
+                 backtracking: bool = False):
+        specs = [(p, p) if isinstance(p, str) else (p[0], p[1]) for p in patterns]
+        self.patterns = [pattern for pattern, _ in specs]
+        self.labels = [label for _, label in specs]
+        self.regex = regex
+        self.flags = flags
+        self.backtracking = backtracking  # Вход ограничен MAX_SCAN_CHARS символами
+
+        if not specs:
+            self._any = None
+            return
+
+        sources = self.patterns if regex else [re.escape(p) for p in self.patterns]
+        self._any = re.compile('|'.join(f'(?:{source})' for source in sources), flags)
+
+        if regex:
+            self._each = [re.compile(source, flags) for source in sources]
+
+    def _limit(self, text: str) -> str:
+        global truncated_scans
+        if self.backtracking and len(text) > MAX_SCAN_CHARS:
+            truncated_scans += 1
+            return text[:MAX_SCAN_CHARS]
+        return text
+
+    def search(self, text: str) -> bool:
+        """Есть ли в строке совпадение хотя бы с одним шаблоном"""
+        text = self._limit(text)
+        return self._any is not None and self._any.search(text) is not None
+
+    def findall(self, text: str) -> List[str]:
+        """Метки всех совпавших шаблонов (без повторов) в порядке регистрации"""
+        text = self._limit(text)
+        if self._any is None or self._any.search(text) is None:
+            return []
+
+        if self.regex:
+            matched = [compiled.search(text) is not None for compiled in self._each]
+        else:
+            matched = [pattern in text for pattern in self.patterns]
+
+        labels = []
+        for label, is_matched in zip(self.labels, matched):
+            if is_matched and label not in labels:
+                labels.append(label)
+        return labels
+
+
+class SequenceMatcher:
+    """
+    Набор последовательностей подстрок: последовательность совпадает, если ее
+    подстроки встречаются в одной строке текста в заданном порядке
+    (как регулярное выражение 'a.*b.*c', но без возвратов)
+    """
+
+    def __init__(self, sequences: Iterable[SequenceSpec], ignore_case: bool = False):
+        specs = [(s[0], s[1]) if len(s) == 2 and isinstance(s[0], tuple) else (tuple(s), '.*'.join(s))
+                 for s in sequences]
+        self.ignore_case = ignore_case
+        self.sequences = [tuple(p.lower() for p in parts) if ignore_case else tuple(parts) for parts, _ in specs]
+        self.labels = [label for _, label in specs]
+
+    def search(self, text: str) -> bool:
+        """Есть ли в тексте совпадение хотя бы с одной последовательностью"""
+        return bool(self.findall(text))
+
+    def findall(self, text: str) -> List[str]:
+        """Метки всех совпавших последовательностей (без повторов) в порядке регистрации"""
+        if self.ignore_case:
+            text = text.lower()
+        labels = []
+        lines = None
+        for parts, label in zip(self.sequences, self.labels):
+            if parts[0] not in text or label in labels:
+                continue
+            if lines is None:
+                lines = text.split('\n')
+            if any(_in_order(line, parts) for line in lines):
+                labels.append(label)
+        return labels
+
+
+def _in_order(line: str, parts: Tuple[str, ...]) -> bool:
+    # Достаточно первого вхождения каждой подстроки после предыдущей
+    position = 0
+    for part in parts:
+        position = line.find(part, position)
+        if position < 0:
+            return False
+        position += len(part)
+    return True
+
+
+_registry: Dict[Tuple, Any] = {}
+
+
+def _compile(patterns: Iterable[PatternSpec], regex: bool, flags: int, backtracking: bool = False) -> PatternMatcher:
+    specs = tuple(p if isinstance(p, str) else (p[0], p[1]) for p in patterns)
+    key = (specs, regex, flags, backtracking)
+    matcher = _registry.get(key)
+    if matcher is None:
+        matcher = PatternMatcher(specs, regex=regex, flags=flags, backtracking=backtracking)
+        _registry[key] = matcher
+    return matcher
+
+
+def compile_literals(patterns: Iterable[PatternSpec]) -> PatternMatcher:
+    """Регистрирует набор подстрок (шаблон или пара (шаблон, метка))"""
+    return _compile(patterns, False, 0)
+
+
+def compile_patterns(patterns: Iterable[PatternSpec], flags: int = 0, backtracking: bool = False) -> PatternMatcher:
+    """
+    Регистрирует набор регулярных выражений (шаблон или пара (шаблон, метка))
+
+    :param backtracking: Выражения с возвратами: проверяются первые MAX_SCAN_CHARS символов строки
+    """
+    return _compile(patterns, True, flags, backtracking)
+
+
+def compile_sequences(sequences: Iterable[SequenceSpec], ignore_case: bool = False) -> SequenceMatcher:
+    """Регистрирует набор последовательностей подстрок (последовательность или пара (последовательность, метка))"""
+    specs = tuple((tuple(s[0]), s[1]) if len(s) == 2 and isinstance(s[0], tuple) else tuple(s) for s in sequences)
+    key = ('sequences', specs, ignore_case)
+    matcher = _registry.get(key)
+    if matcher is None:
+        matcher = SequenceMatcher(specs, ignore_case=ignore_case)
+        _registry[key] = matcher
+    return matcher
@@ -1,20 +1,95 @@
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from abc import ABC
+from typing import List, Dict, Any, Optional, FrozenSet, Tuple
+from src.rules_engine.fingerprint import fingerprint
 
-# Базовый класс для правил анализа кода
+# Базовый класс для правил анализа кода.
+#
+# Правило реализует один или оба метода-посетителя: visit_play вызывается
+# для каждого плейбука, visit_task - для каждой задачи. Движок обходит AST
+# один раз и передает каждый узел всем заинтересованным правилам.
+# Методы возвращают нарушение (dict), список нарушений или None.
+# Контекст задачи - раздел плейбука, объемлющие блоки, унаследованные
+# when и become - правило получает через play.table (ast_model.table.TaskTable).
+#
+# Атрибут modules задает канонические имена модулей (см. ast_model.modules),
+# задачи которых интересуют правило; остальные задачи движок правилу не передает.
+# None означает, что правилу нужны все задачи.
+#
+# Правило может объявить и другие предварительные условия нарушения:
+# флаги задачи, которые должны быть (required_flags) и которых быть не должно
+# (excluded_flags), и подстроки, одна из которых должна встречаться в команде
+# задачи в нижнем регистре (command_literals). На больших плейбуках движок
+# проверяет их векторно (см. rules_engine.columns) и не вызывает правило для
+# остальных задач; условия не должны отсеивать задачи, на которых правило
+# находит нарушения.
 
 class Rule(ABC):
+    modules: Optional[FrozenSet[str]] = None
+    required_flags: int = 0
+    excluded_flags: int = 0
+    command_literals: Optional[Tuple[str, ...]] = None
+
     def __init__(self, id: str, description: str, severity: str):
         self.id = id
         self.description = description
         self.severity = severity  # 'HIGH', 'MEDIUM', 'LOW'
-    
-    @abstractmethod
-    
-    # Проверка AST на соответствие правилу. 
+
+    def visit_play(self, play: Any) -> Optional[Any]:
+        return None
+
+    def visit_task(self, task: Any, play: Any) -> Optional[Any]:
+        return None
+
+    # Проверка AST на соответствие правилу.
+    # Для правил-посетителей выполняет собственный обход AST; правила
+    # старого образца переопределяют этот метод целиком.
 
     def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        pass
-    
+        violations = []
+        for play in ast:
+            collect_violations(violations, self.visit_play(play), play)
+            for task in play.tasks:
+                if self.accepts_module(task.module_id):
+                    collect_violations(violations, self.visit_task(task, play), task)
+        return violations
+
+    def is_visitor(self) -> bool:
+        cls = type(self)
+        return cls.visit_play is not Rule.visit_play or cls.visit_task is not Rule.visit_task
+
+    def accepts_module(self, module_id: str) -> bool:
+        return self.modules is None or module_id in self.modules
+
     def __str__(self):
         return f"{self.id}: {self.description} ({self.severity})"
+
+
+class CheckRuleAdapter(Rule):
+    """Адаптер для правил, реализующих только check(ast): правило вызывается для каждого плейбука"""
+
+    def __init__(self, rule: Rule):
+        super().__init__(rule.id, rule.description, rule.severity)
+        self.rule = rule
+
+    def visit_play(self, play: Any) -> List[Dict[str, Any]]:
+        return self.rule.check([play])
+
+
+def collect_violations(violations: List[Dict[str, Any]], result: Optional[Any], node: Optional[Any] = None):
+    # Добавляет результат метода-посетителя (нарушение, список или None).
+    # Нарушениям без собственной позиции присваивается позиция узла node
+    # (line, column, end_line), если она известна, а также отпечаток
+    # для базовой линии (см. fingerprint).
+    if not result:
+        return
+    if not isinstance(result, list):
+        result = [result]
+    if node is not None:
+        for violation in result:
+            if 'line' not in violation and node.line:
+                violation['line'] = node.line
+                violation['column'] = node.column
+                violation['end_line'] = node.end_line
+            if 'fingerprint' not in violation:
+                violation['fingerprint'] = fingerprint(violation.get('rule_id', ''), node)
+    violations.extend(result)
@@ -1,9 +1,29 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
+from src.rules_engine.matcher import compile_literals
+from src.rules_engine.columns import CHANGED_WHEN, WHEN
 
 # Правило: Использование 'changed_when' без 'when'
 
+CHECK_INDICATORS = compile_literals([
+    'status', 'version', 'info', 'check', 'verify',
+    'test', 'validate', 'health', 'ping'
+])
+IDEMPOTENT_COMMANDS = compile_literals([
+    'echo', 'cat', 'grep', 'find', 'ls', 'pwd', 'whoami',
+    'date', 'uname', 'hostname', 'which', 'type', 'command -v'
+])
+MIGRATION_INDICATORS = compile_literals([
+    'migrate', 'migration', 'db_schema', 'alembic', 'liquibase',
+    'flyway', 'django', 'makemigrations', 'manage.py'
+])
+
 class ANS002(Rule):
+    required_flags = CHANGED_WHEN
+    excluded_flags = WHEN
+    CHECK_MODULES = frozenset(['stat', 'wait_for', 'assert', 'fail'])
+
     def __init__(self):
         super().__init__(
             id="ANS002",
@@ -11,40 +31,32 @@ class ANS002(Rule):
             severity="MEDIUM"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                has_changed_when = task.changed_when is not None  
-                has_when = task.when is not None and task.when != []  
-                
-                if has_changed_when and not has_when:
-                    if self._is_safe_changed_when_usage(task):
-                        continue
-                    
-                    task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                    play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        has_changed_when = task.changed_when is not None  
+        has_when = task.when is not None and task.when != []  
+        if not has_when and play.table is not None:
+            # Условие объемлющего блока распространяется на задачу
+            has_when = bool(play.table.conditions_of(task))
+
+        if has_changed_when and not has_when:
+            if self._is_safe_changed_when_usage(task):
+                return None
 
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': (
-                            f"Задача {task_phrase}{play_phrase} использует 'changed_when', но не имеет 'when'. "
-                            f"Рекомендуется добавить условие 'when' для контроля выполнения задачи."
-                        )
-                    })
-        return violations
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': (
+                    f"Задача {task_phrase}{play_phrase} использует 'changed_when', но не имеет 'when'. "
+                    f"Рекомендуется добавить условие 'when' для контроля выполнения задачи."
+                )
+            }
+        return None
     
     def _is_safe_changed_when_usage(self, task) -> bool:
         if task.changed_when is False or str(task.changed_when).strip().lower() == 'false':
@@ -62,67 +74,35 @@ class ANS002(Rule):
         return False
     
     def _is_check_task(self, task) -> bool:
-        check_indicators = [
-            'status', 'version', 'info', 'check', 'verify', 
-            'test', 'validate', 'health', 'ping'
-        ]
-        
         task_name = (task.name or '').lower()
-        task_module = (task.module or '').lower()
+        task_module = (task.module_id or '').lower()
         
-        if any(indicator in task_name for indicator in check_indicators):
+        if CHECK_INDICATORS.search(task_name):
             return True
             
-        if task_module in ['stat', 'wait_for', 'assert', 'fail']:
+        if task_module in self.CHECK_MODULES:
             return True
             
         return False
     
     def _is_idempotent_command(self, task) -> bool:
-        if task.module != 'command':
+        if task.module_id != 'command':
             return False
             
-        command = self._get_command_string(task)
-        if not command:
+        command_lower = task.facts.command_lower
+        if not command_lower:
             return False
-            
-        command_lower = command.lower()
         
-        idempotent_commands = [
-            'echo', 'cat', 'grep', 'find', 'ls', 'pwd', 'whoami',
-            'date', 'uname', 'hostname', 'which', 'type', 'command -v'
-        ]
-        
-        return any(cmd in command_lower for cmd in idempotent_commands)
+        return IDEMPOTENT_COMMANDS.search(command_lower)
     
     def _is_database_migration(self, task) -> bool:
-        migration_indicators = [
-            'migrate', 'migration', 'db_schema', 'alembic', 'liquibase',
-            'flyway', 'django', 'makemigrations', 'manage.py'
-        ]
-        
         task_name = (task.name or '').lower()
-        command = self._get_command_string(task)
-        command_lower = (command or '').lower()
+        command_lower = task.facts.command_lower
         
-        if any(indicator in task_name for indicator in migration_indicators):
+        if MIGRATION_INDICATORS.search(task_name):
             return True
             
-        if any(indicator in command_lower for indicator in migration_indicators):
+        if MIGRATION_INDICATORS.search(command_lower):
             return True
             
-        return False
-    
-    def _get_command_string(self, task) -> str:
-        if not hasattr(task, 'parameters') or not task.parameters:
-            return ""
-        
-        if isinstance(task.parameters, dict):
-            return (task.parameters.get('cmd') or 
-                   task.parameters.get('command') or 
-                   task.parameters.get('_raw_params') or 
-                   "")
-        elif isinstance(task.parameters, str):
-            return task.parameters
-        
-        return ""
\ No newline at end of file
+        return False
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
 
 # Правило: Отсутствие имени у задачи
@@ -11,30 +12,19 @@ class ANS003(Rule):
             severity="LOW"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                if not task.name or task.name.strip() == "":
-                    play_phrase = ""
-                    if play.name and play.name.strip():
-                        play_phrase = f" в плейбуке '{play.name.strip()}'"
-                    
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': f"Задача{play_phrase} не имеет имени. "
-                                   f"Рекомендуется добавить 'name' для лучшей читаемости и отладки."
-                    })
-        return violations
\ No newline at end of file
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if not task.name or task.name.strip() == "":
+            play_phrase = ""
+            if play.name and play.name.strip():
+                play_phrase = f" в плейбуке '{play.name.strip()}'"
+
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': f"Задача{play_phrase} не имеет имени. "
+                           f"Рекомендуется добавить 'name' для лучшей читаемости и отладки."
+            }
+        return None
\ No newline at end of file
@@ -1,9 +1,12 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
 
 # Правило: Использование устаревшего модуля raw
 
 class ANS005(Rule):
+    modules = frozenset(['raw'])
+
     def __init__(self):
         super().__init__(
             id="ANS005",
@@ -11,31 +14,20 @@ class ANS005(Rule):
             severity="MEDIUM"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if task.module_id in self.modules:
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
 
-                if task.module in ['raw', 'ansible.builtin.raw']:
-                    task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                    play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                    
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': (
-                            f"Задача {task_phrase}{play_phrase} использует устаревший модуль raw. "
-                            f"Рекомендуется использовать модули command/shell."
-                        )
-                    })
-        return violations
\ No newline at end of file
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': (
+                    f"Задача {task_phrase}{play_phrase} использует устаревший модуль raw. "
+                    f"Рекомендуется использовать модули command/shell."
+                )
+            }
+        return None
\ No newline at end of file
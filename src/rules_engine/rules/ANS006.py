@@ -1,9 +1,37 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
+from src.rules_engine.matcher import compile_literals
 
 # Правило: Создание/изменение файлов без указания owner, group и mode
 
+STANDARD_DIRS = compile_literals([
+    '/opt/', '/var/log/', '/home/', '/var/lib/',
+    '/usr/local/', '/etc/', '/tmp/', '/var/tmp/'
+])
+SYSTEM_CONFIGS = compile_literals([
+    '/etc/', '/usr/lib/', '/lib/', '/opt/',
+    '.service', '.conf', '.ini', '.yml', '.yaml',
+    '.json', '.xml', '.properties', '.cfg'
+])
+TEMPORARY_INDICATORS = compile_literals([
+    '/tmp/', '/var/tmp/', '/dev/shm/',
+    'temp', 'tmp', 'cache', 'scratch'
+])
+SENSITIVE_TEMP_PATHS = compile_literals(['/tmp/.ssh/', '/tmp/secret', '/tmp/config'])
+DANGEROUS_NUMERIC_MODES = frozenset([
+    '0777', '777', '0775', '775',
+    '0666', '666', '0664', '664',
+    '0770', '770', '0660', '660'
+])
+DANGEROUS_SYMBOLIC_MODES = compile_literals([
+    'a+rwx', 'a+rw', 'ugo+rwx', 'ugo+rw',
+    'rwxrwxrwx', 'rw-rw-rw-', 'rw-r--r--'
+])
+
 class ANS006(Rule):
+    modules = frozenset(['copy', 'template', 'file'])
+
     def __init__(self):
         super().__init__(
             id="ANS006",
@@ -11,56 +39,40 @@ class ANS006(Rule):
             severity="MEDIUM"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                if self._is_file_creation_module(task):
-                    permission_issues = self._check_permission_issues(task)
-                    if permission_issues:
-                        task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                        play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                        
-                        issues_str = ", ".join(permission_issues)
-                        
-                        violations.append({
-                            'rule_id': self.id,
-                            'description': self.description,
-                            'severity': self.severity,
-                            'play': play.name or None,
-                            'task': task.name or None,
-                            'message': (
-                                f"Задача {task_phrase}{play_phrase} содержит проблемы с правами доступа: {issues_str}. "
-                                f"Рекомендуется явно задавать безопасные права доступа."
-                            )
-                        })
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if self._is_file_creation_module(task):
+            permission_issues = self._check_permission_issues(task)
+            if permission_issues:
+                task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+                play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+                issues_str = ", ".join(permission_issues)
+
+                return {
+                    'rule_id': self.id,
+                    'description': self.description,
+                    'severity': self.severity,
+                    'play': play.name or None,
+                    'task': task.name or None,
+                    'message': (
+                        f"Задача {task_phrase}{play_phrase} содержит проблемы с правами доступа: {issues_str}. "
+                        f"Рекомендуется явно задавать безопасные права доступа."
+                    )
+                }
+        return None
     
     def _is_file_creation_module(self, task) -> bool:
-        if not hasattr(task, 'module') or not task.module:
+        if task.module_id not in self.modules:
             return False
-            
-        file_creation_modules = [
-            'copy', 'template', 'file',
-            'ansible.builtin.copy', 'ansible.builtin.template', 'ansible.builtin.file'
-        ]
-        
-        if task.module in ['file', 'ansible.builtin.file']:
+
+        if task.module_id == 'file':
             params = task.parameters if hasattr(task, 'parameters') else {}
             if isinstance(params, dict):
                 state = params.get('state', 'file')
                 if state in ['absent', 'link', 'hard']:
                     return False
         
-        return task.module in file_creation_modules
+        return True
     
     def _check_permission_issues(self, task) -> List[str]:
         issues = []
@@ -72,7 +84,7 @@ class ANS006(Rule):
         if not isinstance(params, dict):
             return issues
         
-        dest = params.get('dest', '') or params.get('path', '')
+        dest = task.facts.dest or task.facts.path
         owner = params.get('owner')
         group = params.get('group')
         mode = params.get('mode')
@@ -97,10 +109,10 @@ class ANS006(Rule):
         if self._is_temporary_path(dest):
             return False
             
-        if hasattr(task, 'module') and task.module in ['template', 'ansible.builtin.template']:
+        if task.module_id == 'template':
             return False
             
-        if hasattr(task, 'module') and task.module in ['file', 'ansible.builtin.file']:
+        if task.module_id == 'file':
             if params.get('state') == 'directory':
                 if self._is_standard_directory_path(dest):
                     return False
@@ -119,41 +131,22 @@ class ANS006(Rule):
             return False
             
         path_lower = path.lower()
-        standard_dirs = [
-            '/opt/', '/var/log/', '/home/', '/var/lib/',
-            '/usr/local/', '/etc/', '/tmp/', '/var/tmp/'
-        ]
-        
-        return any(std_dir in path_lower for std_dir in standard_dirs)
+        return STANDARD_DIRS.search(path_lower)
     
     def _is_system_config(self, path: str) -> bool:
         if not path:
             return False
             
         path_lower = path.lower()
-        system_configs = [
-            '/etc/', '/usr/lib/', '/lib/', '/opt/',
-            '.service', '.conf', '.ini', '.yml', '.yaml', 
-            '.json', '.xml', '.properties', '.cfg'
-        ]
-        
-        return any(config in path_lower for config in system_configs)
+        return SYSTEM_CONFIGS.search(path_lower)
     
     def _is_temporary_path(self, path: str) -> bool:
         if not path:
             return False
             
         path_lower = path.lower()
-        temporary_indicators = [
-            '/tmp/', '/var/tmp/', '/dev/shm/', 
-            'temp', 'tmp', 'cache', 'scratch'
-        ]
-        
-        for indicator in temporary_indicators:
-            if indicator in path_lower:
-                if any(sys_conf in path_lower for sys_conf in ['/tmp/.ssh/', '/tmp/secret', '/tmp/config']):
-                    return False
-                return True
+        if TEMPORARY_INDICATORS.search(path_lower):
+            return not SENSITIVE_TEMP_PATHS.search(path_lower)
                 
         return False
     
@@ -163,21 +156,10 @@ class ANS006(Rule):
             
         mode_str = str(mode).strip().replace('"', '').replace("'", "")
         
-        dangerous_numeric_modes = [
-            '0777', '777', '0775', '775', 
-            '0666', '666', '0664', '664',
-            '0770', '770', '0660', '660'
-        ]
-        
-        if mode_str in dangerous_numeric_modes:
+        if mode_str in DANGEROUS_NUMERIC_MODES:
             return True
         
-        dangerous_symbolic_modes = [
-            'a+rwx', 'a+rw', 'ugo+rwx', 'ugo+rw',
-            'rwxrwxrwx', 'rw-rw-rw-', 'rw-r--r--'
-        ]
-        
-        if any(dangerous in mode_str for dangerous in dangerous_symbolic_modes):
+        if DANGEROUS_SYMBOLIC_MODES.search(mode_str):
             return True
             
         if mode_str.isdigit():
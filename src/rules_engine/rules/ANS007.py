@@ -1,8 +1,11 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
 
 # Правило: Отключение проверки SSL/TLS сертификатов
 
+INSECURE_SCHEMES = ('http://', 'ftp://', 'tcp://')
+
 class ANS007(Rule):
     def __init__(self):
         super().__init__(
@@ -11,34 +14,23 @@ class ANS007(Rule):
             severity="HIGH"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                if self._has_disabled_ssl_verification(task):
-                    task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                    play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                    
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': (
-                            f"Задача {task_phrase}{play_phrase} отключает проверку SSL/TLS сертификатов. "
-                            f"Рекомендуется использовать валидные сертификаты и не отключать проверку."
-                        )
-                    })
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if self._has_disabled_ssl_verification(task):
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': (
+                    f"Задача {task_phrase}{play_phrase} отключает проверку SSL/TLS сертификатов. "
+                    f"Рекомендуется использовать валидные сертификаты и не отключать проверку."
+                )
+            }
+        return None
     
     def _has_disabled_ssl_verification(self, task) -> bool:
         if not hasattr(task, 'parameters') or not isinstance(task.parameters, dict):
@@ -87,7 +79,6 @@ class ANS007(Rule):
         return False
     
     def _has_insecure_scheme(self, url: str) -> bool:
-        insecure_schemes = ['http://', 'ftp://', 'tcp://']
         if 'localhost' in url or '127.0.0.1' in url:
             return False
-        return any(url.startswith(scheme) for scheme in insecure_schemes)
\ No newline at end of file
+        return url.startswith(INSECURE_SCHEMES)
\ No newline at end of file
@@ -1,9 +1,12 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
 
 # Правило: Установка пакетов без фиксации версий
 
 class ANS008(Rule):
+    modules = frozenset(['package', 'apt', 'yum', 'dnf', 'pacman', 'zypper', 'pip'])
+
     def __init__(self):
         super().__init__(
             id="ANS008",
@@ -11,48 +14,30 @@ class ANS008(Rule):
             severity="HIGH"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                if self._is_package_management_task(task):
-                    if self._has_unversioned_package_install(task):
-                        task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                        play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                        
-                        violations.append({
-                            'rule_id': self.id,
-                            'description': self.description,
-                            'severity': self.severity,
-                            'play': play.name or None,
-                            'task': task.name or None,
-                            'message': (
-                                f"Задача {task_phrase}{play_phrase} устанавливает пакеты без фиксации версий. "
-                                f"Рекомендуется явно указывать версии пакетов."
-                            )
-                        })
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if self._is_package_management_task(task):
+            if self._has_unversioned_package_install(task):
+                task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+                play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+                return {
+                    'rule_id': self.id,
+                    'description': self.description,
+                    'severity': self.severity,
+                    'play': play.name or None,
+                    'task': task.name or None,
+                    'message': (
+                        f"Задача {task_phrase}{play_phrase} устанавливает пакеты без фиксации версий. "
+                        f"Рекомендуется явно указывать версии пакетов."
+                    )
+                }
+        return None
     
     def _is_package_management_task(self, task) -> bool:
-        package_modules = [
-            'package', 'apt', 'yum', 'dnf', 'pacman', 'zypper',
-            'ansible.builtin.package', 'ansible.builtin.apt', 
-            'ansible.builtin.yum', 'ansible.builtin.dnf',
-            'ansible.builtin.pacman', 'ansible.builtin.zypper',
-            'pip', 'ansible.builtin.pip'
-        ]
-        return task.module in package_modules
+        return task.module_id in self.modules
     
     def _has_unversioned_package_install(self, task) -> bool:
-        if task.module in ['pip', 'ansible.builtin.pip']:
+        if task.module_id == 'pip':
             return False
         
         if task.parameters.get('state') == 'present':
@@ -85,7 +70,7 @@ class ANS008(Rule):
         if 'requirements' in params:
             return False
             
-        if 'name' in params and task.module in ['pip', 'ansible.builtin.pip']:
+        if 'name' in params and task.module_id == 'pip':
             package_spec = params['name']
             if isinstance(package_spec, str):
                 return '==' not in package_spec and '>=' not in package_spec and '<=' not in package_spec
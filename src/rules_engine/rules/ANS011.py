@@ -1,7 +1,17 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
+from src.rules_engine.matcher import compile_literals
+
+TEMP_PATHS = compile_literals(['/tmp/', '/var/tmp/', '/dev/shm/'])
+WORLD_WRITABLE_MODES = frozenset(['0777', '0666', '1777', '2777', '777', '666'])
+SECRET_INDICATORS = compile_literals(['password=', 'secret=', 'key=', 'token=', 'PRIVATE KEY'])
 
 class ANS011(Rule):
+    FILE_MODULES = frozenset(['file', 'copy', 'template', 'tempfile'])
+    COMMAND_MODULES = frozenset(['command', 'shell'])
+    modules = FILE_MODULES | COMMAND_MODULES
+
     def __init__(self):
         super().__init__(
             id="ANS011",
@@ -9,47 +19,35 @@ class ANS011(Rule):
             severity="MEDIUM"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                issues = self._check_temp_file_issues(task)
-                if issues:
-                    task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                    play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                    
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': (
-                            f"TЗадача {task_phrase}{play_phrase} содержит небезопасную работу с временными файлами: {issues}. "
-                            f"Рекомендуется использовать безопасные методы для временных файлов."
-                        )
-                    })
-        
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        issues = self._check_temp_file_issues(task)
+        if issues:
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': (
+                    f"TЗадача {task_phrase}{play_phrase} содержит небезопасную работу с временными файлами: {issues}. "
+                    f"Рекомендуется использовать безопасные методы для временных файлов."
+                )
+            }
+        return None
     
     def _check_temp_file_issues(self, task) -> str:
         """Простая проверка проблем с временными файлами"""
         issues = []
         
         # Проверка модулей, создающих файлы
-        if task.module in ['file', 'copy', 'template', 'tempfile']:
+        if task.module_id in self.FILE_MODULES:
             issues.extend(self._check_file_modules(task))
         
         # Проверка команд с временными файлами
-        if task.module in ['command', 'shell']:
+        if task.module_id in self.COMMAND_MODULES:
             issues.extend(self._check_command_modules(task))
         
         return ", ".join(issues) if issues else ""
@@ -62,7 +60,7 @@ class ANS011(Rule):
             return issues
         
         params = task.parameters
-        path = str(params.get('dest') or params.get('path') or '')
+        path = task.facts.dest or task.facts.path
         
         # Проверяем только явные временные пути
         if not self._is_clear_temp_path(path):
@@ -87,12 +85,10 @@ class ANS011(Rule):
         if not hasattr(task, 'parameters'):
             return issues
         
-        command = self._get_command_string(task)
-        if not command:
+        command_str = task.facts.command_lower
+        if not command_str:
             return issues
         
-        command_str = str(command).lower()
-        
         # Простые проверки
         if '/tmp/' in command_str:
             if 'chmod 777' in command_str or 'chmod 666' in command_str:
@@ -109,7 +105,7 @@ class ANS011(Rule):
             return False
         
         path_lower = path.lower()
-        return any(temp in path_lower for temp in ['/tmp/', '/var/tmp/', '/dev/shm/'])
+        return TEMP_PATHS.search(path_lower)
     
     def _is_world_writable(self, mode: Any) -> bool:
         """Проверка world-writable прав"""
@@ -119,8 +115,7 @@ class ANS011(Rule):
         mode_str = str(mode).strip()
         
         # Простые проверки
-        world_writable_modes = ['0777', '0666', '1777', '2777', '777', '666']
-        if mode_str in world_writable_modes:
+        if mode_str in WORLD_WRITABLE_MODES:
             return True
         
         # Проверка последней цифры
@@ -131,20 +126,4 @@ class ANS011(Rule):
     
     def _has_secrets(self, text: str) -> bool:
         """Проверка на наличие секретов"""
-        secrets = ['password=', 'secret=', 'key=', 'token=', 'PRIVATE KEY']
-        return any(secret in text.upper() for secret in secrets)
-    
-    def _get_command_string(self, task) -> str:
-        """Получение команды из задачи"""
-        if not hasattr(task, 'parameters'):
-            return ""
-        
-        if isinstance(task.parameters, dict):
-            return (task.parameters.get('cmd') or 
-                   task.parameters.get('command') or 
-                   task.parameters.get('_raw_params') or 
-                   "")
-        elif isinstance(task.parameters, str):
-            return task.parameters
-        
-        return ""
\ No newline at end of file
+        return SECRET_INDICATORS.search(text.upper())
\ No newline at end of file
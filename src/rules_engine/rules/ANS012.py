@@ -1,9 +1,21 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
+from src.rules_engine.matcher import compile_literals
+from src.ast_model.templates import analyze_template
 
 # Правило: Небезопасное выполнение скриптов из непроверенных источников
 
+UNTRUSTED_INDICATORS = compile_literals([
+    'http://', 'ftp://',
+    'raw.githubusercontent.com',
+    'pastebin.com', 'gist.'
+])
+INPUT_INDICATORS = compile_literals(['vars.', 'hostvars.'])
+
 class ANS012(Rule):
+    modules = frozenset(['script'])
+
     def __init__(self):
         super().__init__(
             id="ANS012",
@@ -11,37 +23,25 @@ class ANS012(Rule):
             severity="HIGH"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                if task.module in ['script', 'ansible.builtin.script']:
-                    script_issues = self._check_script_execution(task)
-                    if script_issues:
-                        task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                        play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                        
-                        violations.append({
-                            'rule_id': self.id,
-                            'description': self.description,
-                            'severity': self.severity,
-                            'play': play.name or None,
-                            'task': task.name or None,
-                            'message': (
-                                f"Задача {task_phrase}{play_phrase} содержит небезопасное выполнение скриптов: {script_issues}. "
-                                f"Рекомендуется проверять источники и контрольные суммы скриптов."
-                            )
-                        })
-        
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        if task.module_id in self.modules:
+            script_issues = self._check_script_execution(task)
+            if script_issues:
+                task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+                play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+                return {
+                    'rule_id': self.id,
+                    'description': self.description,
+                    'severity': self.severity,
+                    'play': play.name or None,
+                    'task': task.name or None,
+                    'message': (
+                        f"Задача {task_phrase}{play_phrase} содержит небезопасное выполнение скриптов: {script_issues}. "
+                        f"Рекомендуется проверять источники и контрольные суммы скриптов."
+                    )
+                }
+        return None
     
     def _check_script_execution(self, task) -> str:
         issues = []
@@ -67,13 +67,10 @@ class ANS012(Rule):
         return ", ".join(issues) if issues else ""
     
     def _is_untrusted_source(self, source: str) -> bool:
-        untrusted_indicators = [
-            'http://', 'ftp://', 
-            'raw.githubusercontent.com',
-            'pastebin.com', 'gist.'
-        ]
-        return any(indicator in source.lower() for indicator in untrusted_indicators)
+        return UNTRUSTED_INDICATORS.search(source.lower())
     
     def _contains_unvalidated_input(self, text: str) -> bool:
-        input_indicators = ['{{', 'vars.', 'hostvars.']
-        return any(indicator in text for indicator in input_indicators)
\ No newline at end of file
+        if '{{' not in text and '{%' not in text:
+            return INPUT_INDICATORS.search(text)
+        # Шаблон: переменные, подставляемые в аргументы без экранирующего фильтра
+        return bool(analyze_template(text).unfiltered)
\ No newline at end of file
@@ -1,8 +1,16 @@
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
+from src.ast_model.nodes import PlayNode, TaskNode
 from src.rules_engine.rule import Rule
+from src.rules_engine.matcher import compile_literals
 
 # Правило: Использование опасных функций выполнения кода
 
+DANGEROUS_FUNCTIONS = compile_literals([
+    'eval(', 'exec(', 'compile(', 'execfile(', 'input()',
+    'subprocess.call', 'subprocess.Popen', 'os.system',
+    'popen(', 'spawn(', 'execve(', 'reload(', '__import__'
+])
+
 class ANS014(Rule):
     def __init__(self):
         super().__init__(
@@ -11,58 +19,28 @@ class ANS014(Rule):
             severity="HIGH"
         )
     
-    def check(self, ast: List[Any]) -> List[Dict[str, Any]]:
-        from src.ast_model.nodes import PlayNode, TaskNode
-        
-        violations = []
-        for play in ast:
-            if not isinstance(play, PlayNode):
-                continue
-                
-            for task in play.tasks:
-                if not isinstance(task, TaskNode):
-                    continue
-                
-                function_issues = self._check_dangerous_functions(task)
-                if function_issues:
-                    task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
-                    play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
-                    
-                    violations.append({
-                        'rule_id': self.id,
-                        'description': self.description,
-                        'severity': self.severity,
-                        'play': play.name or None,
-                        'task': task.name or None,
-                        'message': (
-                            f"Задача {task_phrase}{play_phrase} использует опасные функции: {function_issues}. "
-                            f"Рекомендуется избегать динамического выполнения кода."
-                        )
-                    })
-        
-        return violations
+    def visit_task(self, task: TaskNode, play: PlayNode) -> Optional[Dict[str, Any]]:
+        function_issues = self._check_dangerous_functions(task)
+        if function_issues:
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+
+            return {
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'message': (
+                    f"Задача {task_phrase}{play_phrase} использует опасные функции: {function_issues}. "
+                    f"Рекомендуется избегать динамического выполнения кода."
+                )
+            }
+        return None
     
     def _check_dangerous_functions(self, task) -> str:
         issues = []
-        all_params = self._get_all_parameters_string(task)
-        
-        dangerous_functions = [
-            'eval(', 'exec(', 'compile(', 'execfile(', 'input()',
-            'subprocess.call', 'subprocess.Popen', 'os.system',
-            'popen(', 'spawn(', 'execve(', 'reload(', '__import__'
-        ]
-        
-        for func in dangerous_functions:
-            if func in all_params.lower():
-                issues.append(f"использование {func}")
-        
-        return ", ".join(issues) if issues else ""
-    
-    def _get_all_parameters_string(self, task) -> str:
-        if not hasattr(task, 'parameters') or not task.parameters:
-            return ""
+        for func in DANGEROUS_FUNCTIONS.findall(task.facts.parameters_text_lower):
+            issues.append(f"использование {func}")
         
-        if isinstance(task.parameters, dict):
-            return " ".join([f"{k}={v}" for k, v in task.parameters.items()])
-        else:
-            return str(task.parameters)
\ No newline at end of file
+        return ", ".join(issues) if issues else ""
\ No newline at end of file
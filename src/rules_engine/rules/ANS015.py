@@ -0,0 +1,57 @@
+from typing import List, Dict, Any
+from src.ast_model.nodes import PlayNode
+from src.ast_model.dataflow import SOURCE_MODULES, describe_step, taint_flows
+from src.rules_engine.rule import Rule
+from src.rules_engine.fingerprint import fingerprint
+
+# Правило: Недоверенные данные (vars_prompt, ввод pause, ответы uri, slurp)
+# попадают в команду через цепочку переменных (см. ast_model.dataflow)
+
+class ANS015(Rule):
+    def __init__(self):
+        super().__init__(
+            id="ANS015",
+            description="Недоверенные данные передаются в команду",
+            severity="HIGH"
+        )
+
+    def visit_play(self, play: PlayNode) -> List[Dict[str, Any]]:
+        violations: List[Dict[str, Any]] = []
+        if not play.prompts and not any(module in play.module_index for module in SOURCE_MODULES):
+            return violations
+
+        flows_by_task: Dict[int, List[Any]] = {}
+        for flow in taint_flows(play):
+            flows_by_task.setdefault(id(flow.task), []).append(flow)
+
+        for flows in flows_by_task.values():
+            task = flows[0].task
+            task_phrase = f"'{task.name.strip()}'" if task.name and task.name.strip() else ""
+            play_phrase = f" в плейбуке '{play.name.strip()}'" if play.name and play.name.strip() else ""
+            paths = []
+            issues = []
+            for flow in flows:
+                path = [{'kind': step.kind, 'name': step.name, 'line': step.line} for step in flow.steps]
+                path.append({'kind': task.module_id, 'name': flow.variable, 'line': task.line})
+                paths.append(path)
+                chain = " → ".join(describe_step(step) for step in flow.steps)
+                more = f" (источников: {flow.sources})" if flow.sources > 1 else ""
+                issues.append(f"'{flow.variable}' из {chain}{more}")
+
+            violations.append({
+                'rule_id': self.id,
+                'description': self.description,
+                'severity': self.severity,
+                'play': play.name or None,
+                'task': task.name or None,
+                'line': task.line,
+                'column': task.column,
+                'end_line': task.end_line,
+                'fingerprint': fingerprint(self.id, task),
+                'taint_paths': paths,
+                'message': (
+                    f"Задача {task_phrase}{play_phrase} передает в команду недоверенные данные: {'; '.join(issues)}. "
+                    f"Рекомендуется проверять значения или экранировать их фильтром quote."
+                )
+            })
+        return violations
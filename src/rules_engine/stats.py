@@ -0,0 +1,64 @@
+from typing import Any, Dict, List
+
+# Статистика выполнения правил (--stats).
+#
+# Для каждого правила считаются время (wall - по часам, cpu - процессорное
+# время процесса), число проверенных плейбуков и задач, число задач,
+# отсеянных предварительной проверкой модуля (Rule.modules) без вызова
+# правила, и число нарушений. Время измеряется для прохода правила по всем
+# задачам плейбука целиком, а не для каждой задачи, поэтому накладные расходы
+# не зависят от числа задач.
+#
+# Статистика передается между процессами и сохраняется в отчете как словари
+# rule_id -> {поле: значение}.
+
+STAT_FIELDS = ('wall', 'cpu', 'plays', 'tasks', 'rejected', 'violations')
+
+
+class RuleStats:
+    __slots__ = STAT_FIELDS
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.plays = 0
+        self.tasks = 0
+        self.rejected = 0
+        self.violations = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in STAT_FIELDS}
+
+    def add(self, values: Dict[str, Any]):
+        for name in STAT_FIELDS:
+            setattr(self, name, getattr(self, name) + values[name])
+
+
+def merge_stats(total: Dict[str, Dict[str, Any]], stats: Dict[str, Dict[str, Any]]):
+    """Добавляет статистику stats (например, одного файла) к total"""
+    for rule_id, values in stats.items():
+        target = total.get(rule_id)
+        if target is None:
+            total[rule_id] = dict(values)
+        else:
+            for name in STAT_FIELDS:
+                target[name] += values[name]
+
+
+def sorted_stats(stats: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Статистика по убыванию времени правил (время округлено до микросекунд)"""
+    ordered = sorted(stats.items(), key=lambda item: (-item[1]['wall'], item[0]))
+    return {rule_id: dict(values, wall=round(values['wall'], 6), cpu=round(values['cpu'], 6))
+            for rule_id, values in ordered}
+
+
+def format_stats_table(stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Строки таблицы статистики, отсортированной по убыванию времени"""
+    lines = [f"{'Правило':<8} {'время, мс':>10} {'CPU, мс':>9} {'доля':>6} {'задач':>8} "
+             f"{'отсеяно':>8} {'плейбуков':>10} {'нарушений':>10}"]
+    total_wall = sum(values['wall'] for values in stats.values()) or 1.0
+    for rule_id, values in sorted_stats(stats).items():
+        lines.append(f"{rule_id:<8} {values['wall'] * 1000:>10.2f} {values['cpu'] * 1000:>9.2f} "
+                     f"{values['wall'] / total_wall:>6.1%} {values['tasks']:>8} {values['rejected']:>8} "
+                     f"{values['plays']:>10} {values['violations']:>10}")
+    return lines
@@ -0,0 +1,4 @@
+from .files import collect_files
+from .pool import ScanOptions, FileResult, configure, analyze_file, scan_files, iter_scan, shard_pool
+
+__all__ = ['collect_files', 'ScanOptions', 'FileResult', 'configure', 'analyze_file', 'scan_files', 'iter_scan', 'shard_pool']
@@ -0,0 +1,61 @@
+import os
+import sys
+import glob
+from typing import Iterable, List, Optional
+
+# Поиск YAML-файлов для анализа: отдельные файлы, каталоги и glob-шаблоны
+
+YAML_EXTENSIONS = ('.yml', '.yaml')
+
+
+def _has_glob(path: str) -> bool:
+    return any(ch in path for ch in '*?[')
+
+
+def _walk_directory(directory: str) -> List[str]:
+    found = []
+    for root, dirs, files in os.walk(directory):
+        # Скрытые каталоги (.git, .venv и т.п.) не сканируем
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if filename.endswith(YAML_EXTENSIONS):
+                found.append(os.path.join(root, filename))
+    return found
+
+
+def _read_files_from(list_path: str) -> List[str]:
+    if list_path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(list_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def collect_files(paths: Iterable[str], files_from: Optional[str] = None) -> List[str]:
+    """
+    Раскрывает пути, каталоги и glob-шаблоны в отсортированный список файлов
+
+    :param paths: Пути к файлам, каталогам или glob-шаблоны
+    :param files_from: Файл со списком путей (по одному на строку, '-' для stdin)
+    :return: Уникальные пути к файлам в детерминированном порядке
+    """
+    candidates = list(paths)
+    if files_from:
+        candidates.extend(_read_files_from(files_from))
+
+    result = set()
+    for candidate in candidates:
+        if _has_glob(candidate):
+            for match in glob.glob(candidate, recursive=True):
+                if os.path.isdir(match):
+                    result.update(_walk_directory(match))
+                elif os.path.isfile(match):
+                    result.add(match)
+        elif os.path.isdir(candidate):
+            result.update(_walk_directory(candidate))
+        else:
+            # Несуществующие файлы оставляем: ошибка будет выдана при анализе
+            result.add(candidate)
+
+    return sorted({os.path.normpath(path) for path in result})
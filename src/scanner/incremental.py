@@ -0,0 +1,485 @@
+import os
+import re
+import json
+import time
+import hashlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.ast_model.nodes import shift_lines
+from src.ast_model.table import TaskTable, SECTIONS, PRE_TASKS, TASKS, POST_TASKS, HANDLERS
+from src.scanner.pool import AnalysisContext, FileResult, get_context, _iter_play_data, _TasksDocument
+
+# Инкрементальный повторный анализ изменяемых плейбуков (редактор, режим --watch).
+#
+# Для каждого файла хранится состояние предыдущего запуска: текст, хеш
+# "заголовка" каждого плейбука (все ключи, кроме tasks) и для каждого элемента
+# tasks - структурный хеш, строка начала, строки таблицы задач (задача или блок
+# со всеми вложенными задачами, см. ast_model.table) и нарушения по правилам.
+# Хеш задачи учитывает и разметку (позиции элементов относительно начала
+# задачи), поэтому у переиспользованной задачи достаточно сдвинуть строки.
+#
+# При повторном анализе сначала ищется измененный участок текста (общие
+# начальные и конечные строки со старой версией). Если он целиком лежит внутри
+# задач одного плейбука, заново парсятся только эти задачи; остальные узлы и
+# нарушения переиспользуются, а строки последующих задач сдвигаются. Иначе
+# (изменен заголовок плейбука, якоря и ссылки YAML, нарушен отступ
+# последовательности задач, ошибка парсинга фрагмента) файл парсится целиком,
+# но узлы строятся и правила выполняются только для задач с новым хешем.
+#
+# Правила посещения задач зависят только от задачи и заголовка плейбука,
+# поэтому изменение заголовка перестраивает плейбук целиком. Правила уровня
+# плейбука (visit_play и правила старого образца) выполняются при каждом анализе,
+# как и проверка задач pre_tasks, post_tasks и handlers - они входят в заголовок.
+# Файл задач (документ без плейбуков) строится и проверяется целиком.
+
+Buckets = List[List[Dict[str, Any]]]
+
+# Якорь или ссылка YAML: фрагмент с ними нельзя парсить отдельно от документа
+ALIAS_PATTERN = re.compile(r'(?:^|[\s\[{,])[&*][^\s&*]')
+
+# Через сколько задач проверяется отмена анализа
+CANCEL_CHECK_TASKS = 64
+
+
+class AnalysisCancelled(Exception):
+    """Анализ прерван по запросу клиента
+
+    Сохраненное состояние файла не изменено; если отмена пришла после того,
+    как переиспользуемые задачи были сдвинуты, состояние удаляется, и
+    следующий анализ файла - полный.
+    """
+
+
+class _ParseFailed(Exception):
+    # Ошибка парсера при чтении очередного плейбука (документы разбираются лениво)
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+def _parsed(documents: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+    # Плейбуки документов по мере разбора; ошибки парсера - _ParseFailed
+    try:
+        yield from _iter_play_data(documents())
+    except Exception as e:
+        raise _ParseFailed(e)
+
+
+def _layout(data: Any, base_line: int, column_offset: int, layout: List[int]) -> List[int]:
+    # Позиции словарей, списков и их элементов: строки относительно base_line, колонки с учетом смещения
+    lc = getattr(data, 'lc', None)
+    if lc is not None and isinstance(lc.line, int):
+        layout += (lc.line - base_line, lc.col + column_offset)
+        for position in (lc.data or {}).values():
+            for index, value in enumerate(position):
+                layout.append(value - base_line if index % 2 == 0 else value + column_offset)
+    children = data.values() if isinstance(data, dict) else data if isinstance(data, list) else ()
+    for child in children:
+        if isinstance(child, (dict, list)):
+            _layout(child, base_line, column_offset, layout)
+    return layout
+
+
+def _shift_violations(buckets: Buckets, delta: int, start: int = 1):
+    for bucket in buckets:
+        for violation in bucket:
+            for key in ('line', 'end_line'):
+                if violation.get(key, 0) >= start:
+                    violation[key] += delta
+
+
+def structural_hash(data: Any) -> str:
+    """Хеш структуры YAML-узла (порядок ключей учитывается: от него зависит модуль задачи)"""
+    text = json.dumps(data, ensure_ascii=False, default=repr)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _TaskState:
+    __slots__ = ('hash', 'line', 'table', 'buckets')
+
+    def __init__(self, hash: str, line: int, table: TaskTable, buckets: Buckets):
+        self.hash = hash
+        self.line = line  # Строка (с 0) элемента последовательности tasks
+        self.table = table  # Строки таблицы задач элемента
+        self.buckets = buckets
+
+
+class _PlayState:
+    __slots__ = ('header_hash', 'play', 'tasks', 'before', 'after', 'dash_column', 'tasks_end')
+
+    def __init__(self, header_hash: str, play: Any):
+        self.header_hash = header_hash
+        self.play = play
+        self.tasks: List[_TaskState] = []
+        # Строки таблицы задач до и после раздела tasks: pre_tasks; post_tasks и handlers
+        self.before = TaskTable(play.become)
+        self.after = TaskTable(play.become)
+        # Колонка '-' элементов tasks; None - задачи плейбука нельзя парсить по отдельности
+        self.dash_column: Optional[int] = None
+        self.tasks_end = 0  # Строка, следующая за последней задачей
+
+
+class _FileState:
+    __slots__ = ('lines', 'plays')
+
+    def __init__(self, lines: List[str], plays: List[_PlayState]):
+        self.lines = lines
+        self.plays = plays
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def _is_significant(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith('#')
+
+
+def _is_item(line: str, dash_column: int) -> bool:
+    return _indent(line) == dash_column and (line[dash_column:] == '-' or line[dash_column:].startswith('- '))
+
+
+def _inside_sequence(line: str, dash_column: int) -> bool:
+    # Строка не завершает блочную последовательность с '-' в колонке dash_column
+    if not _is_significant(line):
+        return True
+    indent = _indent(line)
+    return indent > dash_column or _is_item(line, dash_column)
+
+
+class IncrementalAnalyzer:
+    """Анализатор, переиспользующий результаты неизмененных задач между запусками"""
+
+    def __init__(self, context: Optional[AnalysisContext] = None):
+        self.context = context or get_context()
+        # Задачи проверяются по одной (run_task) и между запусками переиспользуются,
+        # поэтому бюджеты времени на файл здесь не применяются
+        from src.rules_engine.engine import RulesEngine
+        self.engine = RulesEngine(self.context.rules)
+        self._states: Dict[str, _FileState] = {}
+        # Статистика последнего анализа
+        self.reused_tasks = 0
+        self.rebuilt_tasks = 0
+        self.full_parse = False
+        self._cancelled: Optional[Callable[[], bool]] = None
+        self._dirty = False  # Сохраненное состояние уже изменено текущим анализом
+
+    def analyze_file(self, path: str) -> FileResult:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            self.forget(path)
+            return FileResult(path=path, error=f"Ошибка при чтении файла: {str(e)}")
+        return self.analyze_text(path, text)
+
+    def analyze_text(self, path: str, text: str,
+                     cancelled: Optional[Callable[[], bool]] = None) -> FileResult:
+        """
+        Анализирует содержимое документа
+
+        :param path: Ключ состояния и значение поля file нарушений
+        :param text: Текст документа
+        :param cancelled: Проверка отмены; если вернет True, анализ прерывается AnalysisCancelled
+        """
+        result = FileResult(path=path)
+        self.reused_tasks = 0
+        self.rebuilt_tasks = 0
+        self.full_parse = False
+        self._cancelled = cancelled
+        self._dirty = False
+        self._check_cancelled()
+
+        lines = text.split('\n')
+        state = self._states.get(path)
+        try:
+            try:
+                patched = state is not None and self._patch(state, lines)
+            except AnalysisCancelled:
+                raise
+            except Exception:
+                patched = False
+            if not patched:
+                self.full_parse = True
+                self.reused_tasks = 0
+                self.rebuilt_tasks = 0
+                # Многодокументный файл: плейбуки всех документов подряд, файл задач - одним элементом;
+                # документы разбираются по мере анализа, отмена проверяется перед каждым плейбуком
+                parsed_data = _parsed(lambda: self.context.parser.parse_documents(text))
+                try:
+                    state = self._analyze(lines, parsed_data, state)
+                except (AnalysisCancelled, _ParseFailed):
+                    raise
+                except Exception as e:
+                    self.forget(path)
+                    result.error = f"Ошибка при построении AST: {str(e)}"
+                    return result
+        except _ParseFailed as e:
+            self.forget(path)
+            result.error = f"Ошибка при парсинге YAML: {str(e.error)}"
+            return result
+        except AnalysisCancelled:
+            if self._dirty:
+                self.forget(path)
+            raise
+
+        self._states[path] = state
+        result.violations = self._collect(state)
+        for violation in result.violations:
+            violation['file'] = path
+        return result
+
+    def forget(self, path: str):
+        """Удаляет сохраненное состояние файла"""
+        self._states.pop(path, None)
+
+    def _check_cancelled(self):
+        if self._cancelled is not None and self._cancelled():
+            raise AnalysisCancelled()
+
+    def _task_state(self, task_data: Any, line: int, previous: Dict[str, List[_TaskState]], become: Optional[bool],
+                    line_offset: int = 0, column_offset: int = 0) -> _TaskState:
+        # line - строка задачи в документе; смещения - для задач, разобранных из фрагмента
+        layout = _layout(task_data, line - line_offset, column_offset, [])
+        task_hash = structural_hash([task_data, layout])
+        reused = previous.get(task_hash)
+        if reused:
+            task = reused.pop(0)
+            if line != task.line:
+                self._dirty = True
+                task.table.shift_lines(line - task.line)
+                _shift_violations(task.buckets, line - task.line)
+            task.line = line
+            self.reused_tasks += 1
+            return task
+        table = TaskTable(become)
+        self.context.builder.build_item(task_data, table, TASKS, line_offset, column_offset)
+        self.rebuilt_tasks += 1
+        return _TaskState(task_hash, line, table, [])
+
+    def _run_new(self, play_state: _PlayState):
+        play = play_state.play
+        table = TaskTable(play.become)
+        table.extend(play_state.before)
+        for task in play_state.tasks:
+            table.extend(task.table)
+        table.extend(play_state.after)
+        self.context.builder.attach_table(play, table)
+        for index, task in enumerate(play_state.tasks):
+            if index % CANCEL_CHECK_TASKS == 0:
+                self._check_cancelled()
+            if not task.buckets:
+                task.buckets = self.engine.run_tasks(play, task.table.tasks)
+
+    def _analyze(self, lines: List[str], parsed_data: Iterator[Any], previous: Optional[_FileState]) -> _FileState:
+        # Плейбуки сопоставляются по хешу заголовка, а не по позиции,
+        # чтобы вставка нового плейбука не сбрасывала состояние остальных
+        previous_by_header: Dict[str, List[_PlayState]] = {}
+        for old_play in (previous.plays if previous else []):
+            previous_by_header.setdefault(old_play.header_hash, []).append(old_play)
+
+        plays = []
+        for play_data in parsed_data:
+            self._check_cancelled()
+            if isinstance(play_data, _TasksDocument):
+                # Файл задач без заголовка плейбука строится и проверяется целиком
+                play_state = _PlayState('', self.context.builder.build_tasks_file(play_data))
+                play_state.before = play_state.play.table
+                self._run_new(play_state)
+                plays.append(play_state)
+                continue
+            header = {key: value for key, value in play_data.items() if key != 'tasks'}
+            builder = self.context.builder
+            play_state = _PlayState(structural_hash(header), builder.build_play_header(play_data))
+            for section, table in ((PRE_TASKS, play_state.before), (POST_TASKS, play_state.after),
+                                   (HANDLERS, play_state.after)):
+                items = play_data.get(SECTIONS[section])
+                for task_data in items if isinstance(items, list) else ():
+                    builder.build_item(task_data, table, section)
+
+            candidates = previous_by_header.get(play_state.header_hash)
+            old_tasks: Dict[str, List[_TaskState]] = {}
+            for task in (candidates.pop(0).tasks if candidates else []):
+                old_tasks.setdefault(task.hash, []).append(task)
+
+            tasks_data = play_data.get('tasks')
+            if isinstance(tasks_data, list):
+                positions = self._item_lines(tasks_data, lines)
+                for index, task_data in enumerate(tasks_data):
+                    if index % CANCEL_CHECK_TASKS == 0:
+                        self._check_cancelled()
+                    line = positions[index] if positions else 0
+                    play_state.tasks.append(self._task_state(task_data, line, old_tasks, play_state.play.become))
+
+                if positions:
+                    play_state.dash_column = tasks_data.lc.col
+                    play_state.tasks_end = self._sequence_end(lines, positions[-1], tasks_data.lc.col)
+            self._run_new(play_state)
+
+            plays.append(play_state)
+
+        return _FileState(lines, plays)
+
+    @staticmethod
+    def _item_lines(tasks_data: Any, lines: List[str]) -> Optional[List[int]]:
+        # Строки элементов блочной последовательности задач (None, если позиции неизвестны)
+        lc = getattr(tasks_data, 'lc', None)
+        if lc is None or not tasks_data or not isinstance(lc.col, int):
+            return None
+        positions = []
+        for index in range(len(tasks_data)):
+            line = lc.item(index)[0]
+            if line >= len(lines) or not _is_item(lines[line], lc.col):
+                return None
+            positions.append(line)
+        return positions
+
+    @staticmethod
+    def _sequence_end(lines: List[str], last_item: int, dash_column: int) -> int:
+        for number in range(last_item + 1, len(lines)):
+            if not _inside_sequence(lines[number], dash_column):
+                return number
+        return len(lines)
+
+    def _patch(self, state: _FileState, lines: List[str]) -> bool:
+        """Перепарсивает только измененные задачи; False - нужен полный анализ"""
+        old = state.lines
+        if old == lines:
+            self.reused_tasks = sum(len(play.tasks) for play in state.plays)
+            return True
+
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        old_end = len(old) - suffix
+        delta = len(lines) - len(old)
+
+        # Плейбук, внутри задач которого лежит весь измененный участок
+        target = None
+        for play_index, play_state in enumerate(state.plays):
+            if play_state.dash_column is None or not play_state.tasks:
+                continue
+            if play_state.tasks[0].line <= prefix and old_end <= play_state.tasks_end:
+                target = play_index
+                break
+        if target is None:
+            return False
+
+        play_state = state.plays[target]
+        dash_column = play_state.dash_column
+        starts = [task.line for task in play_state.tasks]
+        ends = starts[1:] + [play_state.tasks_end]
+        first = max(index for index, start in enumerate(starts) if start <= prefix)
+        last = min(index for index, end in enumerate(ends) if end >= old_end and index >= first)
+
+        chunk_start = starts[first]
+        chunk = lines[chunk_start:ends[last] + delta]
+        old_chunk = old[chunk_start:ends[last]]
+        if chunk and not _is_item(chunk[0], dash_column):
+            return False
+        if not all(_inside_sequence(line, dash_column) for line in chunk):
+            return False
+        if any(ALIAS_PATTERN.search(line) for line in chunk + old_chunk):
+            return False
+
+        dedented = [line[dash_column:] if not line[:dash_column].strip() else line.lstrip() for line in chunk]
+        if chunk:
+            try:
+                # Фрагмент, который не разбирается, - обычное дело при редактировании: без вывода ошибки
+                tasks_data = self.context.parser.parse('\n'.join(dedented), quiet=True)
+            except Exception:
+                return False
+            if not isinstance(tasks_data, list) or not all(isinstance(task, dict) for task in tasks_data):
+                return False
+            positions = self._item_lines(tasks_data, dedented)
+            if positions is None:
+                return False
+        else:
+            tasks_data, positions = [], []
+
+        # Плейбук без задач (tasks: null) анализируется полностью, как и при первом запуске
+        if not tasks_data and len(play_state.tasks) == last - first + 1:
+            return False
+        self._check_cancelled()
+
+        previous: Dict[str, List[_TaskState]] = {}
+        for task in play_state.tasks[first:last + 1]:
+            previous.setdefault(task.hash, []).append(task)
+        become = play_state.play.become
+        replaced = [self._task_state(task_data, chunk_start + line, previous, become, chunk_start, dash_column)
+                    for task_data, line in zip(tasks_data, positions)]
+
+        self._dirty = True
+        play_state.tasks[first:last + 1] = replaced
+        # Позиции после измененного участка (строки с old_end + 1, считая с 1) сдвигаются
+        later_tasks = play_state.tasks[first + len(replaced):]
+        play_state.tasks_end += delta
+        for later in state.plays[target + 1:]:
+            later_tasks += later.tasks
+            later.tasks_end += delta
+        if delta:
+            for task in later_tasks:
+                task.line += delta
+                task.table.shift_lines(delta)
+                _shift_violations(task.buckets, delta)
+            for later in state.plays[target:]:
+                shift_lines(later.play, delta, old_end + 1)
+                later.before.shift_lines(delta, old_end + 1)
+                later.after.shift_lines(delta, old_end + 1)
+
+        self.reused_tasks += sum(len(play.tasks) for play in state.plays) - len(replaced)
+        self._run_new(play_state)
+        state.lines = lines
+        return True
+
+    def _collect(self, state: _FileState) -> List[Dict[str, Any]]:
+        # Порядок как у RulesEngine.run_buckets: по плейбукам, по правилам, внутри правила - по строкам таблицы
+        violations: List[Dict[str, Any]] = []
+        for play_state in state.plays:
+            play = play_state.play
+            buckets = self.engine.run_play_visitors(play)
+            before = self.engine.run_tasks(play, play_state.before.tasks)
+            after = self.engine.run_tasks(play, play_state.after.tasks)
+            for index, bucket in enumerate(buckets):
+                bucket.extend(before[index])
+                for task in play_state.tasks:
+                    bucket.extend(task.buckets[index])
+                bucket.extend(after[index])
+                violations.extend(dict(violation) for violation in bucket)
+        return violations
+
+
+def watch_files(paths: List[str], interval: float = 1.0,
+                stop: Optional[Callable[[], bool]] = None) -> Iterator[List[str]]:
+    """
+    Опрашивает файлы и выдает списки изменившихся (первый раз - все файлы)
+
+    :param paths: Отслеживаемые файлы
+    :param interval: Период опроса в секундах
+    :param stop: Условие завершения, проверяемое на каждом шаге
+    """
+    def stamp(path: str) -> Optional[Tuple[float, int]]:
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        return info.st_mtime, info.st_size
+
+    stamps = {path: stamp(path) for path in paths}
+    yield list(paths)
+
+    while stop is None or not stop():
+        time.sleep(interval)
+        changed = []
+        for path in paths:
+            current = stamp(path)
+            if current != stamps[path]:
+                stamps[path] = current
+                changed.append(path)
+        if changed:
+            yield changed
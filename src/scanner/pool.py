@@ -0,0 +1,442 @@
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Параллельный анализ набора файлов пулом "тёплых" процессов.
+# Каждый процесс один раз импортирует парсер и загружает правила,
+# после чего обрабатывает файлы: парсинг -> AST -> RulesEngine.
+#
+# Файл обрабатывается потоком: документы YAML и плейбуки внутри них парсятся,
+# строятся и проверяются по одному, после чего освобождаются. Пиковая память
+# определяется самым большим плейбуком, а не размером файла (кроме случаев,
+# когда AST файла нужен целиком: вывод AST и кеш AST небольших файлов).
+#
+# Задачи очень больших плейбуков (ScanOptions.shard_tasks) проверяются частями
+# в процессах пула (см. scanner.shards). Файлы, которые могут содержать такой
+# плейбук, анализируются в основном процессе, а остальные - в пуле, как обычно.
+
+# Файлы крупнее этого размера обрабатываются без сохранения AST в кеше:
+# для этого пришлось бы держать в памяти AST всего файла
+AST_CACHE_MAX_FILE_BYTES = 8 * 1024 * 1024
+
+_END = object()
+
+@dataclass
+class ScanOptions:
+    """Настройки анализа, общие для всех процессов пула"""
+    cache_dir: Optional[str] = None  # None - кеш результатов отключен
+    cache_max_bytes: int = 256 * 1024 * 1024
+    parser: str = 'rt'  # Реализация парсера YAML (см. lexer_parser.backends)
+    compact_ast: bool = False  # Компактный AST без ссылок на дерево парсера (см. ASTBuilder)
+    rules: Optional[Tuple[str, ...]] = None  # Только эти правила (None - все)
+    exclude_rules: Tuple[str, ...] = ()
+    min_severity: Optional[str] = None  # Минимальная критичность правил (LOW, MEDIUM, HIGH)
+    stats: bool = False  # Статистика выполнения правил (см. rules_engine.stats)
+    # Бюджеты времени правила на задачу и на файл, с (0 - без ограничения; см. rules_engine.guard)
+    task_budget: float = 1.0
+    file_budget: float = 10.0
+    # Плейбуки из стольких задач и более проверяются частями в нескольких процессах (0 - никогда)
+    shard_tasks: int = 10000
+    resolve: bool = True  # Собирать ссылки на роли и включаемые файлы (см. scanner.project)
+
+    def variant(self) -> str:
+        """Настройки, от которых зависит построенный AST (часть ключа кеша)"""
+        return f"{self.parser}+compact" if self.compact_ast else self.parser
+
+
+@dataclass
+class FileResult:
+    """Результат анализа одного файла"""
+    path: str
+    violations: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    ast: Optional[List[Any]] = None
+    cache_hits: int = 0
+    cache_misses: int = 0
+    rule_stats: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Только с ScanOptions.stats
+    diagnostics: List[Dict[str, Any]] = field(default_factory=list)  # Например, превышения бюджетов правил
+    # Ссылки на другие файлы проекта: (вид, цель, строка, плейбук), см. ast_model.references
+    references: List[Tuple[str, str, int, str]] = field(default_factory=list)
+    tasks_file: bool = False  # Файл задач (роли, include_tasks), а не плейбук
+
+
+class AnalysisContext:
+    """Парсер, построитель AST и движок правил, переиспользуемые между файлами"""
+
+    def __init__(self, options: Optional[ScanOptions] = None):
+        from src.lexer_parser import create_parser
+        from src.ast_model.builder import ASTBuilder
+        from src.rules_engine.rules import load_rules
+
+        self.options = options or ScanOptions()
+        self.parser = create_parser(self.options.parser)
+        self.builder = ASTBuilder(compact=self.options.compact_ast)
+        self.rules = load_rules(self.options.rules, self.options.exclude_rules, self.options.min_severity)
+        self._engines: Dict[Tuple[str, ...], Any] = {}
+        # Пул для проверки частей больших плейбуков (см. shard_pool и scanner.shards)
+        self.shard_executor: Optional[Any] = None
+        self.shard_jobs = 1
+
+        self.cache = None
+        if self.options.cache_dir:
+            from src.cache import ResultCache
+            self.cache = ResultCache(self.options.cache_dir, self.options.cache_max_bytes)
+
+    def engine_for(self, rules: List[Any]):
+        """Движок для подмножества правил (например, правил без результата в кеше)"""
+        from src.rules_engine.engine import RulesEngine
+
+        key = tuple(rule.id for rule in rules)
+        engine = self._engines.get(key)
+        if engine is None:
+            engine = RulesEngine(rules, stats=self.options.stats, task_budget=self.options.task_budget,
+                                 file_budget=self.options.file_budget)
+            self._engines[key] = engine
+        return engine
+
+
+_context: Optional[AnalysisContext] = None
+
+
+def configure(options: Optional[ScanOptions] = None) -> AnalysisContext:
+    """Создает контекст анализа текущего процесса с заданными настройками"""
+    global _context
+    _context = AnalysisContext(options)
+    return _context
+
+
+def get_context() -> AnalysisContext:
+    if _context is None:
+        return configure()
+    return _context
+
+
+def _init_worker(options: Optional[ScanOptions] = None):
+    configure(options)
+
+
+def analyze_file(path: str, keep_ast: bool = False,
+                 on_play: Optional[Callable[[Any], None]] = None,
+                 on_violations: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> FileResult:
+    """
+    Анализирует один файл в текущем процессе
+
+    :param keep_ast: Сохранить AST файла в результате
+    :param on_play: Вызывается для каждого построенного плейбука (например, для вывода AST)
+    :param on_violations: Получает нарушения каждого плейбука сразу после проверки
+                          (потоковый отчет); в result.violations они тогда не попадают
+    """
+    result = FileResult(path=path)
+    ast: Optional[List[Any]] = [] if keep_ast else None
+    for play, violations in iter_file(path, result, need_ast=keep_ast or on_play is not None):
+        if play is not None:
+            if on_play is not None:
+                on_play(play)
+            if ast is not None:
+                ast.append(play)
+        if on_violations is not None:
+            on_violations(violations)
+        else:
+            result.violations.extend(violations)
+
+    if result.error:
+        result.violations = []
+    else:
+        result.ast = ast
+    return result
+
+
+def iter_file(path: str, result: FileResult,
+              need_ast: bool = False) -> Iterator[Tuple[Optional[Any], List[Dict[str, Any]]]]:
+    """
+    Анализирует файл потоком: документ за документом, плейбук за плейбуком
+
+    Выдает (узел плейбука, нарушения плейбука) сразу после проверки плейбука;
+    узел равен None, если все результаты взяты из кеша и AST не понадобился.
+    Ошибка записывается в result.error и завершает поток, статистика кеша -
+    в result.cache_hits и result.cache_misses.
+    """
+    context = get_context()
+    cache = context.cache
+    file_hash = None
+    per_rule: Dict[str, List[List[Dict[str, Any]]]] = {}
+    try:
+        size = os.path.getsize(path)
+        if cache is not None:
+            from src.cache import file_content_hash
+            # Разные парсеры могут строить разные AST, поэтому парсер входит в ключ
+            file_hash = file_content_hash(path, context.options.variant())
+    except OSError as e:
+        result.error = f"Ошибка при чтении файла: {str(e)}"
+        return
+
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+        per_rule = cache.get_results(file_hash, context.rules)
+        result.cache_hits = cache.hits - hits
+        result.cache_misses = cache.misses - misses
+
+    missing = [rule for rule in context.rules if rule.id not in per_rule]
+    resolve = context.options.resolve
+
+    if not missing and not need_ast:
+        # Ссылки на другие файлы тоже должны быть в кеше, иначе файл придется разобрать
+        info = cache.get_file_info(file_hash) if cache is not None and resolve else {}
+        if info is not None:
+            result.references = [tuple(reference) for reference in info.get('references', ())]
+            result.tasks_file = info.get('tasks_file', False)
+            for index in range(_play_count(context.rules, per_rule)):
+                yield None, _stamp(_merge_play(context.rules, per_rule, {}, index), path)
+            return
+
+    plays: Iterable[Any] = ()
+    if cache is not None:
+        plays = cache.get_ast(file_hash) or ()
+    # AST файла целиком собирается только для кеша и только у небольших файлов
+    collected: Optional[List[Any]] = None
+    if not plays:
+        plays = _stream_plays(path, result)
+        if cache is not None and size <= AST_CACHE_MAX_FILE_BYTES:
+            collected = []
+
+    engine = context.engine_for(missing) if missing else None
+    if engine is not None:
+        engine.start_file(path)
+    shard_tasks = context.options.shard_tasks if context.shard_executor is not None else 0
+    if resolve:
+        from src.ast_model.references import play_references
+    fresh: Dict[str, List[List[Dict[str, Any]]]] = {rule.id: [] for rule in missing}
+    for index, play in enumerate(plays):
+        if resolve:
+            result.references.extend(play_references(play))
+            result.tasks_file = result.tasks_file or play.tasks_file
+        buckets = {}
+        if engine is not None:
+            if shard_tasks and len(play.tasks) >= shard_tasks:
+                from src.scanner.shards import run_sharded
+                try:
+                    rule_buckets = run_sharded(context, engine, play, path)
+                except Exception as e:
+                    result.error = f"Ошибка анализа: {str(e)}"
+                    return
+            else:
+                rule_buckets = engine.run_buckets(play)
+            for rule, bucket in zip(missing, rule_buckets):
+                fresh[rule.id].append(bucket)
+                buckets[rule.id] = bucket
+        if collected is not None:
+            collected.append(play)
+        yield play, _stamp(_merge_play(context.rules, per_rule, buckets, index), path)
+
+    if engine is not None:
+        if engine.stats is not None:
+            result.rule_stats = engine.take_stats()
+        result.diagnostics = engine.take_diagnostics()
+    if result.error:
+        return
+    if cache is not None:
+        if collected is not None:
+            cache.put_ast(file_hash, collected)
+        if resolve:
+            cache.put_file_info(file_hash, {'references': result.references, 'tasks_file': result.tasks_file})
+        # Результаты правил, пропущенных из-за бюджета времени или проверивших
+        # только начало строки (scan_truncated), неполны и не кешируются
+        timed_out = {diagnostic['rule_id'] for diagnostic in result.diagnostics}
+        complete = [rule for rule in missing if rule.id not in timed_out]
+        if complete:
+            cache.put_results(file_hash, {rule.id: (rule, fresh[rule.id]) for rule in complete})
+
+
+def _stream_plays(path: str, result: FileResult) -> Iterator[Any]:
+    # Плейбуки файла по одному; данные парсера плейбука освобождаются после построения узла
+    context = get_context()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            plays_data = _iter_play_data(context.parser.parse_documents(f))
+            while True:
+                try:
+                    play_data = next(plays_data, _END)
+                except Exception as e:
+                    result.error = f"Ошибка при парсинге YAML: {str(e)}"
+                    return
+                if play_data is _END:
+                    return
+                try:
+                    if isinstance(play_data, _TasksDocument):
+                        play = context.builder.build_tasks_file(play_data)
+                    else:
+                        play = context.builder.build_play(play_data)
+                except Exception as e:
+                    result.error = f"Ошибка при построении AST: {str(e)}"
+                    return
+                del play_data
+                yield play
+    except OSError as e:
+        result.error = f"Ошибка при чтении файла: {str(e)}"
+
+
+class _TasksDocument(list):
+    """Документ - список задач (файл задач), а не плейбуков"""
+
+
+def _iter_play_data(documents: Iterable[Iterable[Any]]) -> Iterator[Any]:
+    # Плейбуки документов по одному; файл задач (см. builder.is_play_data) - целиком
+    from src.ast_model.builder import is_play_data
+
+    for document in documents:
+        items = iter(document)
+        first = next(items, _END)
+        if first is _END:
+            continue
+        if is_play_data(first):
+            yield first
+            first = None
+            yield from items
+        else:
+            tasks = _TasksDocument([first])
+            tasks.extend(items)
+            yield tasks
+
+
+def _stamp(violations: List[Dict[str, Any]], path: str) -> List[Dict[str, Any]]:
+    for violation in violations:
+        violation['file'] = path
+    return violations
+
+
+def _play_count(rules: List[Any], per_rule: Dict[str, List[List[Dict[str, Any]]]]) -> int:
+    return len(per_rule[rules[0].id]) if rules else 0
+
+
+def _merge_play(rules: List[Any], cached: Dict[str, List[List[Dict[str, Any]]]],
+                fresh: Dict[str, List[Dict[str, Any]]], index: int) -> List[Dict[str, Any]]:
+    # Тот же порядок, что и у RulesEngine.run_play: нарушения плейбука по правилам
+    violations = []
+    for rule in rules:
+        bucket = fresh.get(rule.id)
+        if bucket is None:
+            plays = cached.get(rule.id, ())
+            bucket = plays[index] if index < len(plays) else []
+        violations.extend(bucket)
+    return violations
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def scan_files(paths: List[str], jobs: Optional[int] = None,
+               options: Optional[ScanOptions] = None) -> List[FileResult]:
+    """
+    Анализирует файлы, при необходимости распределяя их по пулу процессов
+
+    :param paths: Список файлов (порядок определяет порядок результатов)
+    :param jobs: Число процессов (по умолчанию - число ядер)
+    :param options: Настройки анализа
+    :return: Результаты в порядке paths, независимо от числа процессов
+    """
+    return list(iter_scan(paths, jobs, options))
+
+
+def iter_scan(paths: List[str], jobs: Optional[int] = None,
+              options: Optional[ScanOptions] = None) -> Iterator[FileResult]:
+    """
+    То же, что scan_files, но результаты выдаются по мере готовности (в порядке paths):
+    результат файла выдается, как только готовы он и все файлы перед ним
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    # Файлы, которые могут содержать плейбук для проверки частями, анализируются
+    # в основном процессе: процессы пула проверяют части их задач
+    local: List[str] = []
+    shard_tasks = (options or ScanOptions()).shard_tasks
+    if jobs > 1 and shard_tasks:
+        from src.scanner.shards import may_shard
+        local = [path for path in dict.fromkeys(paths) if may_shard(path, shard_tasks)]
+    if not local:
+        jobs = min(jobs, len(paths))
+
+    if jobs <= 1:
+        configure(options)
+        for path in paths:
+            yield analyze_file(path)
+        return
+
+    # Пул процессов (multiprocessing) импортируется только при анализе в несколько процессов
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    # Крупные файлы отправляем первыми, чтобы хвост очереди был коротким
+    schedule = sorted(set(paths) - set(local), key=lambda p: (-_file_size(p), p))
+
+    results: Dict[int, FileResult] = {}
+    indexes: Dict[str, List[int]] = {}
+    for index, path in enumerate(paths):
+        indexes.setdefault(path, []).append(index)
+
+    def store(path: str, result: FileResult):
+        for index in indexes[path]:
+            results[index] = result
+
+    def finish(future: Any):
+        path = pending.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            result = FileResult(path=path, error=f"Ошибка анализа: {str(e)}")
+        store(path, result)
+
+    next_index = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(options,)) as executor:
+        pending = {executor.submit(analyze_file, path): path for path in schedule}
+
+        if local:
+            context = configure(options)
+            context.shard_executor, context.shard_jobs = executor, jobs
+            try:
+                for path in local:
+                    try:
+                        result = analyze_file(path)
+                    except Exception as e:
+                        result = FileResult(path=path, error=f"Ошибка анализа: {str(e)}")
+                    store(path, result)
+                    for future in [future for future in pending if future.done()]:
+                        finish(future)
+                    while next_index in results:
+                        yield results.pop(next_index)
+                        next_index += 1
+            finally:
+                context.shard_executor, context.shard_jobs = None, 1
+
+        for future in as_completed(list(pending)):
+            finish(future)
+
+            while next_index in results:
+                yield results.pop(next_index)
+                next_index += 1
+
+
+@contextmanager
+def shard_pool(paths: List[str], jobs: Optional[int] = None) -> Iterator[Optional[Any]]:
+    """
+    Пул процессов для проверки частей больших плейбуков при анализе в текущем
+    процессе (analyze_file); создается, только если файлы могут содержать такие плейбуки
+    """
+    context = get_context()
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    from src.scanner.shards import may_shard
+    if jobs <= 1 or not any(may_shard(path, context.options.shard_tasks) for path in paths):
+        yield None
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(context.options,)) as executor:
+        context.shard_executor, context.shard_jobs = executor, jobs
+        try:
+            yield executor
+        finally:
+            context.shard_executor, context.shard_jobs = None, 1
@@ -0,0 +1,208 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.ast_model.references import ROLE, TASKS
+from src.scanner.pool import FileResult, ScanOptions, iter_scan
+
+# Граф файлов проекта: плейбуки, роли и включаемые файлы задач.
+#
+# Анализ начинается с заданных файлов. Ссылки из их результатов
+# (FileResult.references: import_playbook, roles, include_role, import_role,
+# include_tasks, import_tasks) разрешаются в пути, и файлы, на которые они
+# указывают, анализируются следующим проходом - каждый один раз за запуск,
+# сколько бы плейбуков на него ни ссылалось (роль, общая для 400 плейбуков,
+# разбирается и проверяется один раз).
+#
+# Нарушения файла задач выдаются один раз, с полем reached_from: плейбуки
+# (файл, имя плейбука и строка ссылки), из которых файл достижим напрямую или
+# через другие файлы задач. Поэтому результаты файлов задач выдаются после
+# результатов плейбуков, когда граф построен целиком.
+#
+# Цикл ссылок (a.yml включает b.yml, а тот - a.yml) не приводит к повторному
+# анализу; для ссылки, замыкающей цикл, выдается диагностика include_cycle.
+#
+# Роль ищется в каталоге roles/ рядом с файлом, в самом этом каталоге,
+# в каталогах roles/ выше по дереву и в ANSIBLE_ROLES_PATH; задачи роли -
+# tasks/main.yml. Файл задач ищется относительно включающего файла, а внутри
+# роли - также в ее каталоге tasks/.
+
+INCLUDE_CYCLE = 'include_cycle'
+
+ROLE_ENTRIES = (os.path.join('tasks', 'main.yml'), os.path.join('tasks', 'main.yaml'))
+
+
+class ProjectGraph:
+    """Файлы проекта и ссылки между ними"""
+
+    def __init__(self, roles_path: Optional[List[str]] = None):
+        if roles_path is None:
+            roles_path = [path for path in os.environ.get('ANSIBLE_ROLES_PATH', '').split(os.pathsep) if path]
+        self.roles_path = roles_path
+        # Ключ файла - реальный путь; для отчета используется путь, под которым файл найден впервые
+        self.paths: Dict[str, str] = {}
+        self.parents: Dict[str, List[Tuple[str, int, str]]] = {}  # ключ -> (ключ ссылающегося файла, строка, плейбук)
+        self.children: Dict[str, List[str]] = {}
+        self.tasks_files: Set[str] = set()
+        self.referenced = 0
+        self.unresolved: List[Dict[str, Any]] = []
+        self.cycles = 0
+        self._roles: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def add(self, path: str) -> Tuple[str, bool]:
+        """Регистрирует файл; возвращает его ключ и признак того, что файл новый"""
+        key = os.path.realpath(path)
+        if key in self.paths:
+            return key, False
+        self.paths[key] = path
+        return key, True
+
+    def add_result(self, result: FileResult) -> List[str]:
+        """
+        Добавляет ссылки проанализированного файла
+
+        :return: Новые файлы, которые нужно проанализировать
+        """
+        key, _ = self.add(result.path)
+        if result.tasks_file:
+            self.tasks_files.add(key)
+
+        new = []
+        for kind, target, line, play in result.references:
+            path = self.resolve(kind, target, result.path)
+            if path is None:
+                self.unresolved.append({'file': result.path, 'line': line, 'kind': kind, 'target': target})
+                continue
+            child, created = self.add(path)
+            if created:
+                new.append(path)
+                self.referenced += 1
+            cycle = self._find_path(child, key)
+            self.parents.setdefault(child, []).append((key, line, play))
+            self.children.setdefault(key, []).append(child)
+            if cycle is not None:
+                self.cycles += 1
+                chain = ' -> '.join(self.paths[node] for node in [key] + cycle)
+                result.diagnostics.append({
+                    'type': INCLUDE_CYCLE,
+                    'file': result.path,
+                    'line': line,
+                    'message': f"Циклическая ссылка на файл: {chain}",
+                })
+        return new
+
+    def _find_path(self, start: str, end: str) -> Optional[List[str]]:
+        # Путь по ссылкам от start до end включительно (None - end недостижим)
+        previous: Dict[str, Optional[str]] = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node == end:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for child in self.children.get(node, ()):
+                if child not in previous:
+                    previous[child] = node
+                    stack.append(child)
+        return None
+
+    def resolve(self, kind: str, target: str, path: str) -> Optional[str]:
+        """Путь к файлу, на который ссылается файл path (None - файл не найден)"""
+        directory = os.path.dirname(path)
+        if kind == ROLE:
+            key = (target, directory)
+            if key not in self._roles:
+                self._roles[key] = self._find_role(target, directory)
+            return self._roles[key]
+
+        candidates = [os.path.join(directory, target)]
+        if kind == TASKS:
+            tasks_directory = _tasks_directory(directory)
+            if tasks_directory is not None and tasks_directory != directory:
+                candidates.append(os.path.join(tasks_directory, target))
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return os.path.normpath(candidate)
+        return None
+
+    def _find_role(self, name: str, directory: str) -> Optional[str]:
+        bases = [os.path.join(directory, 'roles'), directory]
+        current = directory
+        while os.path.dirname(current) != current:
+            current = os.path.dirname(current)
+            bases.append(os.path.join(current, 'roles'))
+        bases.extend(self.roles_path)
+        for base in bases:
+            for entry in ROLE_ENTRIES:
+                candidate = os.path.join(base, name, entry)
+                if os.path.isfile(candidate):
+                    return os.path.normpath(candidate)
+        return None
+
+    def reached_from(self, path: str) -> List[Dict[str, Any]]:
+        """Плейбуки, из которых достижим файл задач: файл, имя плейбука и строка ссылки"""
+        start = os.path.realpath(path)
+        found: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        visited = {start}
+        stack = [start]
+        while stack:
+            for parent, line, play in self.parents.get(stack.pop(), ()):
+                if parent not in self.tasks_files:
+                    entry = (self.paths[parent], play, line)
+                    found.setdefault(entry, {'file': entry[0], 'play': play or None, 'line': line})
+                elif parent not in visited:
+                    visited.add(parent)
+                    stack.append(parent)
+        return [found[entry] for entry in sorted(found)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {'files': len(self.paths), 'referenced': self.referenced,
+                'unresolved': len(self.unresolved), 'cycles': self.cycles}
+
+
+def _tasks_directory(directory: str) -> Optional[str]:
+    # Ближайший каталог tasks/ выше directory (каталог задач роли)
+    current = directory
+    while True:
+        if os.path.basename(current) == 'tasks':
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def iter_project(paths: List[str], results: Iterable[FileResult], jobs: Optional[int] = None,
+                 options: Optional[ScanOptions] = None,
+                 graph: Optional[ProjectGraph] = None) -> Iterator[FileResult]:
+    """
+    Дополняет результаты анализа файлов paths результатами файлов, на которые они ссылаются
+
+    :param results: Результаты анализа paths (например, iter_scan(paths, jobs, options))
+    :param graph: Граф проекта (например, чтобы получить сводку после анализа)
+    :return: Результаты плейбуков в порядке анализа, затем результаты файлов задач с reached_from
+    """
+    graph = graph if graph is not None else ProjectGraph()
+    for path in paths:
+        graph.add(path)
+
+    held: List[FileResult] = []
+    while True:
+        queued: List[str] = []
+        for result in results:
+            queued.extend(graph.add_result(result))
+            if result.tasks_file:
+                held.append(result)
+            else:
+                yield result
+        if not queued:
+            break
+        results = iter_scan(queued, jobs, options)
+
+    for result in held:
+        reached = graph.reached_from(result.path)
+        if reached:
+            for violation in result.violations:
+                violation['reached_from'] = reached
+        yield result
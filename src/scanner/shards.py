@@ -0,0 +1,191 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.ast_model.nodes import PlayNode, TaskNode, BlockNode, ExpressionNode, VariableNode
+from src.ast_model.builder import ASTBuilder, plain_data
+from src.ast_model.table import TaskTable, BECOME_UNKNOWN
+
+# Проверка задач одного большого плейбука в нескольких процессах.
+#
+# Задачи плейбука, в котором не меньше ScanOptions.shard_tasks задач, делятся
+# на части по порядку следования; правила уровня задач проверяют части
+# в процессах пула, правила уровня плейбука - в текущем процессе. Нарушения
+# частей объединяются по правилам в порядке частей, поэтому результат тот же,
+# что и у RulesEngine.run_buckets.
+#
+# Части передаются в компактном виде: задачи и выражения - кортежами значений
+# полей, параметры - обычными dict/list без дерева ruamel (plain_data).
+# Заголовок плейбука (имя, хосты, переменные, vars_prompt, блоки таблицы
+# задач) передается с каждой частью; задачи - вместе со столбцами своих строк.
+#
+# Бюджеты времени правил (rules_engine.guard) отсчитываются в каждой части
+# отдельно; правило, превысившее бюджет в одной части, отключается до конца
+# файла, и нарушения следующих частей для него отбрасываются.
+
+# Меньшие части не окупают передачу между процессами
+MIN_SHARD_TASKS = 1000
+# Частей на процесс: части разной стоимости выравниваются очередью пула
+SHARDS_PER_JOB = 4
+# Задача блочного YAML занимает хотя бы строку "- m: x"
+MIN_TASK_BYTES = 8
+
+_READ_SIZE = 1024 * 1024
+
+
+def may_shard(path: str, shard_tasks: int) -> bool:
+    """
+    Может ли файл содержать плейбук из shard_tasks задач: оценка без парсинга
+    по числу элементов списков "- " (не меньше числа задач блочного YAML)
+    """
+    if not shard_tasks:
+        return False
+    try:
+        if os.path.getsize(path) < shard_tasks * MIN_TASK_BYTES:
+            return False
+        items = 0
+        tail = b''
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_READ_SIZE), b''):
+                data = tail + block
+                items += data.count(b'- ')
+                if items >= shard_tasks:
+                    return True
+                tail = data[-1:]
+    except OSError:
+        return False
+    return False
+
+
+def _pack_expression(node: Optional[ExpressionNode]) -> Optional[Tuple]:
+    if node is None:
+        return None
+    value = node.value
+    if node.expression_type == 'list':
+        value = [_pack_expression(item) for item in value]
+    else:
+        value = plain_data(value)
+    return (node.line, node.column, node.end_line, node.expression_type, value,
+            _pack_expression(node.left), _pack_expression(node.right), node.operator)
+
+
+def _unpack_expression(data: Optional[Tuple]) -> Optional[ExpressionNode]:
+    if data is None:
+        return None
+    line, column, end_line, expression_type, value, left, right, operator = data
+    if expression_type == 'list':
+        value = [_unpack_expression(item) for item in value]
+    return ExpressionNode(line, column, end_line, expression_type, value,
+                          _unpack_expression(left), _unpack_expression(right), operator)
+
+
+def _same(data: Any) -> Any:
+    return data
+
+
+def pack_task(task: TaskNode, plain: Callable[[Any], Any] = plain_data) -> Tuple:
+    """
+    Задача в виде кортежа значений полей (в порядке полей TaskNode)
+
+    :param plain: Копирование параметров в обычные контейнеры (не нужно для компактного AST)
+    """
+    return (task.line, task.column, task.end_line, plain_data(task.name), plain_data(task.module), task.module_id,
+            plain(task.parameters), _pack_expression(task.when), _pack_expression(task.changed_when),
+            _pack_expression(task.loop), plain_data(task.register), plain(task.notify))
+
+
+def unpack_task(data: Tuple) -> TaskNode:
+    (line, column, end_line, name, module, module_id, parameters,
+     when, changed_when, loop, register, notify) = data
+    return TaskNode(line, column, end_line, name, module, module_id, parameters, _unpack_expression(when),
+                    _unpack_expression(changed_when), _unpack_expression(loop), register, notify)
+
+
+def pack_play(play: PlayNode) -> Tuple:
+    """Заголовок плейбука без задач: блоки таблицы задач передаются здесь"""
+    variables = [(variable.line, variable.column, variable.end_line, plain_data(variable.name),
+                  plain_data(variable.value)) for variable in play.vars.values()]
+    prompts = [(prompt.line, prompt.column, prompt.end_line, plain_data(prompt.name),
+                plain_data(prompt.value)) for prompt in play.prompts.values()]
+    table = play.table
+    indexes = {id(block): index for index, block in enumerate(table.block_nodes)}
+    blocks = [(block.line, block.column, block.end_line, plain_data(block.name), _pack_expression(block.when),
+               block.become, block.part, indexes[id(block.parent)] if block.parent is not None else -1)
+              for block in table.block_nodes]
+    return (play.line, play.column, play.end_line, plain_data(play.name), plain_data(play.hosts),
+            variables, prompts, list(play.roles), plain_data(play.import_playbook), play.tasks_file, play.become, blocks)
+
+
+def unpack_play(data: Tuple) -> PlayNode:
+    (line, column, end_line, name, hosts, variables, prompts, roles, import_playbook, tasks_file,
+     become, blocks) = data
+    play = PlayNode(line, column, end_line, name, hosts, roles=roles, import_playbook=import_playbook,
+                    tasks_file=tasks_file, become=become)
+    for variable in variables:
+        node = VariableNode(*variable)
+        play.vars[node.name] = node
+    for prompt in prompts:
+        node = VariableNode(*prompt)
+        play.prompts[node.name] = node
+    play.table = TaskTable(become)
+    for block_line, block_column, block_end, block_name, when, block_become, part, parent in blocks:
+        play.table.add_block(BlockNode(block_line, block_column, block_end, block_name, _unpack_expression(when),
+                                       block_become, part), parent)
+    return play
+
+
+def pack_rows(table: TaskTable, start: int, stop: int, plain: Callable[[Any], Any] = plain_data) -> List[Tuple]:
+    """Строки таблицы задач с start по stop: задача и столбцы строки"""
+    return [(pack_task(table.tasks[row], plain), table.sections[row], table.blocks[row], table.parts[row],
+             table.becomes[row]) for row in range(start, min(stop, len(table.tasks)))]
+
+
+def unpack_rows(play: PlayNode, rows: List[Tuple]):
+    table = play.table
+    for task, section, block, part, become in rows:
+        table.append(unpack_task(task), section, block, part, None if become == BECOME_UNKNOWN else bool(become))
+    ASTBuilder.attach_table(play, table)
+
+
+def check_shard(rule_ids: Tuple[str, ...], path: str, play: Tuple,
+                rows: List[Tuple]) -> Tuple[List[List[Dict[str, Any]]], Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Проверяет часть задач плейбука в процессе пула
+
+    :param play: Заголовок плейбука (pack_play)
+    :param rows: Строки таблицы задач (pack_rows)
+    :return: Нарушения по правилам rule_ids, статистика правил и диагностики
+    """
+    from src.scanner.pool import get_context
+
+    context = get_context()
+    selected = set(rule_ids)
+    engine = context.engine_for([rule for rule in context.rules if rule.id in selected])
+    engine.start_file(path)
+    play_node = unpack_play(play)
+    unpack_rows(play_node, rows)
+    buckets = engine.run_tasks(play_node, play_node.tasks)
+    return buckets, engine.take_stats(), engine.take_diagnostics()
+
+
+def run_sharded(context: Any, engine: Any, play: PlayNode, path: str) -> List[List[Dict[str, Any]]]:
+    """То же, что engine.run_buckets(play), но задачи проверяются частями в пуле context.shard_executor"""
+    buckets = engine.run_play_visitors(play)
+    guard = engine.guard
+    indexes = [index for index in range(len(engine.rules)) if guard is None or index not in guard.disabled]
+    rule_ids = tuple(engine.rules[index].id for index in indexes)
+
+    header = pack_play(play)
+    plain = _same if context.options.compact_ast else plain_data
+    tasks = play.tasks
+    size = max(MIN_SHARD_TASKS, -(-len(tasks) // (context.shard_jobs * SHARDS_PER_JOB)))
+    futures = [context.shard_executor.submit(check_shard, rule_ids, path, header,
+                                             pack_rows(play.table, start, start + size, plain))
+               for start in range(0, len(tasks), size)]
+
+    for future in futures:
+        shard_buckets, stats, diagnostics = future.result()
+        for index, bucket in zip(indexes, shard_buckets):
+            if guard is None or index not in guard.disabled:
+                buckets[index].extend(bucket)
+        engine.add_stats(stats)
+        engine.add_diagnostics(diagnostics)
+    return buckets
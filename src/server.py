@@ -0,0 +1,209 @@
+import sys
+import json
+import argparse
+import queue
+import threading
+from typing import Any, Dict, Set, TextIO
+
+# Долгоживущий сервер анализа для редакторов: python -m src.server
+#
+# Протокол - JSON-RPC 2.0 поверх stdin/stdout, одно сообщение на строку.
+# Правила, парсер и движок загружаются один раз при запуске; повторный анализ
+# документа инкрементальный (см. scanner.incremental).
+#
+# Методы:
+#   analyze {uri, text}      -> JSON-отчет, как у generate_json_report
+#   close {uri}              уведомление: документ закрыт, состояние можно забыть
+#   $/cancelRequest {id}     уведомление: отменить запрос (ответ - ошибка -32800)
+#   shutdown                 -> null; после него новые запросы не принимаются
+#   exit                     уведомление: завершить процесс
+# Сервер также завершается, когда клиент закрывает stdin. Если перед этим
+# был принят shutdown, ранее принятые запросы и сам shutdown получают ответы;
+# иначе незавершенные запросы отменяются.
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+REQUEST_CANCELLED = -32800
+ANALYSIS_FAILED = -32001
+
+
+class AnalysisServer:
+    def __init__(self, output: TextIO, parser: str = 'rt'):
+        self.output = output
+        self.parser = parser
+        self._write_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()  # Сообщения клиента; None - конец ввода
+        self._pending: Set[Any] = set()
+        self._cancelled: Set[Any] = set()
+        self._cancel_lock = threading.Lock()
+        self._shutdown = False
+        self._analyzer = None
+
+    def serve(self, input: TextIO) -> int:
+        """Читает сообщения до exit или конца входного потока; возвращает код завершения"""
+        from src.scanner import ScanOptions, configure
+        from src.scanner.incremental import IncrementalAnalyzer
+
+        # Правила и парсер загружаются до первого запроса
+        self._analyzer = IncrementalAnalyzer(configure(ScanOptions(parser=self.parser)))
+
+        worker = threading.Thread(target=self._work, name='analysis', daemon=True)
+        worker.start()
+
+        code = 0
+        for line in input:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                self._error(None, PARSE_ERROR, f"Некорректный JSON: {e}")
+                continue
+            if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+                self._error(message.get('id') if isinstance(message, dict) else None,
+                            INVALID_REQUEST, "Ожидается объект запроса JSON-RPC")
+                continue
+
+            method = message['method']
+            if method == 'exit':
+                code = 0 if self._shutdown else 1
+                break
+            if method == '$/cancelRequest':
+                self._cancel((message.get('params') or {}).get('id'))
+            elif method == 'shutdown':
+                self._shutdown = True
+                # Ответ после всех ранее принятых запросов
+                self._enqueue(message)
+            elif self._shutdown:
+                self._error(message.get('id'), INVALID_REQUEST, "Сервер завершает работу")
+            else:
+                self._enqueue(message)
+
+        if not self._shutdown:
+            # Клиент ушел без shutdown: незавершенные запросы отменяются
+            with self._cancel_lock:
+                self._cancelled.update(self._pending)
+        # После shutdown очередь дорабатывается до конца, включая ответ на shutdown
+        self._queue.put(None)
+        worker.join()
+        return code
+
+    def _enqueue(self, message: Dict[str, Any]):
+        if message.get('id') is not None:
+            with self._cancel_lock:
+                self._pending.add(message['id'])
+        self._queue.put(message)
+
+    def _cancel(self, request_id: Any):
+        # Отмена уже завершенного или неизвестного запроса игнорируется
+        with self._cancel_lock:
+            if request_id in self._pending:
+                self._cancelled.add(request_id)
+
+    def _is_cancelled(self, request_id: Any) -> bool:
+        with self._cancel_lock:
+            return request_id in self._cancelled
+
+    def _work(self):
+        from src.scanner.incremental import AnalysisCancelled
+
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+
+            request_id = message.get('id')
+            try:
+                if self._is_cancelled(request_id):
+                    raise AnalysisCancelled()
+                result = self._dispatch(message['method'], message.get('params') or {}, request_id)
+            except AnalysisCancelled:
+                self._fail(request_id, REQUEST_CANCELLED, "Запрос отменен")
+            except _RequestError as e:
+                self._fail(request_id, e.code, str(e))
+            except Exception as e:
+                self._fail(request_id, INTERNAL_ERROR, f"Ошибка анализа: {str(e)}")
+            else:
+                self._respond(request_id, result)
+            finally:
+                with self._cancel_lock:
+                    self._pending.discard(request_id)
+                    self._cancelled.discard(request_id)
+
+    def _dispatch(self, method: str, params: Dict[str, Any], request_id: Any) -> Any:
+        from src.reports import ReportGenerator
+
+        if method == 'analyze':
+            uri, text = params.get('uri'), params.get('text')
+            if not isinstance(uri, str) or not isinstance(text, str):
+                raise _RequestError(INVALID_PARAMS, "Параметры analyze: uri и text (строки)")
+            result = self._analyzer.analyze_text(uri, text, lambda: self._is_cancelled(request_id))
+            if result.error:
+                raise _RequestError(ANALYSIS_FAILED, result.error)
+            return ReportGenerator.build_json_report(result.violations)
+
+        if method == 'close':
+            uri = params.get('uri')
+            if isinstance(uri, str):
+                self._analyzer.forget(uri)
+            return None
+
+        if method == 'shutdown':
+            return None
+
+        raise _RequestError(METHOD_NOT_FOUND, f"Неизвестный метод: {method}")
+
+    def _respond(self, request_id: Any, result: Any):
+        # Уведомления (без id) не требуют ответа
+        if request_id is not None:
+            self._send({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+
+    def _fail(self, request_id: Any, code: int, message: str):
+        if request_id is not None:
+            self._error(request_id, code, message)
+
+    def _error(self, request_id: Any, code: int, message: str):
+        self._send({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+    def _send(self, message: Dict[str, Any]):
+        data = json.dumps(message, ensure_ascii=False, default=str)
+        with self._write_lock:
+            try:
+                self.output.write(data + '\n')
+                self.output.flush()
+            except (BrokenPipeError, ValueError):
+                # Клиент закрыл канал; процесс завершится по концу stdin
+                pass
+
+
+class _RequestError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def main():
+    from src.lexer_parser import PARSER_BACKENDS, DEFAULT_PARSER
+
+    parser = argparse.ArgumentParser(description='Сервер SAST-анализа плейбуков (JSON-RPC через stdin/stdout)')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                        help='Парсер YAML (по умолчанию %(default)s)')
+    args = parser.parse_args()
+
+    # stdout занят протоколом: любой посторонний вывод (например, сообщения
+    # загрузчика правил) перенаправляется в stderr
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    output.reconfigure(encoding='utf-8')
+    sys.stdin.reconfigure(encoding='utf-8')
+
+    server = AnalysisServer(output, args.parser)
+    sys.exit(server.serve(sys.stdin))
+
+
+if __name__ == "__main__":
+    main()
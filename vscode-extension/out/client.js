@@ -0,0 +1,140 @@
+"use strict";
+var __createBinding = (this && this.__createBinding) || (Object.create ? (function(o, m, k, k2) {
+    if (k2 === undefined) k2 = k;
+    var desc = Object.getOwnPropertyDescriptor(m, k);
+    if (!desc || ("get" in desc ? !m.__esModule : desc.writable || desc.configurable)) {
+      desc = { enumerable: true, get: function() { return m[k]; } };
+    }
+    Object.defineProperty(o, k2, desc);
+}) : (function(o, m, k, k2) {
+    if (k2 === undefined) k2 = k;
+    o[k2] = m[k];
+}));
+var __setModuleDefault = (this && this.__setModuleDefault) || (Object.create ? (function(o, v) {
+    Object.defineProperty(o, "default", { enumerable: true, value: v });
+}) : function(o, v) {
+    o["default"] = v;
+});
+var __importStar = (this && this.__importStar) || function (mod) {
+    if (mod && mod.__esModule) return mod;
+    var result = {};
+    if (mod != null) for (var k in mod) if (k !== "default" && Object.prototype.hasOwnProperty.call(mod, k)) __createBinding(result, mod, k);
+    __setModuleDefault(result, mod);
+    return result;
+};
+Object.defineProperty(exports, "__esModule", { value: true });
+exports.AnalysisClient = exports.RpcError = exports.REQUEST_CANCELLED = void 0;
+const child_process = __importStar(require("child_process"));
+// Клиент долгоживущего сервера анализа (python -m src.server).
+// Сервер запускается один раз и переиспользуется для всех документов;
+// сообщения JSON-RPC передаются по одному на строку через stdin/stdout.
+exports.REQUEST_CANCELLED = -32800;
+class RpcError extends Error {
+    constructor(code, message) {
+        super(message);
+        this.code = code;
+    }
+}
+exports.RpcError = RpcError;
+class AnalysisClient {
+    constructor(pythonPath, cwd) {
+        this.pythonPath = pythonPath;
+        this.cwd = cwd;
+        this.pending = new Map();
+        this.nextId = 1;
+        this.buffer = '';
+    }
+    request(method, params) {
+        const id = this.nextId++;
+        const result = new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject });
+        });
+        this.send({ jsonrpc: '2.0', id, method, params });
+        return { id, result };
+    }
+    notify(method, params) {
+        // Уведомления без запущенного сервера не имеют смысла: его состояние уже потеряно
+        if (!this.process) {
+            return;
+        }
+        this.send({ jsonrpc: '2.0', method, params });
+    }
+    cancel(id) {
+        if (this.pending.has(id)) {
+            this.notify('$/cancelRequest', { id });
+        }
+    }
+    dispose() {
+        var _a;
+        const child = this.process;
+        if (!child) {
+            return;
+        }
+        this.send({ jsonrpc: '2.0', id: this.nextId++, method: 'shutdown', params: {} });
+        this.notify('exit', {});
+        (_a = child.stdin) === null || _a === void 0 ? void 0 : _a.end();
+        // Сервер, не завершившийся сам, останавливаем принудительно
+        setTimeout(() => child.kill(), 2000).unref();
+    }
+    send(message) {
+        var _a;
+        const child = this.ensureProcess();
+        (_a = child.stdin) === null || _a === void 0 ? void 0 : _a.write(JSON.stringify(message) + '\n');
+    }
+    ensureProcess() {
+        var _a, _b, _c;
+        if (this.process) {
+            return this.process;
+        }
+        const child = child_process.spawn(this.pythonPath, ['-m', 'src.server'], {
+            cwd: this.cwd,
+            stdio: ['pipe', 'pipe', 'pipe']
+        });
+        this.process = child;
+        this.buffer = '';
+        (_a = child.stdout) === null || _a === void 0 ? void 0 : _a.setEncoding('utf8');
+        (_b = child.stdout) === null || _b === void 0 ? void 0 : _b.on('data', (chunk) => this.onData(chunk));
+        (_c = child.stderr) === null || _c === void 0 ? void 0 : _c.on('data', (chunk) => console.error(`sast-yaml: ${chunk.toString()}`));
+        child.on('error', (error) => this.onExit(child, error));
+        child.on('exit', (code) => this.onExit(child, new Error(`Сервер анализа завершился с кодом ${code}`)));
+        return child;
+    }
+    onData(chunk) {
+        this.buffer += chunk;
+        let newline = this.buffer.indexOf('\n');
+        while (newline >= 0) {
+            const line = this.buffer.slice(0, newline).trim();
+            this.buffer = this.buffer.slice(newline + 1);
+            if (line) {
+                this.onMessage(JSON.parse(line));
+            }
+            newline = this.buffer.indexOf('\n');
+        }
+    }
+    onMessage(message) {
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        this.pending.delete(message.id);
+        if (message.error) {
+            request.reject(new RpcError(message.error.code, message.error.message));
+        }
+        else {
+            request.resolve(message.result);
+        }
+    }
+    onExit(child, error) {
+        if (this.process !== child) {
+            return;
+        }
+        // Следующий запрос запустит сервер заново
+        this.process = undefined;
+        for (const request of this.pending.values()) {
+            request.reject(error);
+        }
+        this.pending.clear();
+    }
+}
+exports.AnalysisClient = AnalysisClient;
+//# sourceMappingURL=client.js.map
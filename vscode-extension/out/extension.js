@@ -25,9 +25,11 @@ var __importStar = (this && this.__importStar) || function (mod) {
 Object.defineProperty(exports, "__esModule", { value: true });
 exports.deactivate = exports.activate = void 0;
 const vscode = __importStar(require("vscode"));
-const child_process = __importStar(require("child_process"));
 const path = __importStar(require("path"));
-const fs = __importStar(require("fs"));
+const client_1 = require("./client");
+// Сервер анализа, общий для всех документов, и текущие запросы по документам
+let client;
+const inFlight = new Map();
 function activate(context) {
     console.log('Расширение SAST YAML успешно активировано');
     const diagnosticCollection = vscode.languages.createDiagnosticCollection('sast-yaml');
@@ -57,7 +59,11 @@ function activate(context) {
             analyzeDocument(document, diagnosticCollection);
         }
     });
-    context.subscriptions.push(analyzeCommand, showReportCommand, saveDisposable);
+    // Сервер может забыть состояние закрытого документа
+    const closeDisposable = vscode.workspace.onDidCloseTextDocument((document) => {
+        client === null || client === void 0 ? void 0 : client.notify('close', { uri: document.uri.toString() });
+    });
+    context.subscriptions.push(analyzeCommand, showReportCommand, saveDisposable, closeDisposable);
     // Проверка всех открытые YAML-файлов при активации
     vscode.workspace.textDocuments.forEach(document => {
         if (isAnsiblePlaybook(document)) {
@@ -78,23 +84,20 @@ async function analyzeDocument(document, collection, silent = false) {
     if (!silent) {
         vscode.window.setStatusBarMessage('🔍 Анализ безопасности плейбука', 3000);
     }
-    const tempDir = require('os').tmpdir();
-    const tempFile = path.join(tempDir, `temp_${Date.now()}.yml`);
-    const projectRoot = path.join(__dirname, '..', '..');
-    const pythonPath = config.get('pythonPath', 'python3');
+    const uri = document.uri.toString();
+    let requestId;
     try {
-        // Сохраняем содержимое во временный файл
-        fs.writeFileSync(tempFile, document.getText());
-        // Запуск анализа
-        const result = await executeCommand(pythonPath, [
-            '-m',
-            'src.main',
-            tempFile,
-            '--format',
-            'json',
-            '--no-ast'
-        ], projectRoot);
-        const violations = JSON.parse(result).violations || [];
+        const analysisClient = getClient(config);
+        // Предыдущий анализ этого документа больше не нужен
+        const previous = inFlight.get(uri);
+        if (previous !== undefined) {
+            analysisClient.cancel(previous);
+        }
+        const request = analysisClient.request('analyze', { uri, text: document.getText() });
+        requestId = request.id;
+        inFlight.set(uri, request.id);
+        const report = await request.result;
+        const violations = report.violations || [];
         const diagnostics = violations.map(v => createDiagnostic(v, document));
         collection.set(document.uri, diagnostics);
         if (!silent) {
@@ -115,6 +118,10 @@ async function analyzeDocument(document, collection, silent = false) {
         return violations;
     }
     catch (error) {
+        // Запрос отменен более новым анализом того же документа
+        if (error instanceof client_1.RpcError && error.code === client_1.REQUEST_CANCELLED) {
+            return [];
+        }
         if (!silent) {
             vscode.window.showErrorMessage(`Ошибка в результате SAST-анализе: ${error}`);
         }
@@ -122,12 +129,19 @@ async function analyzeDocument(document, collection, silent = false) {
         return [];
     }
     finally {
-        // Удаляем временный файл
-        if (fs.existsSync(tempFile)) {
-            fs.unlinkSync(tempFile);
+        if (requestId !== undefined && inFlight.get(uri) === requestId) {
+            inFlight.delete(uri);
         }
     }
 }
+function getClient(config) {
+    if (!client) {
+        const projectRoot = path.join(__dirname, '..', '..');
+        const pythonPath = config.get('pythonPath', 'python3');
+        client = new client_1.AnalysisClient(pythonPath, projectRoot);
+    }
+    return client;
+}
 function pluralize(count, one, few, many) {
     if (count % 10 === 1 && count % 100 !== 11)
         return one;
@@ -135,21 +149,9 @@ function pluralize(count, one, few, many) {
         return few;
     return many;
 }
-function executeCommand(command, args, cwd) {
-    return new Promise((resolve, reject) => {
-        child_process.execFile(command, args, { cwd }, (error, stdout, stderr) => {
-            if (error) {
-                reject(new Error(stderr.toString() || error.message));
-            }
-            else {
-                resolve(stdout.toString());
-            }
-        });
-    });
-}
 function createDiagnostic(violation, document) {
-    const position = findViolationPosition(violation, document);
-    const diagnostic = new vscode.Diagnostic(new vscode.Range(position, position), `[${violation.rule_id}] ${violation.message}`, getSeverity(violation.severity));
+    const range = violationRange(violation, document);
+    const diagnostic = new vscode.Diagnostic(range, `[${violation.rule_id}] ${violation.message}`, getSeverity(violation.severity));
     diagnostic.source = 'sast-yaml';
     diagnostic.code = violation.rule_id;
     return diagnostic;
@@ -162,16 +164,16 @@ function getSeverity(severity) {
         default: return vscode.DiagnosticSeverity.Hint;
     }
 }
-function findViolationPosition(violation, document) {
-    const searchText = violation.task || violation.play || violation.rule_id;
-    if (searchText) {
-        const text = document.getText();
-        const index = text.indexOf(searchText);
-        if (index >= 0) {
-            return document.positionAt(index);
-        }
+function violationRange(violation, document) {
+    // Сервер возвращает позицию задачи (или плейбука) с 1; подсвечивается узел
+    // до последней строки end_line включительно, без нее - первая строка узла
+    if (!violation.line || violation.line > document.lineCount) {
+        return new vscode.Range(0, 0, 0, 0);
     }
-    return new vscode.Position(0, 0);
+    const line = document.lineAt(violation.line - 1);
+    const start = Math.min(Math.max((violation.column || 1) - 1, 0), line.range.end.character);
+    const endLine = document.lineAt(Math.min(Math.max(violation.end_line || violation.line, violation.line), document.lineCount) - 1);
+    return new vscode.Range(line.lineNumber, start, endLine.lineNumber, endLine.range.end.character);
 }
 function showFullReport(violations, filename) {
     const panel = vscode.window.createWebviewPanel('sastyamlReport', `Отчет - ${path.basename(filename)}`, vscode.ViewColumn.Beside, { enableScripts: true });
@@ -276,6 +278,9 @@ function getReportHtml(violations, filename) {
         </html>
     `;
 }
-function deactivate() { }
+function deactivate() {
+    client === null || client === void 0 ? void 0 : client.dispose();
+    client = undefined;
+}
 exports.deactivate = deactivate;
 //# sourceMappingURL=extension.js.map
\ No newline at end of file
@@ -0,0 +1,133 @@
+import * as child_process from 'child_process';
+
+// Клиент долгоживущего сервера анализа (python -m src.server).
+// Сервер запускается один раз и переиспользуется для всех документов;
+// сообщения JSON-RPC передаются по одному на строку через stdin/stdout.
+
+export const REQUEST_CANCELLED = -32800;
+
+export class RpcError extends Error {
+    code: number;
+
+    constructor(code: number, message: string) {
+        super(message);
+        this.code = code;
+    }
+}
+
+interface PendingRequest {
+    resolve: (result: any) => void;
+    reject: (error: Error) => void;
+}
+
+export class AnalysisClient {
+    private process: child_process.ChildProcess | undefined;
+    private pending: Map<number, PendingRequest>;
+    private nextId: number;
+    private buffer: string;
+
+    constructor(private pythonPath: string, private cwd: string) {
+        this.pending = new Map();
+        this.nextId = 1;
+        this.buffer = '';
+    }
+
+    request(method: string, params: object): { id: number, result: Promise<any> } {
+        const id = this.nextId++;
+        const result = new Promise<any>((resolve, reject) => {
+            this.pending.set(id, { resolve, reject });
+        });
+        this.send({ jsonrpc: '2.0', id, method, params });
+        return { id, result };
+    }
+
+    notify(method: string, params: object) {
+        // Уведомления без запущенного сервера не имеют смысла: его состояние уже потеряно
+        if (!this.process) {
+            return;
+        }
+        this.send({ jsonrpc: '2.0', method, params });
+    }
+
+    cancel(id: number) {
+        if (this.pending.has(id)) {
+            this.notify('$/cancelRequest', { id });
+        }
+    }
+
+    dispose() {
+        const child = this.process;
+        if (!child) {
+            return;
+        }
+        this.send({ jsonrpc: '2.0', id: this.nextId++, method: 'shutdown', params: {} });
+        this.notify('exit', {});
+        child.stdin?.end();
+        // Сервер, не завершившийся сам, останавливаем принудительно
+        setTimeout(() => child.kill(), 2000).unref();
+    }
+
+    private send(message: object) {
+        const child = this.ensureProcess();
+        child.stdin?.write(JSON.stringify(message) + '\n');
+    }
+
+    private ensureProcess(): child_process.ChildProcess {
+        if (this.process) {
+            return this.process;
+        }
+
+        const child = child_process.spawn(this.pythonPath, ['-m', 'src.server'], {
+            cwd: this.cwd,
+            stdio: ['pipe', 'pipe', 'pipe']
+        });
+        this.process = child;
+        this.buffer = '';
+
+        child.stdout?.setEncoding('utf8');
+        child.stdout?.on('data', (chunk: string) => this.onData(chunk));
+        child.stderr?.on('data', (chunk: Buffer) => console.error(`sast-yaml: ${chunk.toString()}`));
+        child.on('error', (error) => this.onExit(child, error));
+        child.on('exit', (code) => this.onExit(child, new Error(`Сервер анализа завершился с кодом ${code}`)));
+
+        return child;
+    }
+
+    private onData(chunk: string) {
+        this.buffer += chunk;
+        let newline = this.buffer.indexOf('\n');
+        while (newline >= 0) {
+            const line = this.buffer.slice(0, newline).trim();
+            this.buffer = this.buffer.slice(newline + 1);
+            if (line) {
+                this.onMessage(JSON.parse(line));
+            }
+            newline = this.buffer.indexOf('\n');
+        }
+    }
+
+    private onMessage(message: any) {
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        this.pending.delete(message.id);
+        if (message.error) {
+            request.reject(new RpcError(message.error.code, message.error.message));
+        } else {
+            request.resolve(message.result);
+        }
+    }
+
+    private onExit(child: child_process.ChildProcess, error: Error) {
+        if (this.process !== child) {
+            return;
+        }
+        // Следующий запрос запустит сервер заново
+        this.process = undefined;
+        for (const request of this.pending.values()) {
+            request.reject(error);
+        }
+        this.pending.clear();
+    }
+}
@@ -1,7 +1,6 @@
 import * as vscode from 'vscode';
-import * as child_process from 'child_process';
 import * as path from 'path';
-import * as fs from 'fs';
+import { AnalysisClient, RpcError, REQUEST_CANCELLED } from './client';
 
 interface Violation {
     rule_id: string;
@@ -12,8 +11,13 @@ interface Violation {
     task?: string;
     line?: number;
     column?: number;
+    end_line?: number;
 }
 
+// Сервер анализа, общий для всех документов, и текущие запросы по документам
+let client: AnalysisClient | undefined;
+const inFlight = new Map<string, number>();
+
 export function activate(context: vscode.ExtensionContext) {
     console.log('Расширение SAST YAML успешно активировано');
 
@@ -47,7 +51,12 @@ export function activate(context: vscode.ExtensionContext) {
         }
     });
 
-    context.subscriptions.push(analyzeCommand, showReportCommand, saveDisposable);
+    // Сервер может забыть состояние закрытого документа
+    const closeDisposable = vscode.workspace.onDidCloseTextDocument((document) => {
+        client?.notify('close', { uri: document.uri.toString() });
+    });
+
+    context.subscriptions.push(analyzeCommand, showReportCommand, saveDisposable, closeDisposable);
 
     // Проверка всех открытые YAML-файлов при активации
     vscode.workspace.textDocuments.forEach(document => {
@@ -75,26 +84,24 @@ async function analyzeDocument(document: vscode.TextDocument,
         vscode.window.setStatusBarMessage('🔍 Анализ безопасности плейбука', 3000);
     }
 
-    const tempDir = require('os').tmpdir();
-    const tempFile = path.join(tempDir, `temp_${Date.now()}.yml`);
-    const projectRoot = path.join(__dirname, '..', '..');
-    const pythonPath = config.get('pythonPath', 'python3');
+    const uri = document.uri.toString();
+    let requestId: number | undefined;
 
     try {
-        // Сохраняем содержимое во временный файл
-        fs.writeFileSync(tempFile, document.getText());
-
-        // Запуск анализа
-        const result = await executeCommand(pythonPath, [
-            '-m',
-            'src.main',
-            tempFile,
-            '--format',
-            'json',
-	    '--no-ast'
-        ], projectRoot);
-
-        const violations: Violation[] = JSON.parse(result).violations || [];
+        const analysisClient = getClient(config);
+
+        // Предыдущий анализ этого документа больше не нужен
+        const previous = inFlight.get(uri);
+        if (previous !== undefined) {
+            analysisClient.cancel(previous);
+        }
+
+        const request = analysisClient.request('analyze', { uri, text: document.getText() });
+        requestId = request.id;
+        inFlight.set(uri, request.id);
+
+        const report = await request.result;
+        const violations: Violation[] = report.violations || [];
         const diagnostics = violations.map(v => createDiagnostic(v, document));
         
         collection.set(document.uri, diagnostics);
@@ -120,42 +127,42 @@ async function analyzeDocument(document: vscode.TextDocument,
         return violations;
 
     } catch (error) {
+        // Запрос отменен более новым анализом того же документа
+        if (error instanceof RpcError && error.code === REQUEST_CANCELLED) {
+            return [];
+        }
         if (!silent) {
             vscode.window.showErrorMessage(`Ошибка в результате SAST-анализе: ${error}`);
         }
         console.error('Ошибка в результате SAST-анализе:', error);
         return [];
     } finally {
-        // Удаляем временный файл
-        if (fs.existsSync(tempFile)) {
-            fs.unlinkSync(tempFile)
+        if (requestId !== undefined && inFlight.get(uri) === requestId) {
+            inFlight.delete(uri);
         }
     }
 }
 
+function getClient(config: vscode.WorkspaceConfiguration): AnalysisClient {
+    if (!client) {
+        const projectRoot = path.join(__dirname, '..', '..');
+        const pythonPath = config.get('pythonPath', 'python3');
+        client = new AnalysisClient(pythonPath, projectRoot);
+    }
+    return client;
+}
+
 function pluralize(count: number, one: string, few: string, many: string): string {
 	if (count % 10 === 1 && count % 100 !== 11) return one;
 	if (count % 10 >= 2 && count % 10 <= 4 && (count % 100 < 10 || count % 100 >= 20)) return few;
 	return many;
 }
 
-function executeCommand(command: string, args: string[], cwd?: string): Promise<string> {
-    return new Promise((resolve, reject) => {
-        child_process.execFile(command, args, { cwd }, (error, stdout, stderr) => {
-            if (error) {
-                reject(new Error(stderr.toString() || error.message));
-            } else {
-                resolve(stdout.toString());
-            }
-        });
-    });
-}
-
 function createDiagnostic(violation: Violation, document: vscode.TextDocument): vscode.Diagnostic {
-    const position = findViolationPosition(violation, document);
+    const range = violationRange(violation, document);
     
     const diagnostic = new vscode.Diagnostic(
-        new vscode.Range(position, position),
+        range,
         `[${violation.rule_id}] ${violation.message}`,
         getSeverity(violation.severity)
     );
@@ -175,16 +182,17 @@ function getSeverity(severity: string): vscode.DiagnosticSeverity {
     }
 }
 
-function findViolationPosition(violation: Violation, document: vscode.TextDocument): vscode.Position {
-    const searchText = violation.task || violation.play || violation.rule_id;
-    if (searchText) {
-        const text = document.getText();
-        const index = text.indexOf(searchText);
-        if (index >= 0) {
-            return document.positionAt(index);
-        }
+function violationRange(violation: Violation, document: vscode.TextDocument): vscode.Range {
+    // Сервер возвращает позицию задачи (или плейбука) с 1; подсвечивается узел
+    // до последней строки end_line включительно, без нее - первая строка узла
+    if (!violation.line || violation.line > document.lineCount) {
+        return new vscode.Range(0, 0, 0, 0);
     }
-    return new vscode.Position(0, 0);
+    const line = document.lineAt(violation.line - 1);
+    const start = Math.min(Math.max((violation.column || 1) - 1, 0), line.range.end.character);
+    const endLine = document.lineAt(Math.min(Math.max(violation.end_line || violation.line, violation.line),
+                                             document.lineCount) - 1);
+    return new vscode.Range(line.lineNumber, start, endLine.lineNumber, endLine.range.end.character);
 }
 
 function showFullReport(violations: Violation[], filename: string) {
@@ -299,4 +307,7 @@ function getReportHtml(violations: Violation[], filename: string): string {
     `;
 }
 
-export function deactivate() {}
+export function deactivate() {
+    client?.dispose();
+    client = undefined;
+}